@@ -0,0 +1,47 @@
+#!/usr/bin/env python3
+
+# Measures what callback timing costs.  A key with a few subscribers is
+# written with timing turned off and then with it turned on.
+#
+# Usage: python benchmarks/database_callback_timing.py [subscribers] [count]
+
+import io
+import sys
+import timeit
+import logging
+
+import fixgw.database as database
+
+CONFIG = """
+entries:
+- key: IAS
+  type: float
+  min: 0.0
+  max: 1000.0
+  initial: 0.0
+  tol: 0
+"""
+
+
+def cb(key, value, udata):
+    pass
+
+
+def main():
+    database.log = logging.getLogger("database")
+    subscribers = int(sys.argv[1]) if len(sys.argv) > 1 else 4
+    count = int(sys.argv[2]) if len(sys.argv) > 2 else 100000
+    database.init(io.StringIO(CONFIG))
+    for n in range(subscribers):
+        database.callback_add("bench{}".format(n), "IAS", cb, None)
+    print("Writing a key with {} subscribers".format(subscribers))
+    print("{:>10} {:>10}".format("timing", "ns/write"))
+    for enabled in (False, True):
+        database.callback_timing(enabled)
+        t = min(timeit.repeat(lambda: database.write("IAS", 100.0), number=count))
+        print("{:>10} {:>10.0f}".format("on" if enabled else "off", t * 1e9 / count))
+    database.callback_timing(False)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,86 @@
+#!/usr/bin/env python3
+
+# Measures how fast an input plugin can write to the database when the
+# subscribers are slow.  Each subscriber spends a fixed amount of time in its
+# callback, like a netfix connection or a CAN-FIX output would.  The writer
+# rate is compared with the callbacks being called inline and with the
+# callback dispatcher thread.
+#
+# Usage: python benchmarks/database_dispatcher.py [seconds] [subscribers] [us]
+
+import sys
+import time
+import logging
+
+import fixgw.database as database
+
+KEYS = 32
+
+
+def run(items, seconds):
+    count = 0
+    x = 0.0
+    end = time.perf_counter() + seconds
+    while time.perf_counter() < end:
+        for item in items:
+            item.value = x
+        x += 1.0
+        if x > 900.0:
+            x = 0.0
+        count += len(items)
+    return count / seconds
+
+
+def main():
+    database.log = logging.getLogger("database")
+    seconds = float(sys.argv[1]) if len(sys.argv) > 1 else 2.0
+    subscribers = int(sys.argv[2]) if len(sys.argv) > 2 else 2
+    cost = (float(sys.argv[3]) if len(sys.argv) > 3 else 20.0) / 1000000.0
+    store = database.ItemStore(KEYS)
+    items = []
+    for i in range(KEYS):
+        item = database.db_item("ITEM{}".format(i), "float", store)
+        item.min = 0.0
+        item.max = 1000.0
+        items.append(item)
+
+    calls = [0]
+
+    def slow(key, value, udata):
+        end = time.perf_counter() + cost
+        while time.perf_counter() < end:
+            pass
+        calls[0] += 1
+
+    for n in range(subscribers):
+        for item in items:
+            item.callbacks += (("bench{}".format(n), slow, None),)
+
+    print(
+        "{} keys, {} subscribers, {:.0f}us per callback".format(
+            KEYS, subscribers, cost * 1000000.0
+        )
+    )
+    print("{:>12} {:>14} {:>14}".format("mode", "writes/s", "callbacks/s"))
+    inline = run(items, seconds)
+    print("{:>12} {:>14.0f} {:>14.0f}".format("inline", inline, calls[0] / seconds))
+
+    calls[0] = 0
+    database.start_dispatcher()
+    dispatched = run(items, seconds)
+    status = database.dispatcher_status()
+    database.stop_dispatcher()
+    print(
+        "{:>12} {:>14.0f} {:>14.0f}".format(
+            "dispatcher", dispatched, calls[0] / seconds
+        )
+    )
+    print(
+        "dispatcher coalesced {} dropped {} max depth {}".format(
+            status["Coalesced"], status["Dropped"], status["Max Queue Depth"]
+        )
+    )
+
+
+if __name__ == "__main__":
+    main()
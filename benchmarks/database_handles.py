@@ -0,0 +1,53 @@
+#!/usr/bin/env python3
+
+# Compares reading and writing the database by key with read() and write()
+# against doing the same thing through a handle that was looked up once.
+#
+# Usage: python benchmarks/database_handles.py [count]
+
+import io
+import sys
+import timeit
+import logging
+
+import fixgw.database as database
+
+CONFIG = """
+entries:
+- key: IAS
+  type: float
+  min: 0.0
+  max: 1000.0
+  initial: 0.0
+  tol: 0
+  aux: [Min,Max,Vne]
+- key: ZZLOADER
+  type: str
+  initial: Loaded
+"""
+
+
+def main():
+    database.log = logging.getLogger("database")
+    count = int(sys.argv[1]) if len(sys.argv) > 1 else 200000
+    database.init(io.StringIO(CONFIG))
+    ias = database.get_handle("IAS")
+    vne = database.get_handle("IAS.Vne")
+    tests = [
+        ("write", lambda: database.write("IAS", 100.0)),
+        ("handle set", lambda: ias.set(100.0)),
+        ("read", lambda: database.read("IAS")),
+        ("handle get", lambda: ias.get()),
+        ("write aux", lambda: database.write("IAS.Vne", 160.0)),
+        ("handle set aux", lambda: vne.set(160.0)),
+        ("read aux", lambda: database.read("IAS.Vne")),
+        ("handle get aux", lambda: vne.get()),
+    ]
+    print("{:>16} {:>10}".format("operation", "ns/call"))
+    for name, func in tests:
+        t = min(timeit.repeat(func, number=count, repeat=5))
+        print("{:>16} {:>10.0f}".format(name, t * 1e9 / count))
+
+
+if __name__ == "__main__":
+    main()
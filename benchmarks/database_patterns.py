@@ -0,0 +1,77 @@
+#!/usr/bin/env python3
+
+# Measures how long it takes to subscribe to a group of keys.  The old way
+# of looping over every key with startswith() and adding a callback for each
+# one is compared with adding one callback with a pattern for each prefix.
+#
+# Usage: python benchmarks/database_patterns.py [database file] [runs]
+
+import os
+import sys
+import time
+import statistics
+import logging
+
+import fixgw.database as database
+
+PREFIXES = ["CHT", "EGT", "GS", "IAS", "ALT", "HEAD", "PITCH", "ROLL", "FUELQ"]
+
+
+def cb(key, value, udata):
+    pass
+
+
+def by_key(n):
+    for key in database.listkeys():
+        for sw in PREFIXES:
+            if key.startswith(sw):
+                database.callback_add("bench", key, cb, n)
+                break
+
+
+def by_pattern(n):
+    for sw in PREFIXES:
+        database.callback_add("bench", sw + "*", cb, n)
+
+
+def timed(runs, func):
+    times = []
+    for n in range(runs):
+        start = time.perf_counter()
+        func(n)
+        times.append(time.perf_counter() - start)
+        database.callback_del("bench", "*", cb, n)
+    return statistics.median(times)
+
+
+def main():
+    database.log = logging.getLogger("database")
+    here = os.path.dirname(os.path.abspath(__file__))
+    dbfile = (
+        sys.argv[1]
+        if len(sys.argv) > 1
+        else os.path.join(here, "..", "src", "fixgw", "config", "database.yaml")
+    )
+    runs = int(sys.argv[2]) if len(sys.argv) > 2 else 50
+    database.init(dbfile)
+    by_pattern(0)
+    count = sum(
+        1 for key in database.listkeys() if database.get_raw_item(key).callbacks
+    )
+    database.callback_del("bench", "*", cb, 0)
+    print(
+        "{} prefixes matching {} of {} keys".format(
+            len(PREFIXES), count, len(database.listkeys())
+        )
+    )
+    print("{:>12} {:>10} {:>8}".format("method", "us", "calls"))
+    print("{:>12} {:>10.0f} {:>8}".format("per key", timed(runs, by_key) * 1e6, count))
+    print(
+        "{:>12} {:>10.0f} {:>8}".format(
+            "pattern", timed(runs, by_pattern) * 1e6, len(PREFIXES)
+        )
+    )
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,94 @@
+#!/usr/bin/env python3
+
+# Measures how database reads scale with the number of reader threads while
+# a writer thread is constantly updating the same items.  The lock free
+# db_item.value read path is compared against the old way of reading, which
+# took the item lock and updated the old flag on every read.
+#
+# Usage: python benchmarks/database_read_scaling.py [seconds] [max readers]
+
+import sys
+import time
+import threading
+import logging
+
+import fixgw.database as database
+
+ITEMS = 64
+
+
+def locked_read(item):
+    # This is how db_item.value used to work
+    store = item.store
+    slot = item.slot
+    with item.lock:
+        flags = store.flags[slot]
+        if store.tols[slot] != 0:
+            if (time.time() - store.timestamps[slot]) * 1000 > store.tols[slot]:
+                flags |= database.OLD
+            else:
+                flags &= ~database.OLD
+            store.flags[slot] = flags
+        return (store.values[slot],) + database.FLAG_TUPLES[flags]
+
+
+def lockfree_read(item):
+    return item.value
+
+
+def run(items, readers, seconds, read):
+    stop = threading.Event()
+    counts = [0] * readers
+
+    def reader(n):
+        c = 0
+        while not stop.is_set():
+            for item in items:
+                read(item)
+            c += len(items)
+        counts[n] = c
+
+    def writer():
+        x = 0.0
+        while not stop.is_set():
+            for item in items:
+                item.value = x
+            x += 1.0
+            if x > 900.0:
+                x = 0.0
+
+    threads = [threading.Thread(target=reader, args=(n,)) for n in range(readers)]
+    threads.append(threading.Thread(target=writer))
+    for t in threads:
+        t.start()
+    time.sleep(seconds)
+    stop.set()
+    for t in threads:
+        t.join()
+    return sum(counts) / seconds
+
+
+def main():
+    database.log = logging.getLogger("database")
+    seconds = float(sys.argv[1]) if len(sys.argv) > 1 else 2.0
+    max_readers = int(sys.argv[2]) if len(sys.argv) > 2 else 8
+    store = database.ItemStore(ITEMS)
+    items = []
+    for i in range(ITEMS):
+        item = database.db_item("ITEM{}".format(i), "float", store)
+        item.min = 0.0
+        item.max = 1000.0
+        item.tol = 200
+        items.append(item)
+
+    print("{:>8} {:>16} {:>16}".format("readers", "locked rd/s", "lock free rd/s"))
+    readers = 1
+    while readers <= max_readers:
+        locked = run(items, readers, seconds, locked_read)
+        lockfree = run(items, readers, seconds, lockfree_read)
+        print("{:>8} {:>16.0f} {:>16.0f}".format(readers, locked, lockfree))
+        readers *= 2
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,78 @@
+#!/usr/bin/env python3
+
+# Compares reading every key in the database one at a time with read()
+# against taking one snapshot of the whole database.  It is run once with
+# the database idle and once with another thread writing to it so the cost
+# of retrying the snapshot can be seen.
+#
+# Usage: python benchmarks/database_snapshot.py [database file] [runs]
+
+import os
+import sys
+import time
+import threading
+import statistics
+import logging
+
+import fixgw.database as database
+
+
+def per_key(keys):
+    values = {}
+    for key in keys:
+        values[key] = database.read(key)
+    return values
+
+
+def timed(runs, func):
+    times = []
+    for i in range(runs):
+        start = time.perf_counter()
+        func()
+        times.append(time.perf_counter() - start)
+    return statistics.median(times)
+
+
+def main():
+    database.log = logging.getLogger("database")
+    here = os.path.dirname(os.path.abspath(__file__))
+    dbfile = (
+        sys.argv[1]
+        if len(sys.argv) > 1
+        else os.path.join(here, "..", "src", "fixgw", "config", "database.yaml")
+    )
+    runs = int(sys.argv[2]) if len(sys.argv) > 2 else 200
+    database.init(dbfile)
+    keys = database.listkeys()
+    print("{} keys from {}".format(len(keys), dbfile))
+    print("{:>12} {:>12} {:>12}".format("writer", "read() us", "snapshot us"))
+    print(
+        "{:>12} {:>12.0f} {:>12.0f}".format(
+            "idle",
+            timed(runs, lambda: per_key(keys)) * 1e6,
+            timed(runs, database.snapshot) * 1e6,
+        )
+    )
+
+    done = threading.Event()
+
+    def writer():
+        x = 0.0
+        while not done.is_set():
+            x = (x + 1.0) % 100.0
+            database.write("IAS", x)
+            database.write("ALT", x)
+
+    t = threading.Thread(target=writer)
+    t.start()
+    try:
+        reads = timed(runs, lambda: per_key(keys))
+        snaps = timed(runs, database.snapshot)
+    finally:
+        done.set()
+        t.join()
+    print("{:>12} {:>12.0f} {:>12.0f}".format("busy", reads * 1e6, snaps * 1e6))
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,103 @@
+#!/usr/bin/env python3
+
+# Measures how late items are marked old after their TOL runs out and how
+# much time is spent looking for them.  The scheduler that the database uses
+# now is compared against the old way of scanning every item once a second.
+#
+# Usage: python benchmarks/database_staleness.py [items] [tol ms]
+
+import io
+import sys
+import time
+import threading
+import statistics
+import logging
+
+import fixgw.database as database
+
+
+def build(count, tol):
+    entries = ["entries:"]
+    for i in range(count):
+        entries.append(
+            "- key: ITEM{}\n  type: float\n  min: 0.0\n  max: 1000.0\n"
+            "  initial: 0.0\n  tol: {}".format(i, tol)
+        )
+    entries.append("- key: ZZLOADER\n  type: str\n  initial: Loaded")
+    database.init(io.StringIO("\n".join(entries)))
+
+
+def measure(count, tol, scan):
+    build(count, tol)
+    keys = ["ITEM{}".format(i) for i in range(count)]
+    written = {}
+    late = []
+    done = threading.Event()
+
+    def cb(key, value, udata):
+        if value[2] and key in written:
+            late.append(time.time() - written.pop(key) - tol / 1000.0)
+            if not written:
+                done.set()
+
+    for key in keys:
+        database.callback_add("bench", key, cb, None)
+    # Spread the writes out so the expiry times are spread out too
+    spread = 0.5
+    scan_time = 0.0
+    scans = 0
+    start = time.time()
+    for n, key in enumerate(keys):
+        while time.time() - start < spread * n / count:
+            time.sleep(0.001)
+        written[key] = time.time()
+        database.write(key, 1.0)
+    if scan:
+        # This is what the old UpdateThread did
+        while not done.is_set():
+            time.sleep(1.0)
+            t = time.perf_counter()
+            database.update()
+            scan_time += time.perf_counter() - t
+            scans += 1
+    else:
+        done.wait(10.0)
+    return late, scan_time, scans
+
+
+def main():
+    database.log = logging.getLogger("database")
+    count = int(sys.argv[1]) if len(sys.argv) > 1 else 2000
+    tol = int(sys.argv[2]) if len(sys.argv) > 2 else 100
+    print("{} items with a TOL of {}ms".format(count, tol))
+    print(
+        "{:>10} {:>14} {:>14} {:>14}".format(
+            "method", "median late ms", "max late ms", "scan ms/pass"
+        )
+    )
+    # Keep the scheduler from seeing the items for the scan test
+    call_at = database._call_at
+    database._call_at = lambda when, func: None
+    late, scan_time, scans = measure(count, tol, True)
+    print(
+        "{:>10} {:>14.1f} {:>14.1f} {:>14.2f}".format(
+            "1s scan",
+            statistics.median(late) * 1000,
+            max(late) * 1000,
+            scan_time * 1000 / max(scans, 1),
+        )
+    )
+    database._call_at = call_at
+    late, scan_time, scans = measure(count, tol, False)
+    print(
+        "{:>10} {:>14.1f} {:>14.1f} {:>14}".format(
+            "scheduler",
+            statistics.median(late) * 1000,
+            max(late) * 1000,
+            "-",
+        )
+    )
+
+
+if __name__ == "__main__":
+    main()
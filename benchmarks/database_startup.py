@@ -0,0 +1,56 @@
+#!/usr/bin/env python3
+
+# Measures how long database.init() takes with the shipped database
+# definition.  It is timed reading the YAML files every time, the first time
+# with a cache when the cache has to be written and then using the cache.
+#
+# Usage: python benchmarks/database_startup.py [database file] [runs]
+
+import os
+import sys
+import time
+import tempfile
+import statistics
+import logging
+
+import fixgw.database as database
+
+
+def timed(runs, func):
+    times = []
+    for i in range(runs):
+        start = time.perf_counter()
+        func()
+        times.append(time.perf_counter() - start)
+    return statistics.median(times)
+
+
+def main():
+    database.log = logging.getLogger("database")
+    here = os.path.dirname(os.path.abspath(__file__))
+    dbfile = (
+        sys.argv[1]
+        if len(sys.argv) > 1
+        else os.path.join(here, "..", "src", "fixgw", "config", "database.yaml")
+    )
+    runs = int(sys.argv[2]) if len(sys.argv) > 2 else 5
+    with tempfile.TemporaryDirectory() as d:
+        cache = os.path.join(d, "database.cache")
+
+        def build():
+            if os.path.exists(cache):
+                os.remove(cache)
+            database.init(dbfile, cache)
+
+        no_cache = timed(runs, lambda: database.init(dbfile))
+        cold = timed(runs, build)
+        warm = timed(runs, lambda: database.init(dbfile, cache))
+    print("{} keys from {}".format(len(database.listkeys()), dbfile))
+    print("{:>20} {:>10}".format("mode", "ms"))
+    print("{:>20} {:>10.1f}".format("no cache", no_cache * 1000))
+    print("{:>20} {:>10.1f}".format("writing cache", cold * 1000))
+    print("{:>20} {:>10.1f}".format("using cache", warm * 1000))
+
+
+if __name__ == "__main__":
+    main()
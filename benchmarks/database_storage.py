@@ -0,0 +1,165 @@
+#!/usr/bin/env python3
+
+# Compares the memory use and read/write throughput of the column store
+# used by fixgw.database against the old object-per-key layout where every
+# item carried its own lock, aux dictionary and instance attributes.
+#
+# Usage: python benchmarks/database_storage.py [item count ...]
+
+import sys
+import time
+import threading
+import tracemalloc
+import logging
+
+import fixgw.database as database
+
+
+# This is a copy of the storage parts of the original db_item so that we
+# have something to compare against.
+class legacy_item(object):
+    def __init__(self, key):
+        self.dtype = float
+        self.typestring = "float"
+        self.key = key
+        self._value = 0.0
+        self.description = ""
+        self.units = ""
+        self._annunciate = False
+        self._old = False
+        self._bad = False
+        self._fail = False
+        self._secfail = False
+        self._max = 1000.0
+        self._min = 0.0
+        self._tol = 100
+        self.timestamp = time.time()
+        self.aux = {}
+        self.callbacks = []
+        self.lock = threading.Lock()
+
+    @property
+    def value(self):
+        with self.lock:
+            if self._tol != 0:
+                self._old = (time.time() - self.timestamp) * 1000 > self._tol
+            return (
+                self._value,
+                self._annunciate,
+                self._old,
+                self._bad,
+                self._fail,
+                self._secfail,
+            )
+
+    @value.setter
+    def value(self, x):
+        with self.lock:
+            if isinstance(x, tuple):
+                self._annunciate = x[1]
+                self._bad = x[2]
+                self._fail = x[3]
+                if len(x) >= 5:
+                    self._secfail = x[4]
+                x = x[0]
+            if self.dtype is bool:
+                self._value = x == True or (isinstance(x, int) and x != 0)
+            else:
+                if self.dtype is str and x is None:
+                    self._value = ""
+                else:
+                    self._value = self.dtype(x)
+                if self.dtype is not str:
+                    try:
+                        if self._value < self._min:
+                            self._value = self._min
+                    except:
+                        pass
+                    try:
+                        if self._value > self._max:
+                            self._value = self._max
+                    except:
+                        pass
+            self.timestamp = time.time()
+        for func in self.callbacks:
+            func[1](self.key, self.value, func[2])
+
+
+def build_legacy(count):
+    items = {}
+    for i in range(count):
+        key = "ITEM{}".format(i)
+        items[key] = legacy_item(key)
+    return items
+
+
+def build_store(count):
+    store = database.ItemStore(count)
+    items = {}
+    for i in range(count):
+        key = "ITEM{}".format(i)
+        item = database.db_item(key, "float", store)
+        item.min = 0.0
+        item.max = 1000.0
+        items[key] = item
+    return items, store
+
+
+def measure(func, count):
+    tracemalloc.start()
+    before = tracemalloc.get_traced_memory()[0]
+    result = func(count)
+    after = tracemalloc.get_traced_memory()[0]
+    tracemalloc.stop()
+    return result, after - before
+
+
+def throughput(items, passes=20):
+    keys = list(items.keys())
+    start = time.perf_counter()
+    for p in range(passes):
+        for key in keys:
+            items[key].value = p
+    write = len(keys) * passes / (time.perf_counter() - start)
+    start = time.perf_counter()
+    for p in range(passes):
+        for key in keys:
+            items[key].value
+    read = len(keys) * passes / (time.perf_counter() - start)
+    return write, read
+
+
+def main():
+    database.log = logging.getLogger("database")
+    counts = [int(x) for x in sys.argv[1:]] or [500, 5000, 20000]
+    print(
+        "{:>8} {:>14} {:>14} {:>14} {:>14} {:>14} {:>14}".format(
+            "items",
+            "legacy B/item",
+            "store B/item",
+            "legacy wr/s",
+            "store wr/s",
+            "legacy rd/s",
+            "store rd/s",
+        )
+    )
+    for count in counts:
+        legacy, legacy_mem = measure(build_legacy, count)
+        (items, store), store_mem = measure(build_store, count)
+        lw, lr = throughput(legacy)
+        sw, sr = throughput(items)
+        print(
+            "{:>8} {:>14.0f} {:>14.0f} {:>14.0f} {:>14.0f} {:>14.0f} {:>14.0f}".format(
+                count,
+                legacy_mem / count,
+                store_mem / count,
+                lw,
+                sw,
+                lr,
+                sr,
+            )
+        )
+
+
+if __name__ == "__main__":
+    main()
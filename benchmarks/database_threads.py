@@ -0,0 +1,108 @@
+#!/usr/bin/env python3
+
+# Measures how the database scales with threads.  N writer threads each
+# write their own key as fast as they can while M subscriber threads follow
+# the journal and read every key that changed, like the netfix connections
+# do.  The total writes and reads per second are printed for 1 up to N
+# writers.
+#
+# On a normal build of Python the GIL lets only one thread run at a time so
+# adding writers does not add throughput.  To compare, run this with a free
+# threaded build (3.13t or later) both ways:
+#
+#   python3.13t -X gil=0 benchmarks/database_threads.py
+#   python3.13t -X gil=1 benchmarks/database_threads.py
+#
+# Usage: python benchmarks/database_threads.py [writers] [subscribers] [seconds]
+
+import io
+import sys
+import time
+import logging
+import threading
+
+import fixgw.database as database
+
+ENTRY = """
+- key: WRITE{}
+  type: float
+  min: 0.0
+  max: 100000000.0
+  initial: 0.0
+  tol: 0
+"""
+
+
+def writer(key, stop, counts, n):
+    i = 0
+    while not stop.is_set():
+        for x in range(100):
+            database.write(key, float(i))
+            i += 1
+    counts[n] = i
+
+
+def subscriber(stop, counts, n):
+    reads = 0
+    seq = database.sequence()
+    while not stop.is_set():
+        try:
+            seq, keys = database.changes(seq)
+        except database.ResyncNeeded:
+            seq = database.snapshot().sequence
+            continue
+        for key in keys:
+            database.read(key)
+        reads += len(keys)
+        time.sleep(0.001)
+    counts[n] = reads
+
+
+def measure(writers, subscribers, seconds):
+    stop = threading.Event()
+    wcounts = [0] * writers
+    scounts = [0] * subscribers
+    threads = [
+        threading.Thread(target=writer, args=("WRITE{}".format(n), stop, wcounts, n))
+        for n in range(writers)
+    ]
+    threads += [
+        threading.Thread(target=subscriber, args=(stop, scounts, n))
+        for n in range(subscribers)
+    ]
+    for t in threads:
+        t.start()
+    time.sleep(seconds)
+    stop.set()
+    for t in threads:
+        t.join()
+    return sum(wcounts) / seconds, sum(scounts) / seconds
+
+
+def main():
+    database.log = logging.getLogger("database")
+    writers = int(sys.argv[1]) if len(sys.argv) > 1 else 4
+    subscribers = int(sys.argv[2]) if len(sys.argv) > 2 else 2
+    seconds = float(sys.argv[3]) if len(sys.argv) > 3 else 2.0
+    database.init(
+        io.StringIO("entries:" + "".join(ENTRY.format(n) for n in range(writers)))
+    )
+    gil = getattr(sys, "_is_gil_enabled", lambda: True)()
+    print(
+        "GIL {}, {} subscribers, {} seconds each".format(
+            "enabled" if gil else "disabled", subscribers, seconds
+        )
+    )
+    print("{:>8} {:>12} {:>12} {:>8}".format("writers", "writes/s", "reads/s", "scale"))
+    base = None
+    for n in range(1, writers + 1):
+        writes, reads = measure(n, subscribers, seconds)
+        if base is None:
+            base = writes
+        print(
+            "{:>8} {:>12.0f} {:>12.0f} {:>8.2f}".format(n, writes, reads, writes / base)
+        )
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,68 @@
+#!/usr/bin/env python3
+
+# Measures how long it takes to remove a subscriber that is on a few keys
+# from the whole database, which is what the netfix server does every time a
+# client disconnects.  The reverse index is compared with the old way of
+# looking at the callbacks of every key in the database.
+#
+# Usage: python benchmarks/database_unsubscribe.py [subscribed keys]
+
+import io
+import sys
+import time
+import logging
+
+import fixgw.database as database
+
+
+def build(count):
+    entries = ["entries:"]
+    for i in range(count):
+        entries.append(
+            "- key: ITEM{}\n  type: float\n  initial: 0.0\n  tol: 0".format(i)
+        )
+    database.init(io.StringIO("\n".join(entries)))
+
+
+def cb(key, value, udata):
+    pass
+
+
+# This is what callback_del("*") used to do
+def scan_del(func):
+    for key in database.listkeys():
+        item = database.get_raw_item(key)
+        if func in item.callbacks:
+            item.callbacks = tuple(x for x in item.callbacks if x != func)
+
+
+def measure(count, subscribed, scan, runs=200):
+    build(count)
+    keys = ["ITEM{}".format(i) for i in range(subscribed)]
+    total = 0.0
+    for n in range(runs):
+        for key in keys:
+            database.callback_add("bench", key, cb, n)
+        start = time.perf_counter()
+        if scan:
+            scan_del(("bench", cb, n))
+            database._subscriptions.clear()
+        else:
+            database.callback_del("bench", "*", cb, n)
+        total += time.perf_counter() - start
+    return total / runs
+
+
+def main():
+    database.log = logging.getLogger("database")
+    subscribed = int(sys.argv[1]) if len(sys.argv) > 1 else 20
+    print("Removing a subscriber that is on {} keys".format(subscribed))
+    print("{:>10} {:>14} {:>14}".format("keys", "scan us", "index us"))
+    for count in (500, 2000, 10000):
+        scan = measure(count, subscribed, True)
+        index = measure(count, subscribed, False)
+        print("{:>10} {:>14.1f} {:>14.1f}".format(count, scan * 1e6, index * 1e6))
+
+
+if __name__ == "__main__":
+    main()
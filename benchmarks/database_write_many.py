@@ -0,0 +1,120 @@
+#!/usr/bin/env python3
+
+# Measures how many frames per second a serial plugin can push into the
+# database.  A frame is the set of keys that the Grand Rapids EIS 4000
+# plugin writes for every packet it receives.  Writing the frame one key at a
+# time with database.write() is compared against a single write_many() call,
+# and against write_many() where the subscribers take a single batched
+# notification for each frame instead of one call per key.
+#
+# Usage: python benchmarks/database_write_many.py [seconds] [subscribers]
+
+import os
+import sys
+import time
+import queue
+import logging
+
+import fixgw.database as database
+
+DBFILE = os.path.join(
+    os.path.dirname(__file__), "..", "src", "fixgw", "config", "database.yaml"
+)
+
+FRAME = [
+    "TACH1",
+    "CHT11",
+    "CHT12",
+    "CHT13",
+    "CHT14",
+    "CHT15",
+    "CHT16",
+    "EGT11",
+    "EGT12",
+    "EGT13",
+    "EGT14",
+    "EGT15",
+    "EGT16",
+    "VOLT",
+    "HOBBS1",
+    "OILP1",
+    "OILT1",
+    "FUELQ1",
+    "BARO",
+    "OAT",
+    "ALT",
+    "H2OT1",
+]
+
+
+def frames(n):
+    # Slightly different values for every frame, like a real engine
+    x = float(n % 100)
+    return {key: x for key in FRAME}
+
+
+def store(key, value, q):
+    q.put((key, value))
+
+
+def store_batch(values, q):
+    q.put(values)
+
+
+def run_single(seconds):
+    count = 0
+    end = time.perf_counter() + seconds
+    while time.perf_counter() < end:
+        for key, value in frames(count).items():
+            database.write(key, value)
+        count += 1
+    return count / seconds
+
+
+def run_many(seconds):
+    count = 0
+    end = time.perf_counter() + seconds
+    while time.perf_counter() < end:
+        database.write_many(frames(count))
+        count += 1
+    return count / seconds
+
+
+def main():
+    logging.basicConfig(level=logging.WARNING)
+    seconds = float(sys.argv[1]) if len(sys.argv) > 1 else 2.0
+    subscribers = int(sys.argv[2]) if len(sys.argv) > 2 else 2
+    with open(DBFILE) as f:
+        database.init(f)
+
+    # Each subscriber acts like a netfix connection and queues every value
+    queues = []
+    for n in range(subscribers):
+        q = queue.Queue()
+        queues.append(q)
+        for key in FRAME:
+            database.callback_add("bench{}".format(n), key, store, q)
+
+    def drain():
+        for q in queues:
+            while not q.empty():
+                q.get_nowait()
+
+    print("{} keys per frame, {} subscribers per key".format(len(FRAME), subscribers))
+    single = run_single(seconds)
+    drain()
+    many = run_many(seconds)
+    drain()
+    # Now let the same subscribers take one batched notification per frame
+    for n, q in enumerate(queues):
+        database.callback_del("bench{}".format(n), "*", store, q)
+        database.batch_callback_add("bench{}".format(n), store_batch, q)
+    batched = run_many(seconds)
+    print("{:>28} {:>12}".format("method", "frames/s"))
+    print("{:>28} {:>12.0f}".format("write() per key", single))
+    print("{:>28} {:>12.0f}".format("write_many()", many))
+    print("{:>28} {:>12.0f}".format("write_many() batch subs", batched))
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,153 @@
+#!/usr/bin/env python3
+
+# Compares the two Net-FIX server modes as the number of connected clients
+# grows.  Every client subscribes to one key and the key is written at a
+# steady rate.  For each mode and client count this prints the number of
+# threads in the process, the CPU time used as a percentage of one core and
+# the median and worst time from the write until every client has the value.
+# The clients are read by one thread with a selector so they cost the same
+# for both modes.
+#
+# Usage: python benchmarks/netfix_connections.py [max clients] [seconds] [rate]
+
+import os
+import sys
+import time
+import socket
+import logging
+import selectors
+import threading
+import statistics
+
+import fixgw.database as database
+import fixgw.plugins.netfix
+
+PORT = 34998
+
+
+class Clients(threading.Thread):
+    def __init__(self, count):
+        super(Clients, self).__init__(daemon=True)
+        self.selector = selectors.DefaultSelector()
+        self.socks = []
+        self.received = {}
+        self.lock = threading.Lock()
+        self.running = True
+        for n in range(count):
+            s = self.connect()
+            s.setblocking(False)
+            self.selector.register(s, selectors.EVENT_READ, [b""])
+            self.socks.append(s)
+
+    # The threaded server closes its listening socket after each accept so
+    # the clients connect one at a time and try again if they are refused
+    def connect(self):
+        for attempt in range(100):
+            try:
+                s = socket.create_connection(("127.0.0.1", PORT))
+                s.sendall(b"@sALT\n")
+                buff = b""
+                while b"\n" not in buff:
+                    data = s.recv(1024)
+                    if not data:
+                        raise ConnectionResetError
+                    buff += data
+                return s
+            except OSError:
+                time.sleep(0.05)
+        raise RuntimeError("Unable to connect")
+
+    def run(self):
+        while self.running:
+            for key, events in self.selector.select(0.1):
+                try:
+                    data = key.fileobj.recv(65536)
+                except BlockingIOError:
+                    continue
+                now = time.perf_counter()
+                lines = (key.data[0] + data).split(b"\n")
+                key.data[0] = lines.pop()
+                for line in lines:
+                    v = line.split(b";")[1]
+                    with self.lock:
+                        self.received.setdefault(v, []).append(now)
+
+    def close(self):
+        self.running = False
+        self.join()
+        for s in self.socks:
+            s.close()
+
+
+def measure(mode, count, seconds, rate):
+    config = {
+        "type": "server",
+        "server_mode": mode,
+        "host": "127.0.0.1",
+        "port": PORT,
+        "buffer_size": 1024,
+        "timeout": 1.0,
+    }
+    server = fixgw.plugins.netfix.Plugin("netfix", config, None)
+    server.start()
+    time.sleep(0.2)
+    clients = Clients(count)
+    clients.start()
+    threads = threading.active_count()
+    written = {}
+    cpu = time.process_time()
+    start = time.perf_counter()
+    i = 0
+    while time.perf_counter() - start < seconds:
+        v = float(1000 + i)
+        written[str(v).encode()] = time.perf_counter()
+        database.write("ALT", v)
+        i += 1
+        time.sleep(max(0, start + i / rate - time.perf_counter()))
+    elapsed = time.perf_counter() - start
+    time.sleep(0.2)
+    cpu = time.process_time() - cpu
+    clients.close()
+    server.shutdown()
+    latencies = []
+    for v, t in written.items():
+        got = clients.received.get(v, [])
+        if len(got) == count:
+            latencies.append(max(got) - t)
+    if not latencies:
+        return threads, cpu / elapsed * 100, float("nan"), float("nan")
+    return (
+        threads,
+        cpu / elapsed * 100,
+        statistics.median(latencies) * 1e6,
+        max(latencies) * 1e6,
+    )
+
+
+def main():
+    database.log = logging.getLogger("database")
+    most = int(sys.argv[1]) if len(sys.argv) > 1 else 32
+    seconds = float(sys.argv[2]) if len(sys.argv) > 2 else 2.0
+    rate = float(sys.argv[3]) if len(sys.argv) > 3 else 100.0
+    here = os.path.dirname(os.path.abspath(__file__))
+    database.init(os.path.join(here, "..", "src", "fixgw", "config", "database.yaml"))
+    print("{} writes a second for {} seconds".format(rate, seconds))
+    print(
+        "{:>8} {:>8} {:>8} {:>8} {:>12} {:>12}".format(
+            "mode", "clients", "threads", "cpu %", "median us", "max us"
+        )
+    )
+    count = 1
+    while count <= most:
+        for mode in ("threads", "select"):
+            threads, cpu, median, worst = measure(mode, count, seconds, rate)
+            print(
+                "{:>8} {:>8} {:>8} {:>8.1f} {:>12.0f} {:>12.0f}".format(
+                    mode, count, threads, cpu, median, worst
+                )
+            )
+        count *= 4
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,59 @@
+#!/usr/bin/env python3
+
+# Measures what it costs to send one change to many Net-FIX connections.
+# Connections without sockets subscribe to a key and the key is written,
+# first with every connection formatting its own sentence and then with the
+# shared sentence cache.
+#
+# Usage: python benchmarks/netfix_fanout.py [connections] [count]
+
+import os
+import sys
+import timeit
+import logging
+
+import fixgw.database as database
+import fixgw.plugins.netfix as netfix
+
+
+# Formats the sentence every time like the server did before the cache
+def uncached(id, value):
+    netfix.sentences.clear()
+    return cached(id, value)
+
+
+cached = netfix.value_sentence
+
+
+def main():
+    database.log = logging.getLogger("database")
+    here = os.path.dirname(os.path.abspath(__file__))
+    database.init(os.path.join(here, "..", "src", "fixgw", "config", "database.yaml"))
+    count = int(sys.argv[2]) if len(sys.argv) > 2 else 20000
+    config = {"type": "server", "host": "127.0.0.1", "port": 0}
+    pl = netfix.Plugin("netfix", config, None)
+    print("{:>12} {:>12} {:>12}".format("connections", "uncached us", "cached us"))
+    for n in [1, 4, 16] if len(sys.argv) < 2 else [int(sys.argv[1])]:
+        conns = [netfix.Connection(pl, None, ("127.0.0.1", 0)) for i in range(n)]
+        for co in conns:
+            co.handle_request("@sALT")
+
+        def write():
+            database.write("ALT", 1000.0)
+            database.write("ALT", 2000.0)
+            for co in conns:
+                co.queue.get_many(netfix.SEND_BUDGET, False)
+
+        times = []
+        for f in (uncached, cached):
+            netfix.value_sentence = f
+            t = min(timeit.repeat(write, number=count, repeat=3))
+            times.append(t * 1e6 / (count * 2))
+        netfix.value_sentence = cached
+        print("{:>12} {:>12.2f} {:>12.2f}".format(n, *times))
+        for co in conns:
+            pl.db_callback_del("ALT", co.subscription_handler)
+
+
+if __name__ == "__main__":
+    main()
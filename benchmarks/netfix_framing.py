@@ -0,0 +1,104 @@
+#!/usr/bin/env python3
+
+# Measures how fast the Net-FIX receive paths can take lines in.  The
+# server side feeds value updates from a client through Connection.feed()
+# into the database.  The client side feeds value sentences from the server
+# through the LineFramer to ClientThread.handle_request().  Both are run
+# with the old loop that looked at one character at a time and with the
+# LineFramer.  The data is cut into 1024 byte pieces like recv() gives it.
+#
+# Usage: python benchmarks/netfix_framing.py [lines]
+
+import os
+import sys
+import time
+import logging
+
+import fixgw.database as database
+import fixgw.netfix
+import fixgw.plugins.netfix
+
+
+def chunks(lines):
+    data = "".join(lines).encode()
+    return [data[i : i + 1024] for i in range(0, len(data), 1024)]
+
+
+# How the receive threads used to split lines
+class CharLoop(object):
+    def __init__(self, handle):
+        self.handle = handle
+        self.buff = ""
+
+    def feed(self, data):
+        dstring = data.decode("utf-8")
+        buff = self.buff
+        for d in dstring:
+            if d == "\n":
+                self.handle(buff)
+                buff = ""
+            else:
+                buff += d
+        self.buff = buff
+
+
+class Framer(object):
+    def __init__(self, handle):
+        self.handle = handle
+        self.framer = fixgw.netfix.LineFramer()
+
+    def feed(self, data):
+        for line in self.framer.feed(data):
+            self.handle(line)
+
+
+def rate(feed, data, count):
+    start = time.perf_counter()
+    for d in data:
+        feed(d)
+    return count / (time.perf_counter() - start)
+
+
+def main():
+    database.log = logging.getLogger("database")
+    here = os.path.dirname(os.path.abspath(__file__))
+    database.init(os.path.join(here, "..", "src", "fixgw", "config", "database.yaml"))
+    count = int(sys.argv[1]) if len(sys.argv) > 1 else 100000
+    keys = ["ROLL", "PITCH", "YAW", "ALT", "IAS", "VS", "HEAD", "ALAT"]
+    server_lines = [
+        "{};{:.2f};0000\n".format(keys[i % len(keys)], i % 50 + 0.25)
+        for i in range(count)
+    ]
+    client_lines = [
+        "{};{:.2f};00000\n".format(keys[i % len(keys)], i % 50 + 0.25)
+        for i in range(count)
+    ]
+    config = {"type": "server", "host": "127.0.0.1", "port": 0, "buffer_size": 1024}
+    server = fixgw.plugins.netfix.Plugin("netfix", config, None)
+    client = fixgw.netfix.ClientThread("127.0.0.1", 0)
+    client.dataCallback = lambda x: None
+    print("{} lines".format(count))
+    print(
+        "{:>8} {:>10} {:>14} {:>14}".format(
+            "side", "framing", "lines/s", "only split/s"
+        )
+    )
+    for side, lines, handle in [
+        (
+            "server",
+            server_lines,
+            fixgw.plugins.netfix.Connection(
+                server, None, ("127.0.0.1", 0)
+            ).handle_request,
+        ),
+        ("client", client_lines, client.handle_request),
+    ]:
+        data = chunks(lines)
+        for name, cls in [("char loop", CharLoop), ("framer", Framer)]:
+            full = rate(cls(handle).feed, data, count)
+            split = rate(cls(lambda x: None).feed, data, count)
+            print("{:>8} {:>10} {:>14.0f} {:>14.0f}".format(side, name, full, split))
+
+
+if __name__ == "__main__":
+    main()
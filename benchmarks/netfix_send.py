@@ -0,0 +1,118 @@
+#!/usr/bin/env python3
+
+# Shows what write coalescing saves in the threaded Net-FIX server.  A few
+# clients subscribe to the AHRS keys and the keys are written in bursts like
+# an AHRS plugin would at 50 Hz.  The number of sends, the bytes in each
+# and the CPU time are printed with coalescing turned off (SEND_BUDGET of 0
+# sends every message by itself) and on.
+#
+# Usage: python benchmarks/netfix_send.py [clients] [seconds]
+
+import os
+import sys
+import time
+import socket
+import logging
+import threading
+
+import fixgw.database as database
+import fixgw.plugins.netfix as netfix
+
+PORT = 34997
+KEYS = ["ROLL", "PITCH", "YAW", "HEAD", "ALAT", "ANORM", "ALONG", "VS"]
+
+
+def reader(sock, stop):
+    sock.settimeout(0.1)
+    while not stop.is_set():
+        try:
+            if not sock.recv(65536):
+                break
+        except socket.timeout:
+            pass
+
+
+# The threaded server closes its listening socket after each accept so the
+# clients connect one at a time and try again if they are refused
+def connect():
+    for attempt in range(100):
+        try:
+            s = socket.create_connection(("127.0.0.1", PORT))
+            s.sendall("".join("@s{}\n".format(key) for key in KEYS).encode())
+            buff = b""
+            while buff.count(b"\n") < len(KEYS):
+                data = s.recv(1024)
+                if not data:
+                    raise ConnectionResetError
+                buff += data
+            return s
+        except OSError:
+            time.sleep(0.05)
+    raise RuntimeError("Unable to connect")
+
+
+def measure(budget, count, seconds):
+    netfix.SEND_BUDGET = budget
+    config = {"type": "server", "host": "127.0.0.1", "port": PORT, "timeout": 1.0}
+    server = netfix.Plugin("netfix", config, None)
+    server.start()
+    time.sleep(0.2)
+    stop = threading.Event()
+    socks = [connect() for n in range(count)]
+    threads = [threading.Thread(target=reader, args=(s, stop)) for s in socks]
+    for t in threads:
+        t.start()
+    time.sleep(0.5)
+    cpu = time.process_time()
+    start = time.perf_counter()
+    i = 0
+    while time.perf_counter() - start < seconds:
+        for key in KEYS:
+            database.write(key, float(i % 100))
+        i += 1
+        time.sleep(max(0, start + i / 50.0 - time.perf_counter()))
+    time.sleep(0.2)
+    cpu = time.process_time() - cpu
+    status = server.get_status()
+    stop.set()
+    for t in threads:
+        t.join()
+    for s in socks:
+        s.close()
+    server.shutdown()
+    sends = 0
+    messages = 0
+    nbytes = 0
+    for n in range(count):
+        c = status["Connection {}".format(n)]
+        sends += c["Sends"]
+        messages += c["Messages Sent"]
+        nbytes += c["Sends"] * c["Bytes Per Send"]
+    return sends, messages, nbytes / max(sends, 1), cpu
+
+
+def main():
+    database.log = logging.getLogger("database")
+    here = os.path.dirname(os.path.abspath(__file__))
+    database.init(os.path.join(here, "..", "src", "fixgw", "config", "database.yaml"))
+    count = int(sys.argv[1]) if len(sys.argv) > 1 else 4
+    seconds = float(sys.argv[2]) if len(sys.argv) > 2 else 3.0
+    print(
+        "{} clients, {} keys at 50 Hz for {} seconds".format(count, len(KEYS), seconds)
+    )
+    print(
+        "{:>12} {:>10} {:>10} {:>12} {:>10}".format(
+            "coalescing", "messages", "sends", "bytes/send", "cpu ms"
+        )
+    )
+    for budget in (0, 65536):
+        sends, messages, per, cpu = measure(budget, count, seconds)
+        print(
+            "{:>12} {:>10} {:>10} {:>12.1f} {:>10.0f}".format(
+                "on" if budget else "off", messages, sends, per, cpu * 1000
+            )
+        )
+
+
+if __name__ == "__main__":
+    main()
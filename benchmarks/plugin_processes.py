@@ -0,0 +1,97 @@
+#!/usr/bin/env python3
+
+# Shows how plugins that do a lot of work in Python scale when they run in
+# their own processes.  Each plugin does some arithmetic and writes the
+# result to its own key as fast as it can.  The plugins are run in the
+# gateway's process and then each in its own process and the total number
+# of writes that reach the database each second is printed.
+#
+# Usage: python benchmarks/plugin_processes.py [plugins] [seconds]
+
+import io
+import sys
+import math
+import time
+import logging
+import threading
+
+import fixgw.database as database
+import fixgw.plugin as plugin
+import fixgw.process as process
+
+ENTRY = """
+- key: WORK{}
+  type: float
+  min: -1000000.0
+  max: 1000000.0
+  initial: 0.0
+  tol: 0
+"""
+
+
+# The plugin that is being measured.  The child processes import it from
+# this file.
+class Plugin(plugin.PluginBase):
+    def __init__(self, name, config, config_meta):
+        super(Plugin, self).__init__(name, config, config_meta)
+        self.key = config["key"]
+        self.thread = threading.Thread(target=self.work, daemon=True)
+        self.done = threading.Event()
+
+    def work(self):
+        x = 0.0
+        while not self.done.is_set():
+            for i in range(2000):
+                x += math.sin(i) * math.cos(x)
+            self.db_write(self.key, x)
+
+    def run(self):
+        self.thread.start()
+
+    def stop(self):
+        self.done.set()
+        self.thread.join()
+
+
+def writes(count):
+    return sum(database.write_statistics("WORK{}".format(n))[0] for n in range(count))
+
+
+def measure(count, seconds, separate):
+    database.init(
+        io.StringIO("entries:" + "".join(ENTRY.format(n) for n in range(count)))
+    )
+    plugins = []
+    for n in range(count):
+        config = {"key": "WORK{}".format(n)}
+        name = "work{}".format(n)
+        if separate:
+            plugins.append(
+                process.ProcessPlugin(name, "plugin_processes", config, None)
+            )
+        else:
+            plugins.append(Plugin(name, config, None))
+    for p in plugins:
+        p.start()
+    time.sleep(0.5)
+    start = writes(count)
+    time.sleep(seconds)
+    total = writes(count) - start
+    for p in plugins:
+        p.shutdown()
+    return total / seconds
+
+
+def main():
+    database.log = logging.getLogger("database")
+    count = int(sys.argv[1]) if len(sys.argv) > 1 else 4
+    seconds = float(sys.argv[2]) if len(sys.argv) > 2 else 3.0
+    print("{} plugins for {} seconds".format(count, seconds))
+    print("{:>10} {:>12}".format("process", "writes/s"))
+    for separate in (False, True):
+        rate = measure(count, seconds, separate)
+        print("{:>10} {:>12.0f}".format("own" if separate else "gateway", rate))
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,103 @@
+#!/usr/bin/env python3
+
+# Compares how quickly a local client sees a change to the database through
+# the shared memory mirror and through fixgw.netfix.db.Database over a
+# loopback Net-FIX connection.  A key is written in the gateway and the time
+# until the client has the new value is measured.  Both clients run in this
+# process so the netfix numbers include the client threads competing for the
+# GIL, just as they would in a display program.
+#
+# Usage: python benchmarks/shared_memory.py [database file] [writes]
+
+import os
+import sys
+import time
+import logging
+import statistics
+
+import fixgw.database as database
+import fixgw.netfix
+import fixgw.netfix.db
+import fixgw.netfix.shm as shm
+import fixgw.plugins.netfix
+import fixgw.plugins.shared_memory
+
+PORT = 34999
+SEGMENT = "fixgw_bench_{}".format(os.getpid())
+
+
+def latency(writes, get_value):
+    times = []
+    for i in range(writes):
+        v = float(1000 + i)
+        start = time.perf_counter()
+        database.write("ALT", v)
+        while get_value("ALT") != v:
+            time.sleep(0)
+        times.append(time.perf_counter() - start)
+    return statistics.median(times), max(times)
+
+
+def main():
+    database.log = logging.getLogger("database")
+    here = os.path.dirname(os.path.abspath(__file__))
+    dbfile = (
+        sys.argv[1]
+        if len(sys.argv) > 1
+        else os.path.join(here, "..", "src", "fixgw", "config", "database.yaml")
+    )
+    writes = int(sys.argv[2]) if len(sys.argv) > 2 else 500
+    database.init(dbfile)
+    config = {
+        "type": "server",
+        "host": "127.0.0.1",
+        "port": PORT,
+        "buffer_size": 1024,
+        "timeout": 1.0,
+    }
+    server = fixgw.plugins.netfix.Plugin("netfix", config, None)
+    server.start()
+    mirror = fixgw.plugins.shared_memory.Plugin(
+        "shared_memory", {"segment": SEGMENT}, None
+    )
+    mirror.start()
+    time.sleep(0.2)
+
+    start = time.perf_counter()
+    reader = shm.SharedDatabase(SEGMENT)
+    shm_open = time.perf_counter() - start
+
+    client = fixgw.netfix.Client("127.0.0.1", PORT)
+    client.connect()
+    start = time.perf_counter()
+    db = fixgw.netfix.db.Database(client)
+    db.init_event.wait()
+    netfix_open = time.perf_counter() - start
+
+    try:
+        print("{} keys, {} writes".format(len(reader.get_item_list()), writes))
+        print(
+            "{:>14} {:>12} {:>12} {:>12}".format(
+                "client", "connect ms", "median us", "max us"
+            )
+        )
+        for name, opened, get_value in [
+            ("netfix", netfix_open, db.get_value),
+            ("shared memory", shm_open, reader.get_value),
+        ]:
+            median, worst = latency(writes, get_value)
+            print(
+                "{:>14} {:>12.1f} {:>12.1f} {:>12.1f}".format(
+                    name, opened * 1000, median * 1e6, worst * 1e6
+                )
+            )
+    finally:
+        reader.close()
+        db.stop()
+        client.disconnect()
+        mirror.shutdown()
+        server.shutdown()
+
+
+if __name__ == "__main__":
+    main()
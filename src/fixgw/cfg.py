@@ -115,8 +115,10 @@ def parse_yaml_with_metadata(yaml_string, filename=None):
 
 
 def from_yaml(
-    fs, bpath=None, fname=None, cfg=None, cfg_meta=None, bc=None, bcsource=None, preferences=None, metadata=None
+    fs, bpath=None, fname=None, cfg=None, cfg_meta=None, bc=None, bcsource=None, preferences=None, metadata=None, loaded=None
 ):
+    # If loaded is a list the name of every file that is read, including
+    # the includes, is appended to it
     if not cfg:
         if isinstance(fs, str):
             # Must be a string of yaml or a filename
@@ -128,6 +130,8 @@ def from_yaml(
                     bpath = fpath
                 with open(fs) as cf:
                     cfg, cfg_meta = parse_yaml_with_metadata(cf, fname)
+                if loaded is not None:
+                    loaded.append(fname)
 
                 if bc is None:
                     bc = []
@@ -227,7 +231,7 @@ def from_yaml(
                             else:
                                 raise ValueError(message(f"Cannot find include: '{f}'", cfg_meta['include'], findex , True))
                     sub, sub_meta = from_yaml(
-                        ifile, bpath, bc=bc, bcsource=bcsource, preferences=preferences, metadata=True
+                        ifile, bpath, bc=bc, bcsource=bcsource, preferences=preferences, metadata=True, loaded=loaded
                     )
                     if hasattr(sub, "items"):
                         log.debug(f"Processing items from file '{ifile}' from key:{key}")
@@ -252,6 +256,7 @@ def from_yaml(
                     bc=bc,
                     preferences=preferences,
                     metadata=True,
+                    loaded=loaded,
                 )
                 #print(new_meta[key])
             elif isinstance(val, list):
@@ -284,6 +289,8 @@ def from_yaml(
                             # Need to update this for metadata
                             with open(ifile) as cf:
                                 litems, cfg_litems = parse_yaml_with_metadata(cf, ifile)
+                            if loaded is not None:
+                                loaded.append(ifile)
                             if "items" in litems:
                                 if litems["items"] is not None:
                                     for ax, a in enumerate(litems["items"]):
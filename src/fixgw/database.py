@@ -18,25 +18,502 @@ import logging
 import threading
 import time
 import copy
+import sys
+import heapq
+import functools
+import itertools
+import hashlib
+import json
+import math
+import os
+import re
+from array import array
+from collections import deque
 from fixgw import cfg
 
 __database = {}
+_store = None
+_batch_callbacks = ()
+# The item callbacks and the batch callbacks are tuples that are never
+# changed in place.  Adding or removing a callback builds a new tuple and
+# swaps it in while holding _callback_lock, so the write path can call the
+# callbacks without any lock and never sees a list that is half changed.
+# _subscriptions is the reverse index from a subscriber's (name, function,
+# udata) tuple to the set of keys that it is subscribed to.  Removing a
+# subscriber from every key only has to visit the keys that it is on.
+_subscriptions = {}
+_callback_lock = threading.Lock()
+# Callbacks that were added with a pattern instead of a key.  Each entry is
+# (pattern, compiled regex, (name, function, udata)).  Items added to the
+# database later are given the callbacks of every pattern that they match.
+_patterns = ()
+_trie = None
+# Free threaded builds of Python (3.13t and later) can run the threads of
+# the gateway at the same time.  The lock free reads of the item store count
+# on the GIL to see the changes to a slot in the order they were made, so
+# without it the readers take the item lock like the writers do.
+FREE_THREADED = not getattr(sys, "_is_gil_enabled", lambda: True)()
+# Every change to an item's value or flags takes the next number from this
+# counter.  With the GIL next() on a count is atomic so no lock is needed to
+# share it.  Changes are also recorded in the journal of the item store, see
+# changes().
+_sequence = itertools.count(1)
+if FREE_THREADED:
+    _sequence_lock = threading.Lock()
 
+    def _next_sequence():
+        with _sequence_lock:
+            return next(_sequence)
 
-class UpdateThread(threading.Thread):
-    def __init__(self, func, delay):
-        super(UpdateThread, self).__init__()
-        self.delay = delay
-        self.func = func
+else:
+    _next_sequence = _sequence.__next__
+_dispatcher = None
+# When True, item callbacks are only called when the value or the flags
+# actually change.  Items can override this with 'notify' in the definition.
+_change_only = False
+_scheduler = None
+_scheduler_lock = threading.Lock()
+# The CallbackTimer while callback timing is turned on, otherwise None.
+# _timer_results keeps the last one so it can still be read after timing is
+# turned off.
+_timer = None
+_timer_results = None
+
+
+# When the dispatcher is running the item callbacks are not called by the
+# thread that wrote the value.  Instead each change is queued here and this
+# thread calls the subscribers.  Pending changes are kept in a dictionary
+# keyed by (subscriber, key) so a burst of writes to one key is coalesced to
+# the latest value for each subscriber.  Since there is only the one thread
+# calling the subscribers, the values for a key are always delivered in the
+# order that they were written.
+class Dispatcher(threading.Thread):
+    def __init__(self, size=10000):
+        super(Dispatcher, self).__init__(name="database dispatcher")
+        self.daemon = True
+        self.size = size
+        self.pending = {}
+        self.cond = threading.Condition()
+        self.running = True
+        self.busy = False
+        self.max_depth = 0
+        self.queued = 0
+        self.delivered = 0
+        self.coalesced = 0
+        self.dropped = 0
+        self.errors = 0
+
+    # func is the (name, function, udata) tuple from the item callbacks.  A
+    # key of None is used for batch callbacks where value is a dictionary.
+    def put(self, func, key, value):
+        k = (func, key)
+        with self.cond:
+            if k in self.pending:
+                if key is None:
+                    self.pending[k].update(value)
+                else:
+                    self.pending[k] = value
+                self.coalesced += 1
+                return
+            if len(self.pending) >= self.size:
+                self.dropped += 1
+                return
+            self.pending[k] = dict(value) if key is None else value
+            self.queued += 1
+            if len(self.pending) > self.max_depth:
+                self.max_depth = len(self.pending)
+            self.cond.notify()
+
+    def run(self):
+        while True:
+            with self.cond:
+                while self.running and not self.pending:
+                    self.cond.wait()
+                if not self.running:
+                    break
+                batch = self.pending
+                self.pending = {}
+                self.busy = True
+            timer = _timer
+            for (func, key), value in batch.items():
+                try:
+                    if timer is not None:
+                        timer.call(func, key, value)
+                    elif key is None:
+                        func[1](value, func[2])
+                    else:
+                        func[1](key, value, func[2])
+                except Exception as e:
+                    self.errors += 1
+                    log.error(
+                        f"Callback name: {func[0]}, fixid: {key}, udata: {func[2]} function: {func[1]} exception: {e}"
+                    )
+            with self.cond:
+                self.delivered += len(batch)
+                self.busy = False
+                self.cond.notify_all()
+
+    # Wait until everything that has been queued has been delivered
+    def wait(self, timeout=None):
+        with self.cond:
+            return self.cond.wait_for(
+                lambda: not self.pending and not self.busy, timeout
+            )
+
+    def stop(self):
+        with self.cond:
+            self.running = False
+            self.cond.notify_all()
+
+    def get_status(self):
+        with self.cond:
+            return {
+                "Queue Depth": len(self.pending),
+                "Max Queue Depth": self.max_depth,
+                "Queued": self.queued,
+                "Delivered": self.delivered,
+                "Coalesced": self.coalesced,
+                "Dropped": self.dropped,
+                "Errors": self.errors,
+            }
+
+
+# Times the callbacks.  Each (subscriber name, key) has a list of the
+# number of calls, the total and the longest time in seconds and the number
+# of exceptions.  The key is None for batch callbacks.
+class CallbackTimer(object):
+    def __init__(self):
+        self.lock = threading.Lock()
+        self.stats = {}
+        self.started = time.time()
+
+    # Calls the callback the same way the database does and records how long
+    # it took.  Exceptions are counted and passed on to the caller.
+    def call(self, func, key, value):
+        start = time.perf_counter()
+        try:
+            if key is None:
+                func[1](value, func[2])
+            else:
+                func[1](key, value, func[2])
+        except Exception:
+            self.record(func[0], key, time.perf_counter() - start, 1)
+            raise
+        self.record(func[0], key, time.perf_counter() - start, 0)
+
+    def record(self, name, key, elapsed, errors):
+        with self.lock:
+            s = self.stats.get((name, key))
+            if s is None:
+                self.stats[(name, key)] = [1, elapsed, elapsed, errors]
+                return
+            s[0] += 1
+            s[1] += elapsed
+            if elapsed > s[2]:
+                s[2] = elapsed
+            s[3] += errors
+
+    # Returns a copy of the statistics
+    def get_stats(self):
+        with self.lock:
+            return {k: tuple(v) for k, v in self.stats.items()}
+
+    # Totals for each subscriber and the keys that took the most time
+    def get_status(self, count=10):
+        stats = self.get_stats()
+        subscribers = {}
+        for (name, key), s in stats.items():
+            t = subscribers.setdefault(name, [0, 0.0, 0.0, 0])
+            t[0] += s[0]
+            t[1] += s[1]
+            t[2] = max(t[2], s[2])
+            t[3] += s[3]
+
+        def fmt(s):
+            return {
+                "Calls": s[0],
+                "Total ms": round(s[1] * 1000, 3),
+                "Max ms": round(s[2] * 1000, 3),
+                "Errors": s[3],
+            }
+
+        slowest = sorted(stats.items(), key=lambda x: x[1][1], reverse=True)
+        return {
+            "Enabled": _timer is self,
+            "Seconds": round(time.time() - self.started, 1),
+            "Subscribers": {name: fmt(s) for name, s in sorted(subscribers.items())},
+            "Slowest": {
+                "{} {}".format(name, "(batch)" if key is None else key): fmt(s)
+                for (name, key), s in slowest[:count]
+            },
+        }
+
+
+# Calls functions at a given time.  Everything runs in this one thread so
+# the functions need to be quick.
+class Scheduler(threading.Thread):
+    def __init__(self):
+        super(Scheduler, self).__init__(name="database scheduler")
+        self.daemon = True
+        self.heap = []
+        self.count = 0  # Keeps entries with the same time in order
+        self.cond = threading.Condition()
+
+    def call_at(self, when, func):
+        with self.cond:
+            heapq.heappush(self.heap, (when, self.count, func))
+            self.count += 1
+            if self.heap[0][1] == self.count - 1:
+                self.cond.notify()
 
     def run(self):
         while True:
-            time.sleep(self.delay)
-            self.func()
+            with self.cond:
+                while True:
+                    if self.heap:
+                        delay = self.heap[0][0] - time.time()
+                        if delay <= 0:
+                            func = heapq.heappop(self.heap)[2]
+                            break
+                        self.cond.wait(delay)
+                    else:
+                        self.cond.wait()
+            try:
+                func()
+            except Exception as e:
+                log.error("Scheduled function {} failed: {}".format(func, e))
+
+
+# The scheduler is started the first time that something needs it
+def _call_at(when, func):
+    global _scheduler
+    if _scheduler is None:
+        with _scheduler_lock:
+            if _scheduler is None:
+                t = Scheduler()
+                t.start()
+                _scheduler = t
+    _scheduler.call_at(when, func)
+
+
+# Bits used to store the quality flags in the ItemStore.flags array
+ANNUNCIATE = 0x01
+OLD = 0x02
+BAD = 0x04
+FAIL = 0x08
+SECFAIL = 0x10
+
+# Lookup table that converts the flags byte into the tuple of flags that
+# follows the value in (value, annunciate, old, bad, fail, secfail)
+FLAG_TUPLES = tuple(
+    tuple(bool(f & bit) for bit in (ANNUNCIATE, OLD, BAD, FAIL, SECFAIL))
+    for f in range(32)
+)
+
+# Items share a fixed pool of locks that is indexed by the item's slot.  This
+# keeps us from needing a Lock object for every item in the database.
+LOCK_STRIPES = 64
+
+# Returned by the modify function of db_item._write() when nothing should be
+# written
+UNCHANGED = object()
+
+# Most items have no auxiliary data so they all share this empty dictionary
+# until init_aux() gives them one of their own.  Nothing should ever add keys
+# to this directly.
+NO_AUX = {}
+
+# Time constant in seconds of the per item write rate.  Each write adds
+# 1 / RATE_WINDOW to the rate and the rate decays by e every RATE_WINDOW
+# seconds, so an item written steadily f times a second settles at f.
+RATE_WINDOW = 5.0
+
+# When an item with only a deadband stops changing by more than the deadband
+# the final value is sent once it has been steady for this many seconds
+DEADBAND_SETTLE = 0.5
+
+
+# Limits how often an item's callbacks are called.  Writes that are within
+# the deadband of the last value sent, or that come sooner than interval
+# seconds after it, are held back.  If anything was held back the latest
+# value is sent later by the scheduler so the final value is never lost.
+# Flag changes are always sent right away.
+class ItemFilter(object):
+    __slots__ = (
+        "deadband",
+        "interval",
+        "value",
+        "flags",
+        "time",
+        "last",
+        "pending",
+    )
+
+    def __init__(self, deadband=None, interval=None):
+        self.deadband = deadband
+        self.interval = interval
+        self.value = None
+        self.flags = None
+        self.time = 0.0
+        self.last = 0.0
+        self.pending = False
+
+    # Called with the item lock held.  Returns True if this write should
+    # be sent now.
+    def check(self, v, flags, now):
+        send = True
+        if flags == self.flags:
+            if self.deadband is not None and self.value is not None:
+                if abs(v - self.value) < self.deadband:
+                    send = False
+            if self.interval is not None and now - self.time < self.interval:
+                send = False
+        if send:
+            self.sent(v, flags, now)
+        else:
+            self.last = now
+        return send
+
+    def sent(self, v, flags, now):
+        self.value = v
+        self.flags = flags
+        self.time = now
+
+    # Time that the held back value should be sent
+    def due(self):
+        if self.interval is not None:
+            return self.time + self.interval
+        return self.last + DEADBAND_SETTLE
+
+
+# The ItemStore holds the data for all of the items in the database in
+# preallocated arrays that are indexed by an integer slot number.  Each
+# db_item is simply a view into one of these slots.
+class ItemStore(object):
+    def __init__(self, capacity=256):
+        self.count = 0
+        self.capacity = 0
+        # Values can be any of the item datatypes so they are kept in a list
+        self.values = []
+        self.flags = bytearray()
+        self.timestamps = array("d")
+        # Min and max are NaN when they have not been set
+        self.mins = array("d")
+        self.maxs = array("d")
+        self.tols = array("l")
+        # Sequence counters for the lock free reads.  Writers make the count
+        # odd while they change a slot and even again when they are done.
+        self.versions = array("Q")
+        # Number of value writes that were sent to the callbacks and the
+        # number that were suppressed because nothing changed
+        self.notified = array("Q")
+        self.suppressed = array("Q")
+        # Set when the item has a TOL expiry waiting in the scheduler
+        self.armed = bytearray()
+        # The global sequence number of the last change to each slot and
+        # the slot as it was before that change.  snapshot() uses these to
+        # see the database as it was at a single point in time.
+        self.seqs = array("Q")
+        self.prev_values = []
+        self.prev_flags = bytearray()
+        self.prev_timestamps = array("d")
+        self.prev_seqs = array("Q")
+        # Value writes per second, decayed with RATE_WINDOW, the time it was
+        # last updated and the name of the plugin that last wrote the value
+        self.rates = array("d")
+        self.rate_times = array("d")
+        self.writers = []
+        self.locks = [threading.Lock() for x in range(LOCK_STRIPES)]
+        self.allocate_lock = threading.Lock()
+        # Each store has its own journal so that items left over from an
+        # old database can not show up in the journal of a new one and
+        # sequence numbers from before init() always need a resync.
+        self.journal = Journal()
+        self.grow(capacity)
+
+    def grow(self, capacity):
+        n = capacity - self.capacity
+        if n <= 0:
+            return
+        nan = float("nan")
+        self.values.extend([None] * n)
+        self.flags.extend(bytes(n))
+        self.timestamps.extend([0.0] * n)
+        self.mins.extend([nan] * n)
+        self.maxs.extend([nan] * n)
+        self.tols.extend([0] * n)
+        self.versions.extend([0] * n)
+        self.notified.extend([0] * n)
+        self.suppressed.extend([0] * n)
+        self.armed.extend(bytes(n))
+        self.seqs.extend([0] * n)
+        self.prev_values.extend([None] * n)
+        self.prev_flags.extend(bytes(n))
+        self.prev_timestamps.extend([0.0] * n)
+        self.prev_seqs.extend([0] * n)
+        self.rates.extend([0.0] * n)
+        self.rate_times.extend([0.0] * n)
+        self.writers.extend([None] * n)
+        self.capacity = capacity
+
+    # Returns the next free slot, growing the arrays if we run out of room.
+    # Growing can move the arrays so every item lock is held while it
+    # happens.
+    def allocate(self):
+        with self.allocate_lock:
+            if self.count >= self.capacity:
+                for lock in self.locks:
+                    lock.acquire()
+                try:
+                    self.grow(max(self.capacity * 2, 1))
+                finally:
+                    for lock in self.locks:
+                        lock.release()
+            slot = self.count
+            self.count += 1
+        return slot
+
+    # Rough number of bytes used by the arrays themselves
+    def nbytes(self):
+        total = sys.getsizeof(self.values) + sys.getsizeof(self.flags)
+        total += sys.getsizeof(self.armed)
+        total += sys.getsizeof(self.prev_values) + sys.getsizeof(self.prev_flags)
+        total += sys.getsizeof(self.writers)
+        for a in [
+            self.timestamps,
+            self.mins,
+            self.maxs,
+            self.tols,
+            self.versions,
+            self.notified,
+            self.suppressed,
+            self.seqs,
+            self.prev_timestamps,
+            self.prev_seqs,
+            self.rates,
+            self.rate_times,
+        ]:
+            total += sys.getsizeof(a)
+        return total
 
 
 class db_item(object):
-    def __init__(self, key, dtype="float"):
+    __slots__ = (
+        "key",
+        "dtype",
+        "typestring",
+        "description",
+        "units",
+        "aux",
+        "callbacks",
+        "store",
+        "slot",
+        "lock",
+        "change_only",
+        "filter",
+    )
+
+    def __init__(self, key, dtype="float", store=None):
         types = {"float": float, "int": int, "bool": bool, "str": str}
         try:
             self.dtype = types[dtype]
@@ -44,26 +521,33 @@ class db_item(object):
         except:
             log.error("Unknown datatype - " + str(dtype))
             raise
+        if store is None:
+            store = ItemStore(1)
+        self.store = store
+        self.slot = store.allocate()
+        self.lock = store.locks[self.slot % LOCK_STRIPES]
         self.key = key
-        self._value = 0.0
+        store.values[self.slot] = 0.0
+        store.flags[self.slot] = 0
+        store.timestamps[self.slot] = time.time()
+        store.tols[self.slot] = (
+            100  # Time to live in milliseconds.  Any older and quality is bad
+        )
         self.description = ""
         self.units = ""
-        self._annunciate = False
-        self._old = False
-        self._bad = False
-        self._fail = False
-        self._secfail = False
-        self._max = None
-        self._min = None
-        self._tol = 100  # Time to live in milliseconds.  Any older and quality is bad
-        self.timestamp = time.time()
-        self.aux = {}
-        self.callbacks = []
-        self.lock = threading.Lock()
+        self.aux = NO_AUX
+        self.callbacks = ()
+        # None means use the database wide setting
+        self.change_only = None
+        self.filter = None
 
     # initialize the auxiliary data dictionary.  aux should be a comma delimited
     # string of the items to include.
     def init_aux(self, aux):
+        if not aux:
+            return
+        if self.aux is NO_AUX:
+            self.aux = {}
         for each in aux:
             self.aux[each.strip()] = None
 
@@ -71,24 +555,48 @@ class db_item(object):
         return list(self.aux.keys())
 
     def set_aux_value(self, name, value):
+        self._write_aux(name, value)
+        self.send_aux_callbacks(name)
+
+    # Stores the aux value without calling any of the callbacks.  The change
+    # goes in the journal as KEY.Aux.
+    def _write_aux(self, name, value):
         if name not in self.aux:
             log.error("No aux {0} for {1}".format(name, self.description))
             log.error("{0} contains aux keys {1}".format(self.key, self.get_aux_list()))
             raise KeyError("Aux name {} not found for item {}".format(name, self.key))
         try:
-            self.aux[name] = self.dtype(value)
-            if self.aux[name] < self._min:
-                self.aux[name] = self._min
-            if self.aux[name] > self._max:
-                self.aux[name] = self._max
+            x = self.dtype(value)
+            if self.dtype is not str:
+                # NaN bounds always compare False so unset limits are ignored
+                if x < self.store.mins[self.slot]:
+                    x = self.dtype(self.store.mins[self.slot])
+                if x > self.store.maxs[self.slot]:
+                    x = self.dtype(self.store.maxs[self.slot])
+            self.aux[name] = x
         except ValueError:
             if value == "None":
                 self.aux[name] = None
             else:
                 log.error("Bad Value for aux {0} {1}".format(name, value))
                 raise
-        for func in self.callbacks:
-            func[1]("{0}.{1}".format(self.key, name), self.aux[name], func[2])
+        self.store.journal.record("{0}.{1}".format(self.key, name))
+
+    def send_aux_callbacks(self, name):
+        callbacks = self.callbacks
+        if not callbacks:
+            return
+        key = "{0}.{1}".format(self.key, name)
+        if _dispatcher is not None:
+            for func in callbacks:
+                _dispatcher.put(func, key, self.aux[name])
+            return
+        timer = _timer
+        for func in callbacks:
+            if timer is not None:
+                timer.call(func, key, self.aux[name])
+            else:
+                func[1](key, self.aux[name], func[2])
 
     def get_aux_value(self, name):
         try:
@@ -98,92 +606,310 @@ class db_item(object):
             raise
 
     def send_callbacks(self):
-        for func in self.callbacks:
+        callbacks = self.callbacks
+        if not callbacks:
+            return
+        value = self.value
+        if _dispatcher is not None:
+            for func in callbacks:
+                _dispatcher.put(func, self.key, value)
+            return
+        timer = _timer
+        for func in callbacks:
             log.debug("Calling Callback for {0}".format(self.key))
             try:
-                func[1](self.key, self.value, func[2])
+                if timer is not None:
+                    timer.call(func, self.key, value)
+                else:
+                    func[1](self.key, value, func[2])
             except Exception as e:
                 log.error(
                     f"Callback name: {func[0]}, fixid: {self.key}, udata: {func[1]} function: {func[2]} exception: {e}"
                 )
 
+    @property
+    def timestamp(self):
+        return self.store.timestamps[self.slot]
+
+    @timestamp.setter
+    def timestamp(self, x):
+        store = self.store
+        slot = self.slot
+        with self.lock:
+            store.versions[slot] += 1
+            store.timestamps[slot] = x
+            store.versions[slot] += 1
+
     # return the age of the item in milliseconds
     @property
     def age(self):
-        return (time.time() - self.timestamp) * 1000
+        return (time.time() - self.store.timestamps[self.slot]) * 1000
 
+    # Reading the value takes no lock.  We copy the slot and then check that
+    # the version did not change while we were doing it, which would mean
+    # that a writer got in between and we have to try again.  Free threaded
+    # builds take the lock instead, see FREE_THREADED.
     @property
     def value(self):
-        with self.lock:
-            if self.tol != 0:
-                if self.age > self.tol:
-                    self._old = True
+        store = self.store
+        slot = self.slot
+        if FREE_THREADED:
+            with self.lock:
+                value = store.values[slot]
+                flags = store.flags[slot]
+                timestamp = store.timestamps[slot]
+                tol = store.tols[slot]
+        else:
+            versions = store.versions
+            while True:
+                v = versions[slot]
+                if v & 1:  # A write is in progress
+                    time.sleep(0)
+                    continue
+                value = store.values[slot]
+                flags = store.flags[slot]
+                timestamp = store.timestamps[slot]
+                tol = store.tols[slot]
+                if versions[slot] == v:
+                    break
+        if tol != 0:
+            if (time.time() - timestamp) * 1000 > tol:
+                flags |= OLD
+            else:
+                flags &= ~OLD
+        return (value,) + FLAG_TUPLES[flags]
+
+    # Converts whatever was written to the item into the value and the flags
+    # byte that should be stored in the slot.  flags is the current flags byte.
+    def _convert(self, x, flags):
+        dtype = self.dtype
+        store = self.store
+        if isinstance(x, tuple):
+            if len(x) < 4:
+                raise ValueError("Tuple too small for {}".format(self.key))
+            flags &= OLD | SECFAIL
+            if x[1]:
+                flags |= ANNUNCIATE
+            if x[2]:
+                flags |= BAD
+            if x[3]:
+                flags |= FAIL
+            if len(x) >= 5:
+                if x[4]:
+                    flags |= SECFAIL
                 else:
-                    self._old = False
-            return (
-                self._value,
-                self._annunciate,
-                self._old,
-                self._bad,
-                self._fail,
-                self._secfail,
+                    flags &= ~SECFAIL
+            x = x[0]
+        if dtype is bool:
+            v = (
+                x == True
+                or (isinstance(x, str) and x.lower() in ["yes", "true", "1"])
+                or (isinstance(x, int) and x != 0)
             )
+        else:
+            try:
+                if dtype is str and x is None:
+                    v = ""
+                else:
+                    v = dtype(x)
+            except ValueError:
+                log.error("Bad value '" + str(x) + "' given for " + self.description)
+                raise
+            if dtype is not str:
+                # bounds check and cap.  Unset limits are NaN and any
+                # comparison with NaN is False so they are ignored
+                if v < store.mins[self.slot]:
+                    v = dtype(store.mins[self.slot])
+                if v > store.maxs[self.slot]:
+                    v = dtype(store.maxs[self.slot])
+        return v, flags
 
     # We can set the value in the item with either a value of a tuple that
     # contains the property flags as well.  (value, annunc, bad, fail)
     @value.setter
     def value(self, x):
+        if self._write(x):
+            self.send_callbacks()
+
+    # The same as setting the value but the name of the plugin that wrote it
+    # is remembered for the write statistics
+    def write_from(self, writer, x):
+        if self._write(x, writer):
+            self.send_callbacks()
+
+    # Stores the value and flags without calling any of the callbacks.
+    # Returns True if the callbacks should be called.  In change only mode
+    # that is only when the value or flags that a reader would see changed.
+    # The timestamp is always updated.  bits is an optional (set, clear)
+    # pair of flag masks from update() that are applied last.  modify is an
+    # optional function that is given the current value with the lock held
+    # and returns what to write instead of x.  If it returns UNCHANGED
+    # nothing is written and None is returned.
+    def _write(self, x, writer=None, bits=None, modify=None):
+        store = self.store
+        slot = self.slot
+        change_only = self.change_only
+        if change_only is None:
+            change_only = _change_only
         with self.lock:
-            if isinstance(x, tuple):
-                if len(x) < 4:
-                    raise ValueError("Tuple too small for {}".format(self.key))
-                self._annunciate = x[1]
-                self._bad = x[2]
-                self._fail = x[3]
-                if len(x) >= 5:
-                    self._secfail = x[4]
-                x = x[0]
-            if self.dtype is bool:
-                self._value = (
-                    x == True
-                    or (isinstance(x, str) and x.lower() in ["yes", "true", "1"])
-                    or (isinstance(x, int) and x != 0)
-                )
+            if modify is not None:
+                x = modify(store.values[slot])
+                if x is UNCHANGED:
+                    return None
+            old_flags = store.flags[slot]
+            v, flags = self._convert(x, old_flags)
+            now = time.time()
+            tol = store.tols[slot]
+            if tol != 0:
+                flags &= ~OLD  # We were just written so we can't be old
+                # Readers see the old flag from the age of the item so
+                # being refreshed is a change if it had gone stale
+                if (now - store.timestamps[slot]) * 1000 > tol:
+                    old_flags |= OLD
+            if bits is not None:
+                flags = (flags | bits[0]) & ~bits[1]
+            notify = not change_only or flags != old_flags or v != store.values[slot]
+            f = self.filter
+            if f is not None and notify and not f.check(v, flags, now):
+                notify = False
+                if not f.pending:
+                    f.pending = True
+                    _call_at(f.due(), self._send_held)
+            # set the timestamp to right now
+            self._commit(v, flags, now)
+            if tol != 0 and not store.armed[slot]:
+                self._arm(now + tol / 1000.0)
+            if notify:
+                store.notified[slot] += 1
             else:
-                try:
-                    if self.dtype is str and x is None:
-                        self._value = ""
-                    else:
-                        self._value = self.dtype(x)
-                except ValueError:
-                    log.error(
-                        "Bad value '" + str(x) + "' given for " + self.description
-                    )
-                    raise
-                if self.dtype is not str:
-                    # bounds check and cap
-                    try:
-                        if self._value < self._min:
-                            self._value = self._min
-                    except:  # Probably only fails if min has not been set
-                        pass  # ignore at this point
-                    try:
-                        if self._value > self._max:
-                            self._value = self._max
-                    except:  # Probably only fails if max has not been set
-                        pass  # ignore at this point
-                    # set the timestamp to right now
-            self.timestamp = time.time()
+                store.suppressed[slot] += 1
+            dt = now - store.rate_times[slot]
+            store.rates[slot] = (
+                store.rates[slot] * math.exp(-dt / RATE_WINDOW) + 1.0 / RATE_WINDOW
+            )
+            store.rate_times[slot] = now
+            store.writers[slot] = writer
+        return notify
+
+    # Changes the slot.  The version is odd while this is going on so lock
+    # free readers will wait for us.  What was in the slot is saved for
+    # snapshot() and the change is given the next global sequence number.
+    # Must be called with the item lock held.
+    def _commit(self, v, flags, timestamp):
+        store = self.store
+        slot = self.slot
+        store.versions[slot] += 1
+        store.prev_values[slot] = store.values[slot]
+        store.prev_flags[slot] = store.flags[slot]
+        store.prev_timestamps[slot] = store.timestamps[slot]
+        store.prev_seqs[slot] = store.seqs[slot]
+        store.seqs[slot] = store.journal.record(self.key)
+        store.values[slot] = v
+        store.flags[slot] = flags
+        store.timestamps[slot] = timestamp
+        store.versions[slot] += 1
+
+    # Returns (writes, rate, writer).  writes is the number of times the
+    # value has been written, rate is the decayed writes per second as of
+    # now and writer is the name of the plugin that wrote it last, or None
+    # if it was not written through a plugin.
+    def write_statistics(self):
+        store = self.store
+        slot = self.slot
+        with self.lock:
+            writes = store.notified[slot] + store.suppressed[slot]
+            rate = store.rates[slot]
+            dt = time.time() - store.rate_times[slot]
+            writer = store.writers[slot]
+        return writes, rate * math.exp(-dt / RATE_WINDOW), writer
+
+    # Schedules a check of the item's age.  Only one check is ever waiting
+    # for each item.  Writes that come in before it runs just move the
+    # timestamp and the check re-arms itself for the new expiry time.
+    # Must be called with the item lock held.
+    def _arm(self, when):
+        self.store.armed[self.slot] = 1
+        _call_at(when, self._expire)
+
+    # Called by the scheduler when the item's TOL may have run out
+    def _expire(self):
+        store = self.store
+        slot = self.slot
+        with self.lock:
+            tol = store.tols[slot]
+            if tol == 0:
+                store.armed[slot] = 0
+                return
+            due = store.timestamps[slot] + tol / 1000.0
+            if time.time() <= due:
+                self._arm(due + 0.001)
+                return
+            store.armed[slot] = 0
+            flags = store.flags[slot]
+            if flags & OLD:
+                return
+            self._commit(store.values[slot], flags | OLD, store.timestamps[slot])
+        log.debug(f"item.old set True for fixid {self.key}")
         self.send_callbacks()
 
+    # Called by the scheduler to send a value that the filter held back
+    def _send_held(self):
+        store = self.store
+        slot = self.slot
+        f = self.filter
+        with self.lock:
+            due = f.due()
+            if due > time.time():
+                # More writes have come in since we were scheduled
+                _call_at(due, self._send_held)
+                return
+            f.pending = False
+            v = store.values[slot]
+            flags = store.flags[slot]
+            if v == f.value and flags == f.flags:
+                return
+            f.sent(v, flags, time.time())
+            store.notified[slot] += 1
+        self.send_callbacks()
+
+    # Sets up the deadband and minimum interval filter.  deadband is either
+    # a number or a string like "2%" for a percentage of the min to max range.
+    # interval is in milliseconds.
+    def set_filter(self, deadband=None, interval=None):
+        if deadband is not None:
+            if self.dtype not in (int, float):
+                raise ValueError("Deadband can only be used on numeric items")
+            if isinstance(deadband, str) and deadband.strip().endswith("%"):
+                if self.min is None or self.max is None:
+                    raise ValueError("Percent deadband needs a min and max")
+                pct = float(deadband.strip()[:-1])
+                deadband = (self.max - self.min) * pct / 100.0
+            else:
+                deadband = float(deadband)
+        if interval is not None:
+            interval = float(interval) / 1000.0
+        if deadband is None and interval is None:
+            self.filter = None
+        else:
+            self.filter = ItemFilter(deadband, interval)
+
+    # Converts a min or max limit to the float that we keep in the store
+    def _limit(self, x):
+        if x is None or self.dtype is str:
+            return float("nan")
+        return float(self.dtype(x))
+
     @property
     def min(self):
-        return self._min
+        x = self.store.mins[self.slot]
+        if x != x:  # NaN means no minimum
+            return None
+        return self.dtype(x)
 
     @min.setter
     def min(self, x):
         try:
-            self._min = self.dtype(x)
+            self.store.mins[self.slot] = self._limit(x)
         except ValueError:
             log.error(
                 "Bad minimum value '" + str(x) + "' given for " + self.description
@@ -191,12 +917,15 @@ class db_item(object):
 
     @property
     def max(self):
-        return self._max
+        x = self.store.maxs[self.slot]
+        if x != x:  # NaN means no maximum
+            return None
+        return self.dtype(x)
 
     @max.setter
     def max(self, x):
         try:
-            self._max = self.dtype(x)
+            self.store.maxs[self.slot] = self._limit(x)
         except ValueError:
             log.error(
                 "Bad maximum value '" + str(x) + "' given for " + self.description
@@ -204,86 +933,257 @@ class db_item(object):
 
     @property
     def tol(self):
-        return self._tol
+        return self.store.tols[self.slot]
 
     @tol.setter
     def tol(self, x):
         if x == "":
             x = 0
         try:
-            self._tol = int(x)
+            x = int(x)
         except ValueError:
             log.error("Time to live should be an integer for " + self.description)
+            return
+        store = self.store
+        slot = self.slot
+        with self.lock:
+            store.tols[slot] = x
+            if x != 0 and not store.armed[slot]:
+                self._arm(store.timestamps[slot] + x / 1000.0)
+
+    def _get_flag(self, bit):
+        return bool(self.store.flags[self.slot] & bit)
+
+    def _set_flag(self, bit, x):
+        store = self.store
+        slot = self.slot
+        with self.lock:
+            last = store.flags[slot]
+            flags = last | bit if x else last & ~bit
+            if flags != last:
+                self._commit(store.values[slot], flags, store.timestamps[slot])
+        if flags != last:
+            self.send_callbacks()
 
     @property
     def annunciate(self):
-        with self.lock:
-            return self._annunciate
+        return self._get_flag(ANNUNCIATE)
 
     @annunciate.setter
     def annunciate(self, x):
-        with self.lock:
-            last = self._annunciate
-            self._annunciate = bool(x)
-        if self._annunciate != last:
-            self.send_callbacks()
+        self._set_flag(ANNUNCIATE, x)
 
     @property
     def old(self):
-        with self.lock:
-            return self._old
+        return self.value[2]
 
     @old.setter
     def old(self, x):
-        with self.lock:
-            last = self._old
-            self._old = bool(x)
-        if self._old != last:
-            self.send_callbacks()
+        self._set_flag(OLD, x)
 
     @property
     def bad(self):
-        with self.lock:
-            return self._bad
+        return self._get_flag(BAD)
 
     @bad.setter
     def bad(self, x):
-        with self.lock:
-            last = self._bad
-            self._bad = bool(x)
-        if self._bad != last:
-            self.send_callbacks()
+        self._set_flag(BAD, x)
 
     @property
     def fail(self):
-        with self.lock:
-            return self._fail
+        return self._get_flag(FAIL)
 
     @fail.setter
     def fail(self, x):
-        with self.lock:
-            last = self._fail
-            self._fail = bool(x)
-        if self._fail != last:
-            self.send_callbacks()
+        self._set_flag(FAIL, x)
 
     @property
     def secfail(self):
-        with self.lock:
-            return self._fail
+        return self._get_flag(SECFAIL)
 
     @secfail.setter
     def secfail(self, x):
+        self._set_flag(SECFAIL, x)
+
+    # Changes the value and any of the flags together so that the callbacks
+    # are only called once.  Anything that is None is left as it is.  Giving
+    # a value is a write like setting the value property.  Giving only flags
+    # is the same as setting the flag properties.
+    def update(
+        self,
+        value=None,
+        annunciate=None,
+        old=None,
+        bad=None,
+        fail=None,
+        secfail=None,
+        writer=None,
+    ):
+        set_bits = 0
+        clear_bits = 0
+        for x, bit in (
+            (annunciate, ANNUNCIATE),
+            (old, OLD),
+            (bad, BAD),
+            (fail, FAIL),
+            (secfail, SECFAIL),
+        ):
+            if x is not None:
+                if x:
+                    set_bits |= bit
+                else:
+                    clear_bits |= bit
+        if value is not None:
+            if self._write(value, writer, (set_bits, clear_bits)):
+                self.send_callbacks()
+            return
+        store = self.store
+        slot = self.slot
         with self.lock:
-            last = self._secfail
-            self._secfail = bool(x)
-        if self._secfail != last:
+            last = store.flags[slot]
+            flags = (last | set_bits) & ~clear_bits
+            if flags != last:
+                self._commit(store.values[slot], flags, store.timestamps[slot])
+        if flags != last:
             self.send_callbacks()
 
+    # These read the value, change it and write it back while holding the
+    # item lock, so a write from another thread can not get in between and
+    # be lost.  The callbacks are called once like any other write.
+
+    # Adds delta to the value.  The result is capped at the min and max.
+    def increment(self, delta, writer=None):
+        if self._write(None, writer, modify=lambda v: v + delta):
+            self.send_callbacks()
+
+    # Turns a bool item on if it is off and off if it is on
+    def toggle(self, writer=None):
+        if self._write(None, writer, modify=lambda v: not v):
+            self.send_callbacks()
+
+    # Writes new only if the value is equal to expected.  Returns True if it
+    # was written.
+    def compare_and_set(self, expected, new, writer=None):
+        notify = self._write(
+            None, writer, modify=lambda v: new if v == expected else UNCHANGED
+        )
+        if notify:
+            self.send_callbacks()
+        return notify is not None
+
     def __str__(self):
         return "{} = {}".format(self.key, self.value)
 
 
+# A handle is a key that has already been looked up.  Plugins that write or
+# read the same keys over and over can get a handle once when they start and
+# then use get() and set() without the dictionary lookup and the key parsing
+# that read() and write() have to do every time.  The key can be a plain
+# item key or an aux value like "IAS.Vne".  set_aux() writes any aux value of
+# the item and update() changes the value and flags together.
+class ItemHandle(object):
+    __slots__ = ("key", "item", "aux", "writer", "get", "set")
+
+    def __init__(self, key, item, aux=None, writer=None):
+        self.key = key
+        self.item = item
+        self.aux = aux
+        self.writer = writer
+        if aux is not None:
+            self.get = functools.partial(item.get_aux_value, aux)
+            self.set = functools.partial(item.set_aux_value, aux)
+        elif writer is not None:
+            self.get = db_item.value.fget.__get__(item)
+            self.set = functools.partial(item.write_from, writer)
+        else:
+            # Bind the property functions so that calling them skips the
+            # attribute lookup on the item as well
+            self.get = db_item.value.fget.__get__(item)
+            self.set = db_item.value.fset.__get__(item)
+
+    def set_aux(self, name, value):
+        self.item.set_aux_value(name, value)
+
+    def update(self, value=None, **flags):
+        self.item.update(value, writer=self.writer, **flags)
+
+    def increment(self, delta):
+        self.item.increment(delta, self.writer)
+
+    def toggle(self):
+        self.item.toggle(self.writer)
+
+    def compare_and_set(self, expected, new):
+        return self.item.compare_and_set(expected, new, self.writer)
+
+    def __repr__(self):
+        return "ItemHandle({!r})".format(self.key)
+
+
+# Returns True if the key is a pattern.  '*' matches any number of characters
+# and '?' matches exactly one.  "EGT*" matches every key that starts with EGT.
+def is_pattern(key):
+    return "*" in key or "?" in key
+
+
+def _compile_pattern(pattern):
+    return re.compile(
+        "".join(
+            ".*" if ch == "*" else "." if ch == "?" else re.escape(ch) for ch in pattern
+        )
+        + "$"
+    )
+
+
+# Prefix tree of every key in the database.  Each node is a dictionary of the
+# characters that can come next.  The key that ends at a node is stored in it
+# under None.  Patterns are matched by walking down the tree so the literal
+# part at the front of a pattern like "CHT1?" only looks at the keys that
+# start with CHT1.
+class KeyTrie(object):
+    def __init__(self):
+        self.root = {}
+
+    def add(self, key):
+        node = self.root
+        for ch in key:
+            node = node.setdefault(ch, {})
+        node[None] = key
+
+    # Returns a sorted list of the keys that match the pattern
+    def match(self, pattern):
+        result = set()
+        self._match(self.root, pattern, 0, result)
+        return sorted(result)
+
+    def _match(self, node, pattern, i, result):
+        while i < len(pattern):
+            ch = pattern[i]
+            if ch == "*":
+                # Try the rest of the pattern here and at every node below
+                stack = [node]
+                while stack:
+                    n = stack.pop()
+                    if i == len(pattern) - 1:
+                        if None in n:
+                            result.add(n[None])
+                    else:
+                        self._match(n, pattern, i + 1, result)
+                    stack.extend(v for k, v in n.items() if k is not None)
+                return
+            if ch == "?":
+                for k, child in node.items():
+                    if k is not None:
+                        self._match(child, pattern, i + 1, result)
+                return
+            node = node.get(ch)
+            if node is None:
+                return
+            i += 1
+        if None in node:
+            result.add(node[None])
+
+
 # These are support functions for loading the initial database
 def check_for_variables(entry):
     for ch in entry["key"]:
@@ -311,7 +1211,7 @@ def add_item(entry):
 
     log.debug("Adding - {}".format(entry.get("description", "")))
     try:
-        newitem = db_item(entry["key"], entry["type"])
+        newitem = db_item(entry["key"], entry["type"], _store)
     except:
         log.error("Failure to add entry - " + entry["key"])
         return None
@@ -323,6 +1223,13 @@ def add_item(entry):
     x = entry.get("units", "")
     newitem.units = x if x is not None else ""
     newitem.tol = entry.get("tol", 0)
+    notify = entry.get("notify", None)
+    if notify == "change":
+        newitem.change_only = True
+    elif notify == "always":
+        newitem.change_only = False
+    elif notify is not None:
+        log.error("Unknown notify setting {} for {}".format(notify, entry["key"]))
     if entry["key"] == "LEADER":
         # Always set the fixid LEADER to True on startup
         # The quorum plugin will ensure the correct value gets set
@@ -331,52 +1238,216 @@ def add_item(entry):
     else:
         newitem.value = entry.get("initial", None)
     newitem.init_aux(entry.get("aux", []))
+    deadband = entry.get("deadband", None)
+    interval = entry.get("min_interval_ms", None)
+    if deadband is not None or interval is not None:
+        try:
+            newitem.set_filter(deadband, interval)
+        except ValueError as e:
+            log.error("Bad filter for {} - {}".format(entry["key"], e))
     __database[entry["key"]] = newitem
+    _trie.add(entry["key"])
+    with _callback_lock:
+        for pattern, regex, func in _patterns:
+            if regex.match(entry["key"]):
+                _add_callback(newitem, func)
     return newitem
 
 
-# Main database initialization function
-def init(f):
-    global log
-    global __database
-    global variables
-    __database = {}
-    variables = {}
-    log = logging.getLogger("database")
-    log.info("Initializing Database")
-
-    # Did not seem to be used: state = "var"
-    # Load database
-    db = cfg.from_yaml(f)
-    if "variables" in db:
-        for key, value in db["variables"].items():
-            variables[key] = int(value)
+# Returns the list of entries from the database definition with all of the
+# variables expanded.
+def expand_entries(db):
+    result = []
     for entry in db["entries"]:
         ch = check_for_variables(entry)
         if ch:
             try:
-                entries = expand_entry(entry, ch, variables[ch])
-                for each in entries:
-                    add_item(each)
+                result.extend(expand_entry(entry, ch, variables[ch]))
             except KeyError:
                 log.error("Variable {0} not set for {1}".format(ch, entry["key"]))
         else:
-            add_item(entry)
+            result.append(entry)
+    return result
+
+
+# The compiled cache holds the database definition after all of the includes
+# have been read and the variables have been expanded, along with a hash of
+# every file that it was built from.  If any of those files change the cache
+# is thrown away and built again.  Change CACHE_VERSION if the layout of the
+# cache or the way the entries are expanded ever changes.
+CACHE_VERSION = 1
+
+
+def _hash_file(fname):
+    with open(fname, "rb") as f:
+        return hashlib.sha256(f.read()).hexdigest()
+
+
+# Returns the cached definition or None if the cache is missing, unreadable
+# or out of date.
+def _load_cache(cache, fname):
+    try:
+        with open(cache) as f:
+            data = json.load(f)
+        if data["version"] != CACHE_VERSION:
+            return None
+        if os.path.abspath(fname) not in data["files"]:
+            return None
+        for each, digest in data["files"].items():
+            if _hash_file(each) != digest:
+                return None
+        return data
+    except (OSError, ValueError, KeyError, TypeError):
+        return None
+
+
+def _save_cache(cache, files, data):
+    data = dict(data)
+    data["version"] = CACHE_VERSION
+    data["files"] = {}
+    try:
+        for each in files:
+            data["files"][os.path.abspath(each)] = _hash_file(each)
+        # Write to a temporary file first so a half written cache is never read
+        tmp = "{}.{}.tmp".format(cache, os.getpid())
+        with open(tmp, "w") as f:
+            json.dump(data, f)
+        os.replace(tmp, cache)
+    except (OSError, TypeError, ValueError) as e:
+        log.warning("Unable to write database cache {} - {}".format(cache, e))
+
+
+# Main database initialization function.  f is the database definition file
+# or a stream.  If cache is the name of a file the compiled definition is
+# kept there and used instead of reading the definition when nothing in it
+# has changed.
+def init(f, cache=None):
+    global log
+    global __database
+    global _store
+    global variables
+    global _batch_callbacks
+    global _subscriptions
+    global _patterns
+    global _trie
+    global _change_only
+    global _timer
+    global _timer_results
+    __database = {}
+    _batch_callbacks = ()
+    _subscriptions = {}
+    _patterns = ()
+    _trie = KeyTrie()
+    # The callback timing is for the keys of the old database too
+    if _timer is not None:
+        _timer = CallbackTimer()
+    _timer_results = _timer
+    variables = {}
+    log = logging.getLogger("database")
+    log.info("Initializing Database")
 
-    t = UpdateThread(update, 1.0)
-    t.daemon = True
-    t.start()
+    use_cache = cache is not None and isinstance(f, str) and os.path.isfile(f)
+    data = _load_cache(cache, f) if use_cache else None
+    if data is not None:
+        log.debug("Using compiled database definition {}".format(cache))
+        variables = data["variables"]
+    else:
+        # Load database
+        files = []
+        db = cfg.from_yaml(f, loaded=files)
+        if "variables" in db:
+            for key, value in db["variables"].items():
+                variables[key] = int(value)
+        data = {
+            "variables": variables,
+            "notify": db.get("notify", "always"),
+            "entries": expand_entries(db),
+        }
+        if use_cache:
+            _save_cache(cache, files, data)
+    _change_only = data["notify"] == "change"
+    entries = data["entries"]
+    # We know how many items we need so allocate the storage all at once
+    _store = ItemStore(len(entries))
+    for entry in entries:
+        add_item(entry)
 
 
 # These are the public functions for interacting with the database
-def write(key, value):
+# writer is the name of the plugin that is writing, for the write
+# statistics.  See write_statistics().
+def write(key, value, writer=None):
     if "." in key:
         x = key.split(".")
         entry = __database[x[0]]
         entry.set_aux_value(x[1], value)
     else:
         entry = __database[key]
-        entry.value = value
+        entry.write_from(writer, value)
+
+
+# Atomic read, change and write of one item, see db_item.increment()
+def increment(key, delta, writer=None):
+    __database[key].increment(delta, writer)
+
+
+def toggle(key, writer=None):
+    __database[key].toggle(writer)
+
+
+# Returns True if the value was equal to expected and new was written
+def compare_and_set(key, expected, new, writer=None):
+    return __database[key].compare_and_set(expected, new, writer)
+
+
+# Writes a group of values at once.  values is a dictionary of key: value
+# pairs where the keys are the same as for write().  Every key is looked up
+# before anything is written so a bad key leaves the database unchanged.  All
+# of the values are stored before any item callbacks are called and then each
+# batch callback is called once with a dictionary of everything that was
+# written.
+def write_many(values, writer=None):
+    items = []
+    for key, value in values.items():
+        if "." in key:
+            x = key.split(".")
+            items.append((__database[x[0]], x[1], value))
+        else:
+            items.append((__database[key], None, value))
+    changed = []
+    for each in items:
+        item, aux, value = each
+        if aux is None:
+            if item._write(value, writer):
+                changed.append(each)
+        else:
+            item._write_aux(aux, value)
+            changed.append(each)
+    items = changed
+    for item, aux, value in items:
+        if aux is None:
+            item.send_callbacks()
+        else:
+            item.send_aux_callbacks(aux)
+    if _batch_callbacks and items:
+        batch = {}
+        for item, aux, value in items:
+            if aux is None:
+                batch[item.key] = item.value
+            else:
+                batch["{0}.{1}".format(item.key, aux)] = item.aux[aux]
+        timer = _timer
+        for func in _batch_callbacks:
+            if _dispatcher is not None:
+                _dispatcher.put(func, None, batch)
+                continue
+            try:
+                if timer is not None:
+                    timer.call(func, None, batch)
+                else:
+                    func[1](batch, func[2])
+            except Exception as e:
+                log.error("Batch callback {} failed: {}".format(func[0], e))
 
 
 def read(key):
@@ -392,39 +1463,389 @@ def get_raw_item(key):
     return __database[key]
 
 
-def listkeys():
+# Returns a handle for the key.  Raises KeyError if the key or the aux value
+# does not exist.  Values set through the handle are recorded as written by
+# writer.
+def get_handle(key, writer=None):
+    if "." in key:
+        x = key.split(".")
+        item = __database[x[0]]
+        if x[1] not in item.aux:
+            raise KeyError("Aux name {} not found for item {}".format(x[1], x[0]))
+        return ItemHandle(key, item, x[1])
+    return ItemHandle(key, __database[key], writer=writer)
+
+
+# Returns the (writes, rate, writer) statistics of one item.  See
+# db_item.write_statistics()
+def write_statistics(key):
+    return __database[key].write_statistics()
+
+
+# Returns a list of (key, writes, rate, writer) for the count items that are
+# being written the most right now, busiest first.
+def hot_keys(count=10):
+    result = []
+    for key, item in list(__database.items()):
+        writes, rate, writer = item.write_statistics()
+        if writes:
+            result.append((key, writes, rate, writer))
+    result.sort(key=lambda x: x[2], reverse=True)
+    return result[:count]
+
+
+# Raised by changes() when the changes that were asked for are no longer in
+# the journal.  The consumer has to read everything again, usually with
+# snapshot(), and carry on from the sequence number of the snapshot.
+class ResyncNeeded(Exception):
+    pass
+
+
+# Number of changes that the journal remembers
+JOURNAL_SIZE = 4096
+
+
+# A ring buffer of the most recent changes to the database.  Each entry is
+# the (sequence, key) of one change.  The sequence number is taken and the
+# entry added while holding the lock so the entries are always in order and
+# a consumer can never see a change before one with a lower number has been
+# added.  floor is the sequence number of the last change that has been
+# pushed out of the buffer.  Every change after it is still in the buffer.
+class Journal(object):
+    def __init__(self, size=JOURNAL_SIZE):
+        self.lock = threading.Lock()
+        self.entries = deque(maxlen=size)
+        self.floor = _next_sequence()
+
+    def record(self, key):
+        with self.lock:
+            seq = _next_sequence()
+            entries = self.entries
+            if len(entries) == entries.maxlen:
+                self.floor = entries[0][0]
+            entries.append((seq, key))
+        return seq
+
+    def last(self):
+        with self.lock:
+            if self.entries:
+                return self.entries[-1][0]
+            return self.floor
+
+    def since(self, seq):
+        keys = []
+        seen = set()
+        with self.lock:
+            if seq < self.floor:
+                raise ResyncNeeded(
+                    "Changes since {} are no longer in the journal".format(seq)
+                )
+            last = seq
+            for s, key in reversed(self.entries):
+                if s <= seq:
+                    break
+                if last == seq:
+                    last = s
+                if key not in seen:
+                    seen.add(key)
+                    keys.append(key)
+        keys.reverse()
+        return last, keys
+
+
+# Returns the sequence number of the last change to the database.  Passing
+# it to changes() later gives everything that changed after this call.
+def sequence():
+    return _store.journal.last()
+
+
+# Returns (sequence, keys) where keys is the list of keys that have changed
+# after the sequence number since, each one only once, in the order of their
+# last change.  The returned sequence is the one to pass in next time.
+# Raises ResyncNeeded if the journal no longer goes back that far.
+def changes(since):
+    return _store.journal.since(since)
+
+
+# The database as it was at one point in time.  values has the same
+# (value, annunciate, old, bad, fail, secfail) tuples that read() returns and
+# timestamps has the time that each item was last written.  sequence is the
+# global sequence number of the snapshot.  Every change with a lower number
+# is in it and none with a higher number are.
+class Snapshot(object):
+    __slots__ = ("sequence", "time", "values", "timestamps")
+
+    def __init__(self, sequence, time):
+        self.sequence = sequence
+        self.time = time
+        self.values = {}
+        self.timestamps = {}
+
+
+# How many times snapshot() tries without locks before it locks the database
+SNAPSHOT_RETRIES = 3
+
+
+# Copies the items as they were at sequence number seq into a Snapshot.
+# Returns None if an item has changed twice since then, because we only keep
+# the one value from before the last change.
+def _collect(items, seq, now):
+    snap = Snapshot(seq, now)
+    for item in items:
+        store = item.store
+        slot = item.slot
+        versions = store.versions
+        while True:
+            v = versions[slot]
+            if v & 1:  # A write is in progress
+                time.sleep(0)
+                continue
+            if store.seqs[slot] <= seq:
+                value = store.values[slot]
+                flags = store.flags[slot]
+                timestamp = store.timestamps[slot]
+            else:
+                value = store.prev_values[slot]
+                flags = store.prev_flags[slot]
+                timestamp = store.prev_timestamps[slot]
+                if store.prev_seqs[slot] > seq:
+                    return None
+            tol = store.tols[slot]
+            if versions[slot] == v:
+                break
+        if tol != 0:
+            if (now - timestamp) * 1000 > tol:
+                flags |= OLD
+            else:
+                flags &= ~OLD
+        snap.values[item.key] = (value,) + FLAG_TUPLES[flags]
+        snap.timestamps[item.key] = timestamp
+    return snap
+
+
+# Returns a Snapshot of the given keys, or of the whole database if keys is
+# None.  No locks are held while the items are copied unless writers keep
+# changing items faster than we can copy them, or the build is free threaded
+# and the lock free copy can not be trusted.
+def snapshot(keys=None):
+    if keys is None:
+        items = list(__database.values())
+    else:
+        items = [__database[key] for key in keys]
+    for attempt in range(0 if FREE_THREADED else SNAPSHOT_RETRIES):
+        snap = _collect(items, _next_sequence(), time.time())
+        if snap is not None:
+            return snap
+    # Hold every lock so nothing can change while we copy
+    locks = _store.locks if _store is not None else []
+    for lock in locks:
+        lock.acquire()
+    try:
+        return _collect(items, _next_sequence(), time.time())
+    finally:
+        for lock in locks:
+            lock.release()
+
+
+# Returns the list of keys.  If pattern is given only the keys that match
+# it are returned, see is_pattern().
+def listkeys(pattern=None):
+    if pattern is not None:
+        return _trie.match(pattern)
     return list(__database.keys())
 
 
+# These two must be called with _callback_lock held
+def _add_callback(item, func):
+    item.callbacks = item.callbacks + (func,)
+    _subscriptions.setdefault(func, set()).add(item.key)
+
+
+def _remove_callback(item, func):
+    item.callbacks = tuple(x for x in item.callbacks if x != func)
+    keys = _subscriptions.get(func)
+    if keys is not None:
+        keys.discard(item.key)
+        if not keys:
+            del _subscriptions[func]
+
+
 # Adds or redefines the callback function that will be called when
-# the items value is set.
+# the items value is set.  key can also be a pattern like "EGT*" or "CHT1?",
+# see is_pattern().  The callback is added to every key that matches and to
+# any matching keys that are added later.  Keys that the callback is already
+# on are not given a second copy.
 def callback_add(name, key, function, udata):
+    global _patterns
+    func = (name, function, udata)
+    if is_pattern(key):
+        with _callback_lock:
+            _patterns = _patterns + ((key, _compile_pattern(key), func),)
+            for each in _trie.match(key):
+                item = __database[each]
+                if func not in item.callbacks:
+                    _add_callback(item, func)
+        log.debug("Adding callback function for %s on pattern %s" % (name, key))
+        return
     item = __database[key]
-    item.callbacks.append((name, function, udata))
+    with _callback_lock:
+        _add_callback(item, func)
     log.debug("Adding callback function for %s on key %s" % (name, key))
 
 
+# Removes the callback from the key.  A key of "*" removes it from every key
+# that it was added to.  Any other pattern removes it from the keys that
+# match the pattern.
 def callback_del(name, key, function, udata):
+    global _patterns
+    func = (name, function, udata)
     if key == "*":
-        for each in __database:
-            try:
-                __database[each].callbacks.remove((name, function, udata))
+        with _callback_lock:
+            _patterns = tuple(x for x in _patterns if x[2] != func)
+            for each in _subscriptions.pop(func, ()):
+                item = __database[each]
+                item.callbacks = tuple(x for x in item.callbacks if x != func)
                 log.debug("Deleting callback function for %s on key %s" % (name, each))
-            except ValueError:
-                pass
-    else:
-        log.debug("Deleting callback function for %s on key %s" % (name, key))
+        return
+    if is_pattern(key):
+        with _callback_lock:
+            _patterns = tuple(x for x in _patterns if x[0] != key or x[2] != func)
+            for each in _trie.match(key):
+                _remove_callback(__database[each], func)
+        log.debug("Deleting callback function for %s on pattern %s" % (name, key))
+        return
+    item = __database[key]
+    log.debug("Deleting callback function for %s on key %s" % (name, key))
+    with _callback_lock:
+        callbacks = list(item.callbacks)
         try:
-            __database[key].callbacks.remove((name, function, udata))
+            callbacks.remove(func)
         except ValueError:
             log.debug("Callback not deleted because it was not found in the list")
+            return
+        if func in callbacks:
+            # The same callback can be added to a key more than once
+            item.callbacks = tuple(callbacks)
+        else:
+            _remove_callback(item, func)
+
+
+# Batch callbacks are called once for every call to write_many() with a
+# dictionary of all the keys that were written and their new values.
+def batch_callback_add(name, function, udata):
+    global _batch_callbacks
+    with _callback_lock:
+        _batch_callbacks = _batch_callbacks + ((name, function, udata),)
+    log.debug("Adding batch callback function for %s" % name)
+
+
+def batch_callback_del(name, function, udata):
+    global _batch_callbacks
+    log.debug("Deleting batch callback function for %s" % name)
+    with _callback_lock:
+        callbacks = list(_batch_callbacks)
+        try:
+            callbacks.remove((name, function, udata))
+        except ValueError:
+            log.debug("Batch callback not deleted because it was not found in the list")
+            return
+        _batch_callbacks = tuple(callbacks)
+
+
+# Starts the callback dispatcher thread.  From then on callbacks are queued
+# and called from the dispatcher instead of the thread that wrote the value.
+# size is the maximum number of pending (subscriber, key) changes.
+def start_dispatcher(size=10000):
+    global _dispatcher
+    if _dispatcher is not None:
+        return
+    d = Dispatcher(size)
+    d.start()
+    _dispatcher = d
+    log.info("Callback dispatcher started")
+
+
+def stop_dispatcher():
+    global _dispatcher
+    d = _dispatcher
+    if d is None:
+        return
+    # Go back to calling the callbacks directly before we stop the thread
+    _dispatcher = None
+    d.wait(1.0)
+    d.stop()
+    d.join(1.0)
+    log.info("Callback dispatcher stopped")
+
+
+# Blocks until all of the queued callbacks have been called.
+def dispatcher_wait(timeout=None):
+    d = _dispatcher
+    if d is None:
+        return True
+    return d.wait(timeout)
+
+
+# Returns a dictionary of dispatcher statistics or None if the dispatcher
+# is not running
+def dispatcher_status():
+    d = _dispatcher
+    if d is None:
+        return None
+    return d.get_status()
+
+
+# Turns timing of the callbacks on or off.  Turning it on starts over with
+# new statistics.  While it is off the callbacks are called the same way as
+# always and the only cost is checking that it is off.
+def callback_timing(enabled):
+    global _timer
+    global _timer_results
+    if enabled:
+        if _timer is None:
+            _timer = CallbackTimer()
+            _timer_results = _timer
+            log.info("Callback timing started")
+    elif _timer is not None:
+        _timer = None
+        log.info("Callback timing stopped")
+
+
+def callback_timing_enabled():
+    return _timer is not None
+
+
+# Returns a dictionary of callback timing statistics for the status or None
+# if timing has never been turned on.  raw=True returns the statistics for
+# every (subscriber name, key) as (calls, total, max, errors) tuples.
+def callback_statistics(raw=False):
+    t = _timer_results
+    if t is None:
+        return None
+    if raw:
+        return t.get_stats()
+    return t.get_status()
+
+
+# Returns the total number of value writes that were sent to the callbacks
+# and the number that were suppressed because nothing changed.
+def notify_statistics():
+    if _store is None:
+        return None
+    return {
+        "Notifications Delivered": sum(_store.notified),
+        "Notifications Suppressed": sum(_store.suppressed),
+    }
 
 
 # Maintenance Functions
+# Items are marked old by the scheduler as soon as their TOL runs out.  This
+# does the same thing by checking every item and is only needed if the
+# timestamps have been changed directly.
 def update():
     # If database is not fully loaded do nothing to prevent
     # exception from 'dictionary changed size during iteration'
-    if 'ZZLOADER' not in __database:
+    if "ZZLOADER" not in __database:
         log.debug("tol updated attempted before database is fully loaded")
         return
     for key in __database:
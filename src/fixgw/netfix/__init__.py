@@ -60,6 +60,37 @@ class Report:
         return "{}:{}".format(self.desc, self.units)
 
 
+# Splits the bytes that come from a socket into lines.  The data is kept in
+# a bytearray until a newline comes in and only whole lines are decoded, so
+# a UTF-8 character that is split between two reads is put back together.
+# feed() returns the lines that are complete without the newlines.  A line
+# that is not valid UTF-8 is returned as None.
+class LineFramer(object):
+    def __init__(self):
+        self.buffer = bytearray()
+
+    def feed(self, data):
+        buff = self.buffer
+        buff += data
+        end = buff.rfind(b"\n")
+        if end < 0:
+            return []
+        chunk = buff[:end]
+        del buff[: end + 1]
+        try:
+            # A newline byte is never part of a multibyte UTF-8 character
+            # so the lines can be split after decoding
+            return chunk.decode("utf-8").split("\n")
+        except UnicodeDecodeError:
+            lines = []
+            for line in chunk.split(b"\n"):
+                try:
+                    lines.append(line.decode("utf-8"))
+                except UnicodeDecodeError:
+                    lines.append(None)
+            return lines
+
+
 # This is the main communication thread of the FIX Gateway client.
 class ClientThread(threading.Thread):
     def __init__(self, host, port):
@@ -128,7 +159,7 @@ class ClientThread(threading.Thread):
                 log.debug("Connected to {0}:{1}".format(self.host, self.port))
                 self.connectedState(True)
 
-                buff = ""
+                framer = LineFramer()
                 while True:
                     try:
                         data = self.s.recv(1024)
@@ -146,26 +177,17 @@ class ClientThread(threading.Thread):
                             self.connectedState(False)
                             break
                         else:
-                            try:
-                                dstring = data.decode("utf-8")
-                            except UnicodeDecodeError:
-                                self.log.debug(
-                                    "Bad Message from {0}".format(self.addr[0])
-                                )
-                            for d in dstring:
-                                if d == "\n":
-                                    try:
-                                        self.handle_request(buff)
-                                    except Exception as e:
-                                        # TODO: Print file and line number here.  Use traceback module
-                                        log.error(
-                                            "Error handling request {} - {}".format(
-                                                buff, e
-                                            )
-                                        )
-                                    buff = ""
-                                else:
-                                    buff += d
+                            for line in framer.feed(data):
+                                if line is None:
+                                    log.debug("Bad Message from {0}".format(self.host))
+                                    continue
+                                try:
+                                    self.handle_request(line)
+                                except Exception as e:
+                                    # TODO: Print file and line number here.  Use traceback module
+                                    log.error(
+                                        "Error handling request {} - {}".format(line, e)
+                                    )
             if self.getout:
                 self.connectedState(False)
                 self.s.close()
@@ -0,0 +1,194 @@
+# Client side of the shared memory mirror of the FIX-Gateway database.  The
+# shared_memory plugin publishes the value and quality flags of every item
+# into a shared memory segment.  Programs on the same computer as the
+# gateway can read them with SharedDatabase without any network traffic.
+#
+# The segment starts with a header, then a JSON directory that gives the
+# type and offset of each key and then one slot for each key.  Each slot is
+# a sequence counter, the timestamp, the flags and then the value.  The
+# gateway makes the sequence counter odd while it changes a slot and even
+# again when it is done, so a reader that sees the same even count before
+# and after reading a slot knows that it got a consistent copy.  Every
+# change to any slot also adds one to the change counter in the header so
+# a reader can tell if anything at all has changed by reading one number.
+
+import json
+import struct
+import time
+from multiprocessing import shared_memory
+
+try:
+    from multiprocessing import resource_tracker
+except ImportError:
+    resource_tracker = None
+
+DEFAULT_NAME = "fixgw"
+MAGIC = b"FIXSHM01"
+VERSION = 1
+
+# magic, version, directory length, data offset, change counter
+HEADER = struct.Struct("<8sIII4xQ")
+CHANGES_OFFSET = 24
+CHANGES = struct.Struct("<Q")
+# sequence, timestamp, flags
+SLOT = struct.Struct("<QdB7x")
+SEQUENCE = struct.Struct("<Q")
+# Strings are stored as a length and up to STRING_SIZE bytes of UTF-8
+STRING_SIZE = 62
+STRING = struct.Struct("<H{}s".format(STRING_SIZE))
+VALUES = {
+    "float": struct.Struct("<d"),
+    "int": struct.Struct("<q"),
+    "bool": struct.Struct("<q"),
+    "str": STRING,
+}
+
+# These are the same bits that the database uses
+ANNUNCIATE = 0x01
+OLD = 0x02
+BAD = 0x04
+FAIL = 0x08
+SECFAIL = 0x10
+
+# How many times a slot is read again before giving up when the gateway
+# keeps changing it
+READ_RETRIES = 1000
+
+
+class ReadError(Exception):
+    pass
+
+
+def _align(x):
+    return (x + 7) & ~7
+
+
+# Lays out a segment for the list of (key, type) pairs.  Returns
+# (directory, data, offsets, size) where directory is the JSON bytes to put
+# after the header, data is the offset of the first slot, offsets is a
+# dictionary of the offset of each key's slot and size is the total size of
+# the segment.  The slots are in the same order as the keys.
+def layout(items):
+    offset = 0
+    entries = []
+    for key, dtype in items:
+        entries.append([key, dtype, offset])
+        offset += SLOT.size + _align(VALUES[dtype].size)
+    directory = json.dumps({"version": VERSION, "keys": entries}).encode()
+    data = _align(HEADER.size + len(directory))
+    offsets = {key: data + x for key, dtype, x in entries}
+    return directory, data, offsets, data + offset
+
+
+# Names of the segments that were created by this process.  The publisher
+# adds to this.
+owned = set()
+
+
+# Opens the segment without letting Python remove it when this process
+# exits.  Before Python 3.13 the resource tracker would unlink any segment
+# that a process opened, even one that belongs to the gateway.  Segments
+# that this process created are left alone so the owner can unlink them.
+def attach(name):
+    try:
+        return shared_memory.SharedMemory(name=name, track=False)
+    except TypeError:
+        shm = shared_memory.SharedMemory(name=name)
+        if resource_tracker is not None and name not in owned:
+            try:
+                resource_tracker.unregister(shm._name, "shared_memory")
+            except Exception:
+                pass
+        return shm
+
+
+# Read only view of the database that the gateway has published in shared
+# memory.  read() returns the same (value, annunciate, old, bad, fail,
+# secfail) tuples as the gateway's database.read().  poll() returns the keys
+# that have changed since the last time it was called.
+class SharedDatabase(object):
+    def __init__(self, name=DEFAULT_NAME):
+        self.shm = attach(name)
+        self.buf = self.shm.buf
+        magic, version, dirlen, data, changes = HEADER.unpack_from(self.buf, 0)
+        if magic != MAGIC or version != VERSION:
+            self.close()
+            raise ReadError("{} is not a FIX-Gateway database".format(name))
+        directory = json.loads(bytes(self.buf[HEADER.size : HEADER.size + dirlen]))
+        self.slots = {}
+        for key, dtype, offset in directory["keys"]:
+            self.slots[key] = (data + offset, VALUES[dtype], dtype)
+        self.seen = dict.fromkeys(self.slots, 0)
+        self.last_changes = None
+
+    def close(self):
+        if self.shm is not None:
+            self.buf = None
+            self.shm.close()
+            self.shm = None
+
+    def get_item_list(self):
+        return list(self.slots.keys())
+
+    # The number of changes that the gateway has made to the segment
+    def changes(self):
+        return CHANGES.unpack_from(self.buf, CHANGES_OFFSET)[0]
+
+    # Returns (sequence, timestamp, flags, value) of one slot
+    def _read(self, key):
+        offset, fmt, dtype = self.slots[key]
+        buf = self.buf
+        for i in range(READ_RETRIES):
+            seq = SEQUENCE.unpack_from(buf, offset)[0]
+            if seq & 1:
+                time.sleep(0)
+                continue
+            seq, timestamp, flags = SLOT.unpack_from(buf, offset)
+            value = fmt.unpack_from(buf, offset + SLOT.size)
+            if SEQUENCE.unpack_from(buf, offset)[0] == seq:
+                break
+        else:
+            raise ReadError("Unable to read {}".format(key))
+        if dtype == "str":
+            value = value[1][: value[0]].decode(errors="replace")
+        elif dtype == "bool":
+            value = bool(value[0])
+        else:
+            value = value[0]
+        return seq, timestamp, flags, value
+
+    def read(self, key):
+        seq, timestamp, flags, value = self._read(key)
+        return (
+            value,
+            bool(flags & ANNUNCIATE),
+            bool(flags & OLD),
+            bool(flags & BAD),
+            bool(flags & FAIL),
+            bool(flags & SECFAIL),
+        )
+
+    def get_value(self, key):
+        return self._read(key)[3]
+
+    # Time that the gateway last wrote the key
+    def timestamp(self, key):
+        return self._read(key)[1]
+
+    # Returns the list of keys that have changed since the last call.  The
+    # first call returns every key that has been written.  This only looks
+    # at the slots when the change counter has moved.
+    def poll(self):
+        changes = self.changes()
+        if changes == self.last_changes:
+            return []
+        self.last_changes = changes
+        changed = []
+        buf = self.buf
+        seen = self.seen
+        for key, (offset, fmt, dtype) in self.slots.items():
+            seq = SEQUENCE.unpack_from(buf, offset)[0]
+            if seq != seen[key]:
+                seen[key] = seq
+                changed.append(key)
+        return changed
@@ -72,7 +72,39 @@ class PluginBase(object):
         return database.read(key)
 
     def db_write(self, key, value):
-        database.write(key, value)
+        database.write(key, value, self.name)
+
+    # values is a dictionary of key: value pairs that are all written
+    # before any callbacks are called
+    def db_write_many(self, values):
+        database.write_many(values, self.name)
+
+    # These change the value based on what it is now without any other
+    # writer getting in between
+    def db_increment(self, key, delta):
+        database.increment(key, delta, self.name)
+
+    def db_toggle(self, key):
+        database.toggle(key, self.name)
+
+    def db_compare_and_set(self, key, expected, new):
+        return database.compare_and_set(key, expected, new, self.name)
+
+    # Looks the key up once and returns a handle with get() and set()
+    # methods for plugins that use the same keys many times
+    def db_get_handle(self, key):
+        return database.get_handle(key, self.name)
+
+    # Returns a database.Snapshot of the keys, or of every key if keys is
+    # None, as they all were at the same point in time
+    def db_snapshot(self, keys=None):
+        return database.snapshot(keys)
+
+    def db_sequence(self):
+        return database.sequence()
+
+    def db_changes(self, since):
+        return database.changes(since)
 
     def db_list(self):
         return database.listkeys()
@@ -87,6 +119,12 @@ class PluginBase(object):
     def db_callback_del(self, key, function, udata=None):
         database.callback_del(self.name, key, function, udata)
 
+    def db_batch_callback_add(self, function, udata=None):
+        database.batch_callback_add(self.name, function, udata)
+
+    def db_batch_callback_del(self, function, udata=None):
+        database.batch_callback_del(self.name, function, udata)
+
     # This method should be reimplemented in the child class
     # It should return a dictionary of status information
     def get_status(self):
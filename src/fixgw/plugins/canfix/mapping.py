@@ -135,7 +135,7 @@ class Mapping(object):
     # from the CAN-FIX port to the FIXGW Database
     def getInputFunction(self, dbKey):
         try:
-            dbItem = database.get_raw_item(dbKey)
+            handle = database.get_handle(dbKey)
         except KeyError:
             # Need to improve this, maybe the user made a typo, they might not ever know.
             # Currently the code has been updated to allow this because we want to
@@ -158,8 +158,8 @@ class Mapping(object):
 
         def InputFunc(cfpar):
             if output_exclude:
-                self.output_mapping[dbItem.key]["exclude"] = True
-                self.output_mapping[dbItem.key]["lastValue"] = cfpar.value
+                self.output_mapping[dbKey]["exclude"] = True
+                self.output_mapping[dbKey]["lastValue"] = cfpar.value
             if cfpar.meta:
                 try:
                     # Check to see if we have a replacement string in the dictionary
@@ -167,12 +167,10 @@ class Mapping(object):
                         m = self.meta_replacements_in[cfpar.meta]
                     else:  # Just use the one we were sent
                         m = cfpar.meta
-                    dbItem.set_aux_value(m, cfpar.value)
+                    handle.set_aux(m, cfpar.value)
                 except:
                     self.recvinvalidcount += 1
-                    self.log.warning(
-                        "Problem setting Aux Value for {0}".format(dbItem.key)
-                    )
+                    self.log.warning("Problem setting Aux Value for {0}".format(dbKey))
             else:
                 if (
                     cfpar.value is not None
@@ -180,11 +178,13 @@ class Mapping(object):
                     and cfpar.quality is not None
                     and cfpar.failure is not None
                 ):
-                    dbItem.value = (
-                        cfpar.value,
-                        cfpar.annunciate,
-                        cfpar.quality,
-                        cfpar.failure,
+                    handle.set(
+                        (
+                            cfpar.value,
+                            cfpar.annunciate,
+                            cfpar.quality,
+                            cfpar.failure,
+                        )
                     )
                 else:
                     self.recvinvalidcount += 1
@@ -194,6 +194,12 @@ class Mapping(object):
     # Returns a closure that should be used as the callback for database item
     # changes that should be written to the CAN Bus
     def getOutputFunction(self, bus, dbKey, node):
+        # Every bit of a switch output is read each time so look them up now
+        if self.output_mapping[dbKey]["switch"]:
+            switches = [
+                database.get_handle(k) for k in self.output_mapping[dbKey]["fixids"]
+            ]
+
         def outputCallback(key, value, udata):
             m = self.output_mapping[dbKey]
             self.log.debug(f"Output {dbKey}: {value[0]}")
@@ -221,7 +227,7 @@ class Mapping(object):
                         if b + bt + 1 > len(m["fixids"]):
                             break
                         else:
-                            if database.get_raw_item(m["fixids"][b + bt]).value[0]:
+                            if switches[b + bt].get()[0]:
                                 val[b] = val[b] | (1 << bt)
                                 # Do not need to set 0 since that is default
                     if b + bt + 1 > len(m["fixids"]):
@@ -356,14 +362,14 @@ class Mapping(object):
             ids = dbKeys.split(",")
             skip = 1
             # allow 1 or more encoders
-            encoders.append(database.get_raw_item(ids[0].strip()))
+            encoders.append(database.get_handle(ids[0].strip()))
             if len(ids) > 1:
-                encoders.append(database.get_raw_item(ids[1].strip()))
+                encoders.append(database.get_handle(ids[1].strip()))
                 skip += 1
             # Allow 0 to 8 buttons too
             if len(ids) > 2 and len(ids) < 11:
                 for bc, btn in enumerate(ids[2:]):
-                    buttons.append(database.get_raw_item(ids[bc + skip].strip()))
+                    buttons.append(database.get_handle(ids[bc + skip].strip()))
 
         except KeyError:
             return None
@@ -371,11 +377,11 @@ class Mapping(object):
         def InputFunc(cfpar):
             for ec, e in enumerate(encoders):
                 if add:
-                    encoders[ec].value = encoders[ec].value[0] + cfpar.value[ec]
+                    e.increment(cfpar.value[ec])
                 else:
-                    encoders[ec].value = cfpar.value[ec]
+                    e.set(cfpar.value[ec])
             for bc, b in enumerate(buttons):
-                b.value = cfpar.value[2][bc]
+                b.set(cfpar.value[2][bc])
 
         return InputFunc
 
@@ -384,7 +390,7 @@ class Mapping(object):
             switches = []
             ids = dbKeys.split(",")
             for each in ids:
-                switches.append(database.get_raw_item(each.strip()))
+                switches.append(database.get_handle(each.strip()))
             toggles = dict()
             if toggle:
                 ids = toggle.split(",")
@@ -407,17 +413,18 @@ class Mapping(object):
 
                 if toggles.get(each.key, False):
                     if x[byte][bit]:
+                        # toggle only when we receive True.  lastValue has
+                        # to be set first so that the output callback does
+                        # not send the change back out.
                         if output_exclude:
-                            self.output_mapping[each.key]["lastValue"] = not each.value[
-                                0
-                            ]
-                        # toggle only when we receive True
-                        each.value = not each.value[0]
+                            current = each.get()[0]
+                            self.output_mapping[each.key]["lastValue"] = not current
+                        each.toggle()
                 else:
                     if output_exclude:
                         self.output_mapping[each.key]["lastValue"] = x[byte][bit]
 
-                    each.value = x[byte][bit]
+                    each.set(x[byte][bit])
                 bit += 1
                 if bit >= 8:
                     bit = 0
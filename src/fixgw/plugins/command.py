@@ -19,6 +19,7 @@
 import cmd
 import threading
 import fixgw.plugin as plugin
+import fixgw.database as database
 import fixgw.status as status
 
 
@@ -78,9 +79,27 @@ class Command(cmd.Cmd):
                     print("  {0} = {1}".format(each, str(x.aux[each])))
             for each in x.callbacks:
                 print("Callback function defined: {0}".format(each[0]))
+            writes, rate, writer = x.write_statistics()
+            print("Writes: {0}".format(writes))
+            print("Rate:   {0:.2f}/s".format(rate))
+            print("Writer: {0}".format(writer))
         except KeyError:
             print(("Unknown Key " + args[0]))
 
+    def do_top(self, line):
+        """top [count]\nList the keys that are being written the most"""
+        args = line.split()
+        try:
+            count = int(args[0]) if args else 10
+        except ValueError:
+            print("Bad count " + args[0])
+            return
+        print(
+            "{0:<16} {1:>10} {2:>10}  {3}".format("Key", "Writes", "Rate/s", "Writer")
+        )
+        for key, writes, rate, writer in database.hot_keys(count):
+            print("{0:<16} {1:>10} {2:>10.2f}  {3}".format(key, writes, rate, writer))
+
     def do_sub(self, line):
         """Subscribe\nSubscribe to updates"""
         args = line.split(" ")
@@ -21,6 +21,7 @@
 #  minimums or maximums and the like.  Specific calculations for things like
 #  True Airspeed could be done also.
 
+import threading
 import fixgw.plugin as plugin
 from fixgw.database import read
 import fixgw.quorum as quorum
@@ -68,13 +69,13 @@ def altPressure(inputs, output, require_leader):
         baro = list(vals)[0]
         msl = list(vals)[1]
         pa = vals[msl][0] + (145442.2 * (1 - (vals[baro][0] / 29.92126) ** 0.190261))
-        o.value = pa
-        o.fail = flag_fail
-        if o.fail:
-            o.value = 0.0
-        o.bad = flag_bad
-        o.old = flag_old
-        o.secfail = flag_secfail
+        o.update(
+            0.0 if flag_fail else pa,
+            old=flag_old,
+            bad=flag_bad,
+            fail=flag_fail,
+            secfail=flag_secfail,
+        )
 
     return func
 
@@ -122,13 +123,13 @@ def altDensity(inputs, output, require_leader):
         oat = list(vals)[2]
         st = 15 - (1.98 * (vals[talt][0]) / 1000)
         da = vals[palt][0] + (120 * (vals[oat][0] - st))
-        o.value = da
-        o.fail = flag_fail
-        if o.fail:
-            o.value = 0.0
-        o.bad = flag_bad
-        o.old = flag_old
-        o.secfail = flag_secfail
+        o.update(
+            0.0 if flag_fail else da,
+            old=flag_old,
+            bad=flag_bad,
+            fail=flag_fail,
+            secfail=flag_secfail,
+        )
 
     return func
 
@@ -170,13 +171,13 @@ def averageFunction(inputs, output, require_leader):
                 flag_fail = True
             if vals[each][5]:
                 flag_secfail = True
-        o.value = arrsum / len(vals)
-        o.fail = flag_fail
-        if o.fail:
-            o.value = 0.0
-        o.bad = flag_bad
-        o.old = flag_old
-        o.secfail = flag_secfail
+        o.update(
+            0.0 if flag_fail else arrsum / len(vals),
+            old=flag_old,
+            bad=flag_bad,
+            fail=flag_fail,
+            secfail=flag_secfail,
+        )
 
     return func
 
@@ -192,11 +193,10 @@ def encoderFunction(inputs, output, multiplier, require_leader):
 
         o = parent.db_get_item(output)
         try:
-            total = (value[0] * multiplier) + o.value[0]
+            o.increment(value[0] * multiplier, parent.name)
         except TypeError:
             print(f"WTF Encoder output {output}")
             raise
-        o.value = total
 
     return func
 
@@ -251,13 +251,13 @@ def sumFunction(inputs, output, require_leader):
                 print("WTF {} {}".format(key, value))
                 raise
         o = parent.db_get_item(output)
-        o.value = arrsum
-        o.fail = flag_fail
-        if o.fail:
-            o.value = 0.0
-        o.bad = flag_bad
-        o.old = flag_old
-        o.secfail = flag_secfail
+        o.update(
+            0.0 if flag_fail else arrsum,
+            old=flag_old,
+            bad=flag_bad,
+            fail=flag_fail,
+            secfail=flag_secfail,
+        )
 
     return func
 
@@ -302,13 +302,13 @@ def maxFunction(inputs, output, require_leader):
                 flag_fail = True
             if vals[each][5]:
                 flag_secfail = True
-        o.value = vmax
-        o.fail = flag_fail
-        if o.fail:
-            o.value = 0.0
-        o.bad = flag_bad
-        o.old = flag_old
-        o.secfail = flag_secfail
+        o.update(
+            0.0 if flag_fail else vmax,
+            old=flag_old,
+            bad=flag_bad,
+            fail=flag_fail,
+            secfail=flag_secfail,
+        )
 
     return func
 
@@ -353,13 +353,13 @@ def minFunction(inputs, output, require_leader):
                 flag_fail = True
             if vals[each][5]:
                 flag_secfail = True
-        o.value = vmin
-        o.fail = flag_fail
-        if o.fail:
-            o.value = 0.0
-        o.bad = flag_bad
-        o.old = flag_old
-        o.secfail = flag_secfail
+        o.update(
+            0.0 if flag_fail else vmin,
+            old=flag_old,
+            bad=flag_bad,
+            fail=flag_fail,
+            secfail=flag_secfail,
+        )
 
     return func
 
@@ -404,13 +404,13 @@ def spanFunction(inputs, output, require_leader):
             if vals[each][5]:
                 flag_secfail = True
         o = parent.db_get_item(output)
-        o.value = vmax - vmin
-        o.fail = flag_fail
-        if o.fail:
-            o.value = 0.0
-        o.bad = flag_bad
-        o.old = flag_old
-        o.secfail = flag_secfail
+        o.update(
+            0.0 if flag_fail else vmax - vmin,
+            old=flag_old,
+            bad=flag_bad,
+            fail=flag_fail,
+            secfail=flag_secfail,
+        )
 
     return func
 
@@ -421,6 +421,10 @@ AOA_acc_history = list()
 AOA_vs_history = list()
 AOA_heading_history = list()
 AOA_lift_constant = None
+# The histories above are shared by every AOA function and their callbacks
+# can be called from any thread, so only one runs at a time.  It is
+# reentrant because writing the output can call back into us.
+AOA_lock = threading.RLock()
 
 
 def AOAFunction(inputs, output, require_leader):
@@ -444,6 +448,10 @@ def AOAFunction(inputs, output, require_leader):
     def func(key, value, parent):
         if not quorum.leader and require_leader:
             return  # Only the leader can do calculations
+        with AOA_lock:
+            update(key, value, parent)
+
+    def update(key, value, parent):
         global AOA_lift_constant
         nonlocal AOA_hist_count
         if not isinstance(key, str):
@@ -513,9 +521,7 @@ def AOAFunction(inputs, output, require_leader):
             AOA_pitch_0 = read("AOA.0g")
             # Alpha (AOA) = lift_constant * acc[NORMAL/Z axis] / ias^2 -
             #               AOA_pitch_0
-            o.value = (
-                AOA_lift_constant * AOA_acc_history[-1] / (ias * ias) - AOA_pitch_0
-            )
+            alpha = AOA_lift_constant * AOA_acc_history[-1] / (ias * ias) - AOA_pitch_0
             flag_old = False
             flag_bad = False
             flag_fail = False
@@ -531,17 +537,21 @@ def AOAFunction(inputs, output, require_leader):
                     flag_fail = True
                 if vals[each][5]:
                     flag_secfail = True
-            o.old = flag_old
-            o.bad = flag_bad
-            o.fail = flag_fail
-            o.secfail = flag_secfail
+            o.update(
+                alpha, old=flag_old, bad=flag_bad, fail=flag_fail, secfail=flag_secfail
+            )
             if flag_old or flag_bad or flag_fail or flag_secfail:
                 AOA_hist_count = 0
         elif ias < Vs and vals["PITCH"] is not None:
             # Give an answer for taxi'ing and/or takeoff roll
             pitch = vals["PITCH"]
-            o.value = AOA_pitch_root + pitch[0]
-            o.old, o.bad, o.fail, o.secfail = pitch[2:]
+            o.update(
+                AOA_pitch_root + pitch[0],
+                old=pitch[2],
+                bad=pitch[3],
+                fail=pitch[4],
+                secfail=pitch[5],
+            )
             # Since we're taxi'ing, we might have just refueled,
             # or changed the weight and balance, which drastically changes
             # the lift constant. Mark it as unknown to re-estimate
@@ -551,10 +561,7 @@ def AOAFunction(inputs, output, require_leader):
             # Flying, but the lift constant is not yet established.
             # Give a guesstimate
             pitch = vals["PITCH"]
-            o.value = AOA_pitch_root + pitch[0]
-            o.old = pitch[2]
-            o.bad = True
-            o.fail = pitch[4]
+            o.update(AOA_pitch_root + pitch[0], old=pitch[2], bad=True, fail=pitch[4])
         else:
             # We're not getting any basic data. Fail out.
             o.fail = True
@@ -45,39 +45,31 @@ class MainThread(threading.Thread):
             ]
 
     def get_all_data(self, callbacks=False):
-        # Create callbacks for defined keys
-        for key in database.listkeys():
-            if isinstance(self.config["key_prefixes"], str):
-                if callbacks:
-                    self.parent.db_callback_add(key, self.persist)
-                else:
-                    # Get and save data as of now
-                    key_data = self.parent.db_read(key)
-                    self.data[key] = [
-                        key_data[0],
-                        int(key_data[1]),
-                        int(key_data[2]),
-                        int(key_data[3]),
-                        int(key_data[4]),
-                        int(key_data[5]),
-                    ]
-            else:
-                for sw in self.config["key_prefixes"]:
-                    if key.startswith(sw):
-                        if callbacks:
-                            self.parent.db_callback_add(key, self.persist)
-                        else:
-                            # Get and save data as of now
-                            key_data = self.parent.db_read(key)
-                            self.data[key] = [
-                                key_data[0],
-                                int(key_data[1]),
-                                int(key_data[2]),
-                                int(key_data[3]),
-                                int(key_data[4]),
-                                int(key_data[5]),
-                            ]
-                        break
+        # Each prefix is subscribed to as a pattern so keys that match more
+        # than one prefix are still only recorded once
+        if isinstance(self.config["key_prefixes"], str):
+            patterns = ["*"]
+        else:
+            patterns = [sw + "*" for sw in self.config["key_prefixes"]]
+        if callbacks:
+            # Create callbacks for defined keys
+            for pattern in patterns:
+                self.parent.db_callback_add(pattern, self.persist)
+        else:
+            keys = set()
+            for pattern in patterns:
+                keys.update(database.listkeys(pattern))
+            # Get and save data as of now, all from the same point in time
+            snap = self.parent.db_snapshot(keys)
+            for key, key_data in snap.values.items():
+                self.data[key] = [
+                    key_data[0],
+                    int(key_data[1]),
+                    int(key_data[2]),
+                    int(key_data[3]),
+                    int(key_data[4]),
+                    int(key_data[5]),
+                ]
         if callbacks:
             self.starttime = time.monotonic()
 
@@ -64,30 +64,31 @@ class MainThread(threading.Thread):
             return
 
         status = int(message[41:47], 16) & 1
+        data = {}
 
         pitch = int(message[8:12]) / 10.0
-        self.parent.db_write("PITCH", pitch)
+        data["PITCH"] = pitch
 
         roll = int(message[12:17]) / 10.0
-        self.parent.db_write("ROLL", roll)
+        data["ROLL"] = roll
 
         yaw = int(message[17:20])
-        self.parent.db_write("YAW", yaw)
+        data["YAW"] = yaw
 
         # 1/10 m/s to knots
         speed = round(int(message[20:24]) * 0.194384)
-        self.parent.db_write("TAS", speed)
+        data["TAS"] = speed
 
         alt = round(int(message[24:29]) * 3.28084)  # meters to feet
 
         if status == 0:
-            self.parent.db_write("ALT", alt)
-            self.parent.db_write("TALT", alt)
+            data["ALT"] = alt
+            data["TALT"] = alt
 
             turn_rate = int(message[29:33]) / 10
-            self.parent.db_write("ROT", turn_rate)
+            data["ROT"] = turn_rate
         else:
-            self.parent.db_write("PALT", alt)
+            data["PALT"] = alt
 
             vs = int(message[29:33]) / 10 * 60
 
@@ -97,10 +98,11 @@ class MainThread(threading.Thread):
             if len(self._vario_values):
                 vs = round(sum(self._vario_values) / len(self._vario_values))
 
-            self.parent.db_write("VS", vs)
+            data["VS"] = vs
 
         alat = int(message[33:36]) / 100
-        self.parent.db_write("ALAT", alat)
+        data["ALAT"] = alat
+        self.parent.db_write_many(data)
 
 
 class Plugin(plugin.PluginBase):
@@ -76,20 +76,24 @@ class MainThread(threading.Thread):
                 tach2 = int.from_bytes(s[41:44], "big")  # guess
                 checksum = s[44]
 
-                self.parent.db_write("TACH1", tach1)
-                self.parent.db_write("CHT11", cht1)
-                self.parent.db_write("CHT12", cht2)
-                self.parent.db_write("EGT11", egt1)
-                self.parent.db_write("EGT12", egt2)
-                self.parent.db_write("VOLT", volts)
-                self.parent.db_write("HOBBS1", engine_time)
-                self.parent.db_write("OILP1", oilp)
-                self.parent.db_write("OILT1", oilt)
-                self.parent.db_write("FUELQ1", fuel_qty)
-                self.parent.db_write("BARO", baro)
-                self.parent.db_write("OAT", oat)
-                self.parent.db_write("ALT", altitude)
-                self.parent.db_write("H2OT1", coolant)
+                self.parent.db_write_many(
+                    {
+                        "TACH1": tach1,
+                        "CHT11": cht1,
+                        "CHT12": cht2,
+                        "EGT11": egt1,
+                        "EGT12": egt2,
+                        "VOLT": volts,
+                        "HOBBS1": engine_time,
+                        "OILP1": oilp,
+                        "OILT1": oilt,
+                        "FUELQ1": fuel_qty,
+                        "BARO": baro,
+                        "OAT": oat,
+                        "ALT": altitude,
+                        "H2OT1": coolant,
+                    }
+                )
 
             elif self.model == 4000 or self.model == 6000:
                 s = self.ser.read_until(bytes.fromhex("fefffe"), size=150)
@@ -141,28 +145,32 @@ class MainThread(threading.Thread):
                 # 68 spare
                 checksum = s[69]  # noqa: F841
 
-                self.parent.db_write("TACH1", tach1)
-                self.parent.db_write("CHT11", cht1)
-                self.parent.db_write("CHT12", cht2)
-                self.parent.db_write("CHT13", cht3)
-                self.parent.db_write("CHT14", cht4)
-                self.parent.db_write("CHT15", cht5)
-                self.parent.db_write("CHT16", cht6)
-                self.parent.db_write("EGT11", egt1)
-                self.parent.db_write("EGT12", egt2)
-                self.parent.db_write("EGT13", egt3)
-                self.parent.db_write("EGT14", egt4)
-                self.parent.db_write("EGT15", egt5)
-                self.parent.db_write("EGT16", egt6)
-                self.parent.db_write("VOLT", volts)
-                self.parent.db_write("HOBBS1", engine_time)
-                self.parent.db_write("OILP1", oilp)
-                self.parent.db_write("OILT1", oilt)
-                self.parent.db_write("FUELQ1", fuel_qty)
-                self.parent.db_write("BARO", baro)
-                self.parent.db_write("OAT", oat)
-                self.parent.db_write("ALT", altitude)
-                self.parent.db_write("H2OT1", coolant)
+                self.parent.db_write_many(
+                    {
+                        "TACH1": tach1,
+                        "CHT11": cht1,
+                        "CHT12": cht2,
+                        "CHT13": cht3,
+                        "CHT14": cht4,
+                        "CHT15": cht5,
+                        "CHT16": cht6,
+                        "EGT11": egt1,
+                        "EGT12": egt2,
+                        "EGT13": egt3,
+                        "EGT14": egt4,
+                        "EGT15": egt5,
+                        "EGT16": egt6,
+                        "VOLT": volts,
+                        "HOBBS1": engine_time,
+                        "OILP1": oilp,
+                        "OILT1": oilt,
+                        "FUELQ1": fuel_qty,
+                        "BARO": baro,
+                        "OAT": oat,
+                        "ALT": altitude,
+                        "H2OT1": coolant,
+                    }
+                )
 
         self.running = False
 
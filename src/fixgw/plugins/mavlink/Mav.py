@@ -57,6 +57,14 @@ class Mav:
         self._apmodes["AUTOTUNE"] = 8
         self._apmodes["AUTO"] = 10
         self._apmodes["GUIDED"] = 15
+        # The mode requests and trims are checked every time through the
+        # main loop so we look them up once here
+        self._modereq = dict()
+        for f in self._apmodes:
+            self._modereq[f] = parent.db_get_handle(f"MAVREQ{f}")
+        self._trimp = parent.db_get_handle("TRIMP")
+        self._trimr = parent.db_get_handle("TRIMR")
+        self._trimy = parent.db_get_handle("TRIMY")
 
         self._airspeed = options.get("airspeed", False)
         self._groundspeed = options.get("groundspeed", False)
@@ -169,6 +177,7 @@ class Mav:
                 self.no_msg_count = 0
             return
         msg_type = msg.get_type()
+        data = {}
         if msg_type == "VFR_HUD":
             # We can also get other info like GS, VS, MSL, HEAD from this
             # msg.airspeed is CAS or IAS, at the speeds we fly the different is insignificant
@@ -177,44 +186,42 @@ class Mav:
             if self._airspeed:
                 spd = self.avg("IAS", msg.airspeed * 1.9438445, 2)
                 if self._min_airspeed < spd:
-                    self.parent.db_write("IAS", spd)  # m/s to knots
+                    data["IAS"] = spd  # m/s to knots
                 else:
-                    self.parent.db_write("IAS", 0)
+                    data["IAS"] = 0
             if self._groundspeed:
                 spd = self.avg("GS", msg.groundspeed * 1.9438445, 2)
                 if spd > 3:
-                    self.parent.db_write("GS", spd)  # m/s to knots
+                    data["GS"] = spd  # m/s to knots
                 else:
-                    self.parent.db_write("GS", 0)
+                    data["GS"] = 0
             if self._ahrs:
                 # The AI in pyefis requires TAS
                 # I think we could calculate it but for now we will just use IAS in its place
                 spd = self.avg("TAS", msg.airspeed * 1.9438445, 2)
                 tas = self.avg("RTAS", msg.airspeed, 2)  # noqa: F841
                 if self._min_airspeed < spd:
-                    self.parent.db_write("TAS", spd)  # m/s to knots
+                    data["TAS"] = spd  # m/s to knots
                 else:
-                    self.parent.db_write("TAS", 0)
-                self.parent.db_write(
-                    "VS", round(msg.climb * 196.85039)
-                )  # m/s to ft/min
+                    data["TAS"] = 0
+                data["VS"] = round(msg.climb * 196.85039)  # m/s to ft/min
         elif msg_type == "SCALED_IMU":
             # logger.debug(msg.yacc/1000)
             # mavlink is in mG
             # Not exactly sure if G is what pyefis expects for ALAT
             # We can also get other data like xacc and zacc
             if self._accel:
-                self.parent.db_write("ALAT", round(msg.yacc / 1000, 4))
-                self.parent.db_write("ALONG", round(msg.xacc / 1000, 4))
-                self.parent.db_write("ANORM", round(msg.zacc / 1000, 4))
+                data["ALAT"] = round(msg.yacc / 1000, 4)
+                data["ALONG"] = round(msg.xacc / 1000, 4)
+                data["ANORM"] = round(msg.zacc / 1000, 4)
         elif msg_type == "ATTITUDE":
             if self._ahrs:
-                self.parent.db_write("ROLL", round(math.degrees(msg.roll), 2))
+                data["ROLL"] = round(math.degrees(msg.roll), 2)
                 roll = self.avg("ROLL", msg.roll, 2)
                 rtas = self.get_avg("RTAS", 2)
-                self.parent.db_write("ROT", rot(rtas, roll))
-                self.parent.db_write("PITCH", round(math.degrees(msg.pitch), 2))
-                self.parent.db_write("YAW", round(math.degrees(msg.yaw), 2))
+                data["ROT"] = rot(rtas, roll)
+                data["PITCH"] = round(math.degrees(msg.pitch), 2)
+                data["YAW"] = round(math.degrees(msg.yaw), 2)
             # self.parent.db_write("YAW", math.degrees(msg.yaw))
         #        elif msg_type == "GPS2_RAW":
         #            if self._gps:
@@ -230,56 +237,40 @@ class Mav:
             if self._ahrs:
                 rgs = self.get_avg("GS", 2)
                 if rgs > 3:
-                    self.parent.db_write("COURSE", round(msg.cog / 100, 2))
+                    data["COURSE"] = round(msg.cog / 100, 2)
                 else:
                     # If not moving set course to heading so maps show direction you are facing
-                    self.parent.db_write("COURSE", self.get_avg("HEAD", 2))
+                    data["COURSE"] = self.get_avg("HEAD", 2)
             if self._gps:
-                self.parent.db_write("GPS_FIX_TYPE", msg.fix_type)
-                self.parent.db_write(
-                    "GPS_ELLIPSOID_ALT", round(msg.alt_ellipsoid / 304.8, 2)
-                )  # int32 mm to ft
-                self.parent.db_write("GPS_SATS_VISIBLE", msg.satellites_visible)  #
-                self.parent.db_write(
-                    "GPS_SATS_TRACKED", msg.satellites_visible
-                )  # Not found a way to get tracked
-                self.parent.db_write(
-                    "GPS_ACCURACY_SPEED", round(msg.vel_acc * 0.0019438445, 2)
-                )  # int32 mm/s to knots Docs just sa "mm" I assumed/sec
-                self.parent.db_write(
-                    "GPS_ACCURACY_HORIZ", round(msg.h_acc / 3048, 2)
-                )  # / 3.048,2)) # int32 mm to ft
-                self.parent.db_write(
-                    "GPS_ACCURACY_VERTICAL", round(msg.v_acc / 3048, 2)
-                )  # / 3.048,2)) # int mm to ft
+                data["GPS_FIX_TYPE"] = msg.fix_type
+                # int32 mm to ft
+                data["GPS_ELLIPSOID_ALT"] = round(msg.alt_ellipsoid / 304.8, 2)
+                data["GPS_SATS_VISIBLE"] = msg.satellites_visible  #
+                # Not found a way to get tracked
+                data["GPS_SATS_TRACKED"] = msg.satellites_visible
+                # int32 mm/s to knots Docs just sa "mm" I assumed/sec
+                data["GPS_ACCURACY_SPEED"] = round(msg.vel_acc * 0.0019438445, 2)
+                # / 3.048,2)) # int32 mm to ft
+                data["GPS_ACCURACY_HORIZ"] = round(msg.h_acc / 3048, 2)
+                # / 3.048,2)) # int mm to ft
+                data["GPS_ACCURACY_VERTICAL"] = round(msg.v_acc / 3048, 2)
 
         elif msg_type == "GLOBAL_POSITION_INT":
             if self._ahrs:
                 head = self.avg("HEAD", msg.hdg / 100, 2)
-                self.parent.db_write("HEAD", head)  # uint16_t cdeg
-                self.parent.db_write(
-                    "AGL", round(msg.relative_alt / 304.8, 2)
-                )  # int32_t mm to ft
+                data["HEAD"] = head  # uint16_t cdeg
+                data["AGL"] = round(msg.relative_alt / 304.8, 2)  # int32_t mm to ft
                 # Seems like MSD is TALT and ALT should be indicated, not sure hoe to get both:
-                self.parent.db_write(
-                    "ALT", round(msg.alt / 304.8, 2)
-                )  # int32_t mm to ft
-                self.parent.db_write(
-                    "TALT", round(msg.alt / 304.8, 2)
-                )  # int32_t mm to ft
+                data["ALT"] = round(msg.alt / 304.8, 2)  # int32_t mm to ft
+                data["TALT"] = round(msg.alt / 304.8, 2)  # int32_t mm to ft
             if self._gps:
-                self.parent.db_write("LAT", msg.lat / 10000000.0)  # int32_t degE7 10**7
-                self.parent.db_write(
-                    "LONG", msg.lon / 10000000.0
-                )  # int32_t degE7 10**7
+                data["LAT"] = msg.lat / 10000000.0  # int32_t degE7 10**7
+                data["LONG"] = msg.lon / 10000000.0  # int32_t degE7 10**7
         elif msg_type == "SCALED_PRESSURE":
             if self._pressure:
-                self.parent.db_write(
-                    "AIRPRESS", round((msg.press_abs * 100) + self._pascal_offset, 4)
-                )  # float hPa to Pa
-                self.parent.db_write(
-                    "DIFFAIRPRESS", round(msg.press_diff * 100, 4)
-                )  # float hPa to Pa
+                # float hPa to Pa
+                data["AIRPRESS"] = round((msg.press_abs * 100) + self._pascal_offset, 4)
+                data["DIFFAIRPRESS"] = round(msg.press_diff * 100, 4)  # float hPa to Pa
                 # We can also get temperature and temperature_press_diff i cDegC
                 # HIGHRES_IMU might also be useful
 
@@ -401,18 +392,17 @@ class Mav:
             )  # 1100-1900us 1500 center
             self._outputPitch = int((msg.servo2_raw - 1500) * 2.5)
             self._outputYaw = int((msg.servo4_raw - 1500) * 2.5)
+        if data:
+            self.parent.db_write_many(data)
 
         # TODO We need to drop out of AP mode, alert pilot if system is in a bad state
         # unhealthy GPS signal is one such state
         # Not sure what all we need to check for
 
     def init(self):
-        self.parent.db_write("ROLL", 0)
-        self.parent.db_write("PITCH", 0)
-        self.parent.db_write("HEAD", 0)
-        self.parent.db_write("AGL", 0)
-        self.parent.db_write("ALT", 0)
-        self.parent.db_write("VS", 0)
+        self.parent.db_write_many(
+            {"ROLL": 0, "PITCH": 0, "HEAD": 0, "AGL": 0, "ALT": 0, "VS": 0}
+        )
 
     def checkInit(self, mode):
         if self._apmode == "INIT":
@@ -459,9 +449,9 @@ class Mav:
             if not self.parent.db_read("MAVADJ")[0] and self.parent.quorum.leader:
                 self.parent.db_write("MAVADJ", True)
             if self.parent.quorum.leader:
-                self.parent.db_write("TRIMR", 0)
-                self.parent.db_write("TRIMP", 0)
-                self.parent.db_write("TRIMY", 0)
+                self._trimr.set(0)
+                self._trimp.set(0)
+                self._trimy.set(0)
 
         elif self._apAdjust and not adj_req:
             self._apAdjust = False
@@ -472,28 +462,28 @@ class Mav:
             if not self._apAdjust and self._trimsSaved:
                 self._trimsSaved = False
                 if self.parent.quorum.leader:
-                    self.parent.db_write("TRIMR", self._trimsSavedRoll / 10)
-                    self.parent.db_write("TRIMP", self._trimsSavedPitch / 10)
-                    self.parent.db_write("TRIMY", self._trimsSavedYaw / 10)
+                    self._trimr.set(self._trimsSavedRoll / 10)
+                    self._trimp.set(self._trimsSavedPitch / 10)
+                    self._trimy.set(self._trimsSavedYaw / 10)
 
             if self.parent.quorum.leader:
                 self.conn.mav.manual_control_send(
                     self.conn.target_system,
-                    int(self.parent.db_read("TRIMP")[0] * 10),  # pitch
-                    int(self.parent.db_read("TRIMR")[0] * 10),  # roll
+                    int(self._trimp.get()[0] * 10),  # pitch
+                    int(self._trimr.get()[0] * 10),  # roll
                     0,  # Throttle
-                    int(self.parent.db_read("TRIMY")[0] * 10),  # Yaw
+                    int(self._trimy.get()[0] * 10),  # Yaw
                     0,
                 )
         elif self.parent.quorum.leader:
             if not self._trimsSaved:
                 self._trimsSaved = True
-                self._trimsSavedRoll = self.parent.db_read("TRIMR")[0] * 10
-                self._trimsSavedPitch = self.parent.db_read("TRIMP")[0] * 10
-                self._trimsSavedYaw = self.parent.db_read("TRIMY")[0] * 10
-            self.parent.db_write("TRIMP", self._outputPitch / 10)
-            self.parent.db_write("TRIMR", self._outputRoll / 10)
-            self.parent.db_write("TRIMY", self._outputYaw / 10)
+                self._trimsSavedRoll = self._trimr.get()[0] * 10
+                self._trimsSavedPitch = self._trimp.get()[0] * 10
+                self._trimsSavedYaw = self._trimy.get()[0] * 10
+            self._trimp.set(self._outputPitch / 10)
+            self._trimr.set(self._outputRoll / 10)
+            self._trimy.set(self._outputYaw / 10)
 
     def checkMode(self):
         self.checkWaypoint()
@@ -504,7 +494,7 @@ class Mav:
         new_mode = "INIT"
         logger.debug(f"Current mode is {self._apmode}")
         for f in self._apmodes:
-            requested = self.parent.db_read(f"MAVREQ{f}")[0]
+            requested = self._modereq[f].get()[0]
             logger.debug(f"Processing {f}: MAVREQ{f}: {requested}")
             if requested and f != self._apmode:
                 # Requested and not the current active mode
@@ -516,9 +506,9 @@ class Mav:
 
         if new_mode != "INIT":
             for f in self._apmodes:
-                if f != new_mode and self.parent.db_read(f"MAVREQ{f}")[0]:
+                if f != new_mode and self._modereq[f].get()[0]:
                     # Set all other modes to False if set to True
-                    self.parent.db_write(f"MAVREQ{f}", False)
+                    self._modereq[f].set(False)
                     logger.debug(f"MAVREQ{f} set to False")
             # Check if a mode change has been requested
             if self._apmode != new_mode and new_mode != "INIT":
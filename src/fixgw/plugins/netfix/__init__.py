@@ -22,11 +22,7 @@
 
 import threading
 import socket
-
-try:
-    import queue
-except:
-    import Queue as queue
+import selectors
 from collections import OrderedDict
 from collections import defaultdict
 from collections import deque
@@ -34,41 +30,182 @@ import json
 import fixgw.plugin as plugin
 import fixgw.status as status
 import fixgw.netfix as netfix
+import fixgw.database as database
 import time
 
-# Track where data came from to prevent loops
+# Track where data came from to prevent loops.  This is shared by all of
+# the connection threads so it is only used with the lock held.
 client_block = defaultdict(set)
+client_block_lock = threading.Lock()
+
+# Values of the quality flags in a value update
+FLAG_VALUES = {"1": True, "0": False}
+
+# Most bytes that are put together into one send
+SEND_BUDGET = 65536
+
+# Most bytes that can wait in the output queue of a connection
+OUTPUT_LIMIT = 262144
+
+# The encoded value sentence of each key, shared by every connection so that
+# a change that goes out to many clients is only formatted once.  Each entry
+# is the value tuple that the sentence was made from and the bytes.
+sentences = dict()
+
+
+def block(host, key):
+    with client_block_lock:
+        client_block[host].add(key)
+
+
+# Removes the block and returns True if key was blocked for the host
+def unblock(host, key):
+    with client_block_lock:
+        blocked = client_block[host]
+        if key in blocked:
+            blocked.discard(key)
+            return True
+        return False
+
+
+# Returns the encoded value sentence for a key and its value tuple.  The
+# callbacks for one change are all given the same tuple so only the first
+# connection has to format it.  A read makes a new tuple but the value in it
+# is the same object until the item is written again, so a read of an item
+# that has not changed finds the sentence too.
+def value_sentence(id, value):
+    entry = sentences.get(id)
+    if entry is not None:
+        v = entry[0]
+        if v is value or (v[0] is value[0] and v[1:] == value[1:]):
+            return entry[1]
+    a = "1" if value[1] else "0"
+    o = "1" if value[2] else "0"
+    b = "1" if value[3] else "0"
+    f = "1" if value[4] else "0"
+    s = "1" if value[5] else "0"
+    sentence = "{0};{1};{2}{3}{4}{5}{6}\n".format(id, value[0], a, o, b, f, s)
+    sentence = sentence.encode()
+    sentences[id] = (value, sentence)
+    return sentence
+
+
+# Output queue of a connection.  Command responses are sent in the order
+# they were put here.  Value updates only keep the newest sentence for each
+# key, so a client that is slow to read gets the latest values instead of
+# every change on the way.  A queued value keeps its place in line when a
+# newer one replaces it.  Anything that would take the queue over limit
+# bytes is dropped.  A "exit" message is never dropped and is handed back
+# by get_many() so the send thread knows to quit.
+class OutputQueue(object):
+    def __init__(self, limit=OUTPUT_LIMIT):
+        self.limit = limit
+        self.lock = threading.Lock()
+        self.ready = threading.Condition(self.lock)
+        # Commands are bytes, value updates are the key of the sentence in
+        # values and None is the "exit" message
+        self.items = deque()
+        self.values = dict()
+        self.size = 0
+        self.conflated = 0
+        self.dropped = 0
+
+    # Returns True if a new message was queued
+    def put(self, data):
+        with self.lock:
+            if data == "exit":
+                data = None
+            elif self.size + len(data) > self.limit:
+                self.dropped += 1
+                return False
+            else:
+                self.size += len(data)
+            self.items.append(data)
+            self.ready.notify()
+        return True
+
+    # Queues the value sentence for key in place of any that is still waiting.
+    # Returns True if a new message was queued.
+    def put_value(self, key, data):
+        with self.lock:
+            old = self.values.get(key)
+            if old is not None:
+                self.values[key] = data
+                self.size += len(data) - len(old)
+                self.conflated += 1
+                return False
+            if self.size + len(data) > self.limit:
+                self.dropped += 1
+                return False
+            self.values[key] = data
+            self.size += len(data)
+            self.items.append(key)
+            self.ready.notify()
+        return True
+
+    # Takes the messages that are waiting, stopping once there are budget
+    # bytes.  If block is True and nothing is waiting it waits for something.
+    def get_many(self, budget, block=True):
+        batch = []
+        size = 0
+        with self.lock:
+            items = self.items
+            while block and not items:
+                self.ready.wait()
+            while items and size < budget:
+                data = items.popleft()
+                if data is None:
+                    batch.append("exit")
+                    break
+                if type(data) is str:
+                    data = self.values.pop(data)
+                batch.append(data)
+                size += len(data)
+            self.size -= size
+        return batch
+
+    def get(self):
+        return self.get_many(1)[0]
+
+    # Returns (messages, bytes) waiting to be sent
+    def backlog(self):
+        with self.lock:
+            return len(self.items), self.size
 
 
 # This holds the data and functions that are needed by both connection threads.
+# The event loop server gives each connection its own kind of queue.
 class Connection(object):
 
-    def __init__(self, parent, conn, addr):
+    def __init__(self, parent, conn, addr, out=None):
         self.parent = parent  # This should point to the plugin object
         self.conn = conn
         self.addr = addr
         self.log = parent.log
-        self.queue = queue.Queue()
         self.buffer_size = (
             int(parent.config["buffer_size"])
             if ("buffer_size" in parent.config) and parent.config["buffer_size"]
             else 1024
         )
+        self.output_limit = (
+            int(parent.config["output_limit"])
+            if ("output_limit" in parent.config) and parent.config["output_limit"]
+            else OUTPUT_LIMIT
+        )
+        self.queue = OutputQueue(self.output_limit) if out is None else out
+        self.framer = netfix.LineFramer()
+        self.msg_recv = 0
         self.subscriptions = set()
         self.output_inhibit = False
+        # Database handles for the keys this client sends value updates for
+        self.handles = dict()
 
     # This sends a standard Net-FIX value update message to the queue.
     def __send_value(self, id, value):
         if type(value) is tuple:
-            a = "1" if value[1] else "0"
-            o = "1" if value[2] else "0"
-            b = "1" if value[3] else "0"
-            f = "1" if value[4] else "0"
-            s = "1" if value[5] else "0"
-            st = "{0};{1};{2}{3}{4}{5}{6}\n".format(id, value[0], a, o, b, f, s)
+            self.queue.put_value(id, value_sentence(id, value))
         else:
-            st = "{0};{1}\n".format(id, value)
-        self.queue.put(st.encode())
+            self.queue.put_value(id, "{0};{1}\n".format(id, value).encode())
 
     def __send_report(self, id):
         try:
@@ -113,6 +250,27 @@ class Connection(object):
         if d == "status":
             s = json.dumps(status.get_dict())
             self.queue.put("@xstatus;{}\n".format(s).encode())
+        elif d.split(";")[0] == "timing":
+            a = d.split(";")
+            if len(a) > 1:
+                if a[1] not in ["on", "off"]:
+                    self.queue.put("@x{}!002\n".format(d).encode())
+                    return
+                database.callback_timing(a[1] == "on")
+            state = "on" if database.callback_timing_enabled() else "off"
+            self.queue.put("@xtiming;{}\n".format(state).encode())
+        elif d.split(";")[0] == "top":
+            a = d.split(";")
+            try:
+                count = int(a[1]) if len(a) > 1 else 10
+            except ValueError:
+                self.queue.put("@x{}!002\n".format(d).encode())
+                return
+            top = [
+                {"key": key, "writes": writes, "rate": round(rate, 3), "writer": writer}
+                for key, writes, rate, writer in database.hot_keys(count)
+            ]
+            self.queue.put("@x{};{}\n".format(d, json.dumps(top)).encode())
         elif d == "kill":
             self.queue.put("@xkill\n".encode())
             self.parent.quit()
@@ -156,7 +314,7 @@ class Connection(object):
         try:
             self.output_inhibit = True
             # Track inputs so we do not send back to same client
-            client_block[self.addr[0]].add(a[0])
+            block(self.addr[0], a[0])
             self.parent.db_write(a[0], a[1])
         except KeyError:
             self.queue.put("@w{0}!001\n".format(a[0]).encode())
@@ -188,22 +346,18 @@ class Connection(object):
                 try:
                     val = self.parent.db_read(id)
                     if type(val) is tuple:
-                        a = "1" if val[1] else "0"
-                        o = "1" if val[2] else "0"
-                        b = "1" if val[3] else "0"
-                        f = "1" if val[4] else "0"
-                        s = "1" if val[5] else "0"
-                        st = "@r{0};{1};{2}{3}{4}{5}{6}\n".format(
-                            id, val[0], a, o, b, f, s
-                        )
+                        self.queue.put(b"@r" + value_sentence(id, val))
                     else:
-                        st = "@r{0};{1}\n".format(id, val)
-                    self.queue.put(st.encode())
+                        self.queue.put("@r{0};{1}\n".format(id, val).encode())
                 except KeyError:
                     self.queue.put("@r{0}!001\n".format(id).encode())
             elif d[1] == "s":
                 if id not in self.subscriptions:
                     try:
+                        # A pattern like EGT* subscribes to every matching key
+                        # but it is an error if nothing matches
+                        if database.is_pattern(id) and not database.listkeys(id):
+                            raise KeyError(id)
                         self.parent.db_callback_add(id, self.subscription_handler)
                         self.queue.put("@s{0}\n".format(id).encode())
                         self.subscriptions.add(id)
@@ -237,47 +391,40 @@ class Connection(object):
                     self.log.debug(
                         "Bad Frame {0} from {1}".format(d.strip(), self.addr[0])
                     )
-                if x[2] != "0000" or x[2] != "000":
-                    item = self.parent.db_get_item(x[0])
-                    a = x[2][0]
-                    b = x[2][1]
-                    f = x[2][2]
-                    if len(x[2]) == 4:
-                        s = x[2][3]
-                    else:
-                        s = "0"
-                    if a and a == "1":
-                        # self.output_inhibit = True
-                        item.annunciate = True
-                    elif a and a == "0":
-                        # self.output_inhibit = True
-                        item.annunciate = False
-                    if b and b == "1":
-                        # self.output_inhibit = True
-                        item.bad = True
-                    elif b and b == "0":
-                        # self.output_inhibit = True
-                        item.bad = False
-                    if f and f == "1":
-                        # self.output_inhibit = True
-                        item.fail = True
-                    elif f and f == "0":
-                        # self.output_inhibit = True
-                        item.fail = False
-                    if s and s == "1":
-                        # self.output_inhibit = True
-                        item.secfail = True
-                    elif s and s == "0":
-                        # self.output_inhibit = True
-                        item.secfail = False
+                handle = self.handles.get(x[0])
+                if handle is None:
+                    handle = self.parent.db_get_handle(x[0])
+                    self.handles[x[0]] = handle
+                if handle.aux is None:
+                    flags = x[2]
+                    s = flags[3] if len(flags) == 4 else "0"
+                    # Anything but 1 or 0 leaves the flag alone
+                    a, b, f, s = [
+                        FLAG_VALUES.get(c) for c in (flags[0], flags[1], flags[2], s)
+                    ]
                 self.output_inhibit = True
                 # Track inputs so we do not send back to same client
-                client_block[self.addr[0]].add(x[0])
-                self.parent.db_write(x[0], x[1])
+                block(self.addr[0], x[0])
+                if handle.aux is None:
+                    # The flags and the value are changed together so the
+                    # subscribers only hear about it once
+                    handle.update(x[1], annunciate=a, bad=b, fail=f, secfail=s)
+                else:
+                    handle.set(x[1])
             except Exception as e:
                 # We pretty much ignore this stuff for now
                 self.log.debug("Problem with input {0}: {1}".format(d.strip(), e))
 
+    # Splits the data that came from the socket into lines and handles each
+    # complete one.  Anything after the last newline is kept for next time.
+    def feed(self, data):
+        for line in self.framer.feed(data):
+            if line is None:
+                self.log.debug("Bad Message from {0}".format(self.addr[0]))
+                continue
+            self.handle_request(line)
+            self.msg_recv += 1
+
     # Callback function used for subscriptions
     def subscription_handler(self, id, value, udata):
         if self.output_inhibit:
@@ -298,7 +445,6 @@ class ReceiveThread(threading.Thread):
         self.log = self.parent.log
         self.getout = False
         self.bsize = self.parent.thread.buffer_size
-        self.msg_recv = 0
 
     def run(self):
         data = b""
@@ -308,7 +454,6 @@ class ReceiveThread(threading.Thread):
                     str(self.addr[0]), str(self.addr[1])
                 )
             )
-            buff = ""
             while True:
                 try:
                     data = self.conn.recv(self.bsize)
@@ -316,17 +461,7 @@ class ReceiveThread(threading.Thread):
                     break  # Major error we'll just bail
                 if not data:
                     break
-                try:
-                    dstring = data.decode("utf-8")
-                except UnicodeDecodeError:
-                    self.log.debug("Bad Message from {0}".format(self.addr[0]))
-                for d in dstring:
-                    if d == "\n":
-                        self.co.handle_request(buff)
-                        self.msg_recv += 1
-                        buff = ""
-                    else:
-                        buff += d
+                self.co.feed(data)
 
             self.co.queue.put("exit")  # Signals the send thread to exit.
             self.parent.db_callback_del("*", self.co.subscription_handler, None)
@@ -357,17 +492,29 @@ class SendThread(threading.Thread):
         self.running = True
         self.log = self.parent.log
         self.msg_sent = 0
+        self.sends = 0
+        self.bytes_sent = 0
 
-    # All this does is watch the queue in the connection object and
-    # send anything that it finds there to the socket connection
+    # All this does is watch the queue in the connection object and send
+    # anything that it finds there to the socket connection.  Everything
+    # that is waiting in the queue, up to SEND_BUDGET bytes, goes out in one
+    # send so a burst of updates does not cost a system call each.
     def run(self):
+        q = self.co.queue
         try:
-            while True:
-                data = self.co.queue.get()
-                if data == "exit":
+            exiting = False
+            while not exiting:
+                batch = q.get_many(SEND_BUDGET)
+                if batch[-1] == "exit":
+                    exiting = True
+                    batch.pop()
+                if not batch:
                     break
+                data = b"".join(batch) if len(batch) > 1 else batch[0]
                 self.conn.sendall(data)
-                self.msg_sent += 1
+                self.msg_sent += len(batch)
+                self.sends += 1
+                self.bytes_sent += len(data)
             self.running = False
         finally:
             self.conn.close()
@@ -404,6 +551,11 @@ class ServerThread(threading.Thread):
             if ("buffer_size" in parent.config) and parent.config["buffer_size"]
             else 1024
         )
+        self.output_limit = (
+            int(parent.config["output_limit"])
+            if ("output_limit" in parent.config) and parent.config["output_limit"]
+            else OUTPUT_LIMIT
+        )
 
         self.threads = []
         self.getout = False
@@ -463,14 +615,233 @@ class ServerThread(threading.Thread):
         for i, t in enumerate(self.threads):
             c = OrderedDict()
             c["Client"] = t[0].addr
-            c["Messages Received"] = t[0].msg_recv
+            c["Messages Received"] = t[0].co.msg_recv
             c["Messages Sent"] = t[1].msg_sent
+            c["Sends"] = t[1].sends
+            c["Bytes Per Send"] = round(t[1].bytes_sent / max(t[1].sends, 1), 1)
+            q = t[0].co.queue
+            c["Backlog"], c["Backlog Bytes"] = q.backlog()
+            c["Conflated"] = q.conflated
+            c["Dropped"] = q.dropped
             # "Subscriptions":','.join(t[0].co.subscriptions)}
             c["Subscriptions"] = len(t[0].co.subscriptions)
             d["Connection {0}".format(i)] = c
         return d
 
 
+# Output queue of a connection in the event loop server.  put() can be
+# called from any thread.  The loop is woken up when there is something new
+# to send.
+class LoopQueue(OutputQueue):
+    def __init__(self, server, client, limit):
+        super(LoopQueue, self).__init__(limit)
+        self.server = server
+        self.client = client
+
+    def put(self, data):
+        if super(LoopQueue, self).put(data):
+            self.server.wake(self.client)
+
+    def put_value(self, key, data):
+        if super(LoopQueue, self).put_value(key, data):
+            self.server.wake(self.client)
+
+
+# One connection in the event loop server
+class LoopClient(object):
+    def __init__(self, server, conn, addr):
+        self.conn = conn
+        self.addr = addr
+        out = LoopQueue(server, self, server.output_limit)
+        self.co = Connection(server.parent, conn, addr, out)
+        self.out = bytearray()
+        self.events = selectors.EVENT_READ
+        self.closed = False
+        self.msg_sent = 0
+        self.sends = 0
+        self.bytes_sent = 0
+
+
+# Serves every connection from this one thread with a selector instead of
+# starting two threads for each client.  The listening socket stays open the
+# whole time.  Requests are handled in this thread.  Subscription callbacks
+# come from the threads that write to the database, so they only queue the
+# data and wake the loop up through a socket pair to send it.
+class SelectServerThread(ServerThread):
+    def __init__(self, parent):
+        super(SelectServerThread, self).__init__(parent)
+        self.selector = selectors.DefaultSelector()
+        self.clients = []
+        self.lock = threading.Lock()
+        self.ready = set()
+        self.woken = False
+        self.wake_r, self.wake_w = socket.socketpair()
+        self.wake_r.setblocking(False)
+        self.wake_w.setblocking(False)
+
+    # Asks the loop to send whatever is queued for the client
+    def wake(self, client):
+        with self.lock:
+            self.ready.add(client)
+            if self.woken or threading.current_thread() is self:
+                return
+            self.woken = True
+        try:
+            self.wake_w.send(b"\0")
+        except OSError:
+            pass  # The loop is already awake or we are shutting down
+
+    def run(self):
+        listener = socket.socket(socket.AF_INET, socket.SOCK_STREAM)
+        listener.setsockopt(socket.SOL_SOCKET, socket.SO_REUSEADDR, 1)
+        listener.bind((self.host, self.port))
+        listener.listen(socket.SOMAXCONN)
+        listener.setblocking(False)
+        self.selector.register(listener, selectors.EVENT_READ)
+        self.selector.register(self.wake_r, selectors.EVENT_READ)
+        try:
+            while not self.getout:
+                for key, events in self.selector.select(self.timeout):
+                    if key.fileobj is listener:
+                        self.accept(listener)
+                    elif key.fileobj is self.wake_r:
+                        try:
+                            self.wake_r.recv(4096)
+                        except OSError:
+                            pass
+                        with self.lock:
+                            self.woken = False
+                    else:
+                        client = key.data
+                        if events & selectors.EVENT_READ:
+                            self.receive(client)
+                        if events & selectors.EVENT_WRITE:
+                            self.send(client)
+                with self.lock:
+                    ready = self.ready
+                    self.ready = set()
+                for client in ready:
+                    self.send(client)
+        finally:
+            for client in list(self.clients):
+                self.close(client)
+            self.selector.close()
+            listener.close()
+            self.wake_r.close()
+            self.wake_w.close()
+
+    def accept(self, listener):
+        try:
+            conn, addr = listener.accept()
+        except OSError:
+            return
+        conn.setblocking(False)
+        client = LoopClient(self, conn, addr)
+        self.clients.append(client)
+        self.selector.register(conn, client.events, client)
+        self.log.info(
+            "Client connection from {0} port {1}".format(str(addr[0]), str(addr[1]))
+        )
+
+    def receive(self, client):
+        if client.closed:
+            return
+        try:
+            data = client.conn.recv(self.buffer_size)
+        except (BlockingIOError, InterruptedError):
+            return
+        except OSError:
+            data = b""
+        if not data:
+            self.close(client)
+            return
+        try:
+            client.co.feed(data)
+        except Exception as e:
+            # A thread per connection would have died here so only this
+            # client is dropped
+            self.log.debug("Problem with input from {0}: {1}".format(client.addr, e))
+            self.close(client)
+
+    # Sends as much of the queued data as the socket will take.  If some is
+    # left over we ask the selector to tell us when there is room for more.
+    # Only SEND_BUDGET bytes are taken from the queue at a time so the
+    # values for a slow client wait in the queue, where newer ones replace
+    # them, instead of piling up here.
+    def send(self, client):
+        if client.closed:
+            return
+        q = client.co.queue
+        out = client.out
+        if len(out) < SEND_BUDGET:
+            batch = q.get_many(SEND_BUDGET - len(out), False)
+            for data in batch:
+                out += data
+            client.msg_sent += len(batch)
+        if out:
+            try:
+                n = client.conn.send(out)
+            except (BlockingIOError, InterruptedError):
+                n = 0
+            except OSError:
+                self.close(client)
+                return
+            if n:
+                client.sends += 1
+                client.bytes_sent += n
+            del out[:n]
+        events = selectors.EVENT_READ
+        if out or q.items:
+            events |= selectors.EVENT_WRITE
+        if events != client.events:
+            client.events = events
+            self.selector.modify(client.conn, events, client)
+
+    def close(self, client):
+        if client.closed:
+            return
+        client.closed = True
+        self.parent.db_callback_del("*", client.co.subscription_handler, None)
+        try:
+            self.selector.unregister(client.conn)
+        except (KeyError, ValueError):
+            pass
+        client.conn.close()
+        self.clients.remove(client)
+        self.log.info(
+            "Disconnected by {0} port {1}".format(
+                str(client.addr[0]), str(client.addr[1])
+            )
+        )
+
+    def stop(self):
+        self.getout = True
+        try:
+            self.wake_w.send(b"\0")
+        except OSError:
+            pass
+
+    def get_status(self):
+        clients = list(self.clients)
+        d = OrderedDict({"Current Connections": len(clients)})
+        for i, client in enumerate(clients):
+            c = OrderedDict()
+            c["Client"] = client.addr
+            c["Messages Received"] = client.co.msg_recv
+            c["Messages Sent"] = client.msg_sent
+            c["Sends"] = client.sends
+            c["Bytes Per Send"] = round(client.bytes_sent / max(client.sends, 1), 1)
+            q = client.co.queue
+            messages, size = q.backlog()
+            c["Backlog"] = messages
+            c["Backlog Bytes"] = size + len(client.out)
+            c["Conflated"] = q.conflated
+            c["Dropped"] = q.dropped
+            c["Subscriptions"] = len(client.co.subscriptions)
+            d["Connection {0}".format(i)] = c
+        return d
+
+
 class ClientThread(threading.Thread):
 
     def __init__(self, parent):
@@ -488,25 +859,48 @@ class ClientThread(threading.Thread):
             self.clients.append(netfix.Client(c["host"], c.get("port", 3490)))
             self.clients[-1].connect()
 
-        for o in self.config["outputs"]:
-            self.parent.db_callback_add(o.upper(), self.getOutputFunction(o.upper()))
+        # Instead of subscribing to the outputs we ask the database journal
+        # what has changed since the last time around the loop
+        self.outputs = set(o.upper() for o in self.config["outputs"])
+        self.sequence = self.parent.db_sequence()
+        self.resyncs = 0
+
+    # Puts the outputs that have changed since last time on the queue
+    def queueChanges(self):
+        try:
+            self.sequence, keys = self.parent.db_changes(self.sequence)
+        except database.ResyncNeeded:
+            # We missed some changes so send all of the outputs again
+            self.resyncs += 1
+            snap = self.parent.db_snapshot(self.outputs)
+            self.sequence = snap.sequence
+            keys = sorted(self.outputs)
+        for key in keys:
+            if key not in self.outputs:
+                continue
+            if True in self.parent.db_read(key)[1:]:
+                # This change is likely only for old/fail etc we only care
+                # about the value itself.  Maybe this could be improved in
+                # the future.  But currently the goal is just sending the
+                # value and preventing loops
+                continue
+            if key not in self.queue:
+                self.queue.append(key)
 
     def run(self):
         while True:
             if self.getout:
                 break
-            # Do stuff here
+            self.queueChanges()
             while len(self.queue) > 0:
                 # Maybe a pause when exception?
                 key = self.queue.popleft()
                 for c in self.clients:
                     try:
                         # Block sending back to self
-                        if key not in client_block[c.cthread.host]:
+                        # Removes the block if we just blocked it
+                        if not unblock(c.cthread.host, key):
                             c.writeValue(key, self.parent.db_read(key)[0])
-                        else:
-                            # Remove the block since we just blocked it
-                            client_block[c.cthread.host].discard(key)
                     except Exception as e:
                         if key not in self.queue:
                             self.queue.append(key)
@@ -514,19 +908,6 @@ class ClientThread(threading.Thread):
             # Limit how often we send data to other nodes
             time.sleep(0.2)
 
-    def getOutputFunction(self, key):
-        def outputCallback(fixkey, value, udata):
-            if True in value[1:]:
-                # This callback is likely only for old/fail etc we only care about the value itself
-                # Maybe this could be improved in the future
-                # But currently the goal is just sending the value and
-                # preventing loops
-                return
-            if key not in self.queue:
-                self.queue.append(key)
-
-        return outputCallback
-
     def stop(self):
         self.getout = True
         for c in self.clients:
@@ -543,6 +924,7 @@ class ClientThread(threading.Thread):
         d = OrderedDict({"Current Clients": connected + disconnected})
         d["Connected"] = connected
         d["Disonnected"] = disconnected
+        d["Resyncs"] = self.resyncs
 
         return d
 
@@ -551,7 +933,10 @@ class Plugin(plugin.PluginBase):
     def __init__(self, name, config, config_meta):
         super(Plugin, self).__init__(name, config, config_meta)
         if config["type"] in ["server", "both"]:
-            self.thread = ServerThread(self)
+            if config.get("server_mode", "threads") == "select":
+                self.thread = SelectServerThread(self)
+            else:
+                self.thread = ServerThread(self)
         if config["type"] in ["client", "both"]:
             self.client = ClientThread(self)
         if config["type"] not in ["server", "client", "both"]:
@@ -162,7 +162,7 @@ def map_data(json_data, parent):
                 source_key = rules["source"]
                 if source_key in json_data:
                     value = apply_transform(json_data[source_key], rules)
-                    parent.db_write(fixid, value)
+                    parent.handles[fixid].set(value)
             return
 
 
@@ -309,6 +309,11 @@ class Plugin(plugin.PluginBase):
         self.status["rtl_433 pid"] = None
         self.status["rtl_433 starts"] = 0
         validate_config(self)
+        # Look the fixids up once so each reading is a direct write
+        self.handles = dict()
+        for sensor in self.config["sensors"]:
+            for fixid in sensor["mappings"]:
+                self.handles[fixid] = self.db_get_handle(fixid)
 
     def run(self):
         self.thread.start()
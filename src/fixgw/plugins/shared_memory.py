@@ -0,0 +1,129 @@
+#  This plugin publishes the value and quality flags of every database item
+#  into a shared memory segment so that programs running on the same
+#  computer can read them without going through Net-FIX.  See
+#  fixgw/netfix/shm.py for the layout and the SharedDatabase class that the
+#  clients use to read it.
+
+import threading
+from collections import OrderedDict
+from multiprocessing import shared_memory
+
+import fixgw.plugin as plugin
+import fixgw.netfix.shm as shm
+
+
+# Owns the shared memory segment and writes the items into it.  items is
+# the list of database items to publish.
+class Publisher(object):
+    def __init__(self, name, items):
+        self.name = name
+        self.types = {}
+        directory, data, self.offsets, size = shm.layout(
+            [(i.key, i.typestring) for i in items]
+        )
+        try:
+            self.shm = shared_memory.SharedMemory(name=name, create=True, size=size)
+        except FileExistsError:
+            # Left behind by a gateway that did not shut down cleanly
+            old = shared_memory.SharedMemory(name=name)
+            old.close()
+            old.unlink()
+            self.shm = shared_memory.SharedMemory(name=name, create=True, size=size)
+        shm.owned.add(name)
+        self.buf = self.shm.buf
+        for item in items:
+            self.types[item.key] = shm.VALUES[item.typestring]
+        self.buf[shm.HEADER.size : shm.HEADER.size + len(directory)] = directory
+        self.changes = 0
+        self.lock = threading.Lock()
+        # The magic number goes in last so readers never see a half built
+        # segment
+        shm.HEADER.pack_into(
+            self.buf, 0, b"\0" * 8, shm.VERSION, len(directory), data, 0
+        )
+        self.buf[:8] = shm.MAGIC
+
+    # Writes the value and flags of one item.  value is the tuple that the
+    # database gives the callbacks.
+    def publish(self, key, value, timestamp):
+        with self.lock:
+            self._publish(key, value, timestamp)
+
+    # Writes every item in the snapshot.  Callbacks that come in while this
+    # is going on wait for the lock so their newer values end up on top.
+    def publish_snapshot(self, snap):
+        with self.lock:
+            for key, value in snap.values.items():
+                self._publish(key, value, snap.timestamps[key])
+
+    # Must be called with the lock held
+    def _publish(self, key, value, timestamp):
+        if self.buf is None:  # Closed
+            return
+        offset = self.offsets[key]
+        fmt = self.types[key]
+        v = value[0]
+        if fmt is shm.STRING:
+            b = ("" if v is None else str(v)).encode()[: shm.STRING_SIZE]
+            v = (len(b), b)
+        elif v is None:
+            v = (0,)
+        else:
+            v = (v,)
+        flags = 0
+        for i, bit in enumerate(
+            (shm.ANNUNCIATE, shm.OLD, shm.BAD, shm.FAIL, shm.SECFAIL), 1
+        ):
+            if value[i]:
+                flags |= bit
+        buf = self.buf
+        seq = shm.SEQUENCE.unpack_from(buf, offset)[0] + 1
+        shm.SEQUENCE.pack_into(buf, offset, seq)
+        shm.SLOT.pack_into(buf, offset, seq, timestamp, flags)
+        fmt.pack_into(buf, offset + shm.SLOT.size, *v)
+        shm.SEQUENCE.pack_into(buf, offset, seq + 1)
+        self.changes += 1
+        shm.CHANGES.pack_into(buf, shm.CHANGES_OFFSET, self.changes)
+
+    def close(self):
+        with self.lock:
+            self.buf = None
+            self.shm.close()
+            self.shm.unlink()
+            shm.owned.discard(self.name)
+
+
+class Plugin(plugin.PluginBase):
+    def __init__(self, name, config, config_meta):
+        super(Plugin, self).__init__(name, config, config_meta)
+        self.segment = config.get("segment", shm.DEFAULT_NAME)
+        self.publisher = None
+
+    def callback(self, key, value, udata):
+        item = self.items.get(key)
+        if item is None:  # Aux values are not published
+            return
+        self.publisher.publish(key, value, item.timestamp)
+
+    def run(self):
+        keys = self.db_list()
+        self.items = {key: self.db_get_item(key) for key in keys}
+        self.publisher = Publisher(self.segment, list(self.items.values()))
+        # Subscribe first so that nothing that changes while we copy the
+        # database is missed
+        self.db_callback_add("*", self.callback)
+        self.publisher.publish_snapshot(self.db_snapshot(keys))
+        self.log.info("Publishing {} keys to {}".format(len(keys), self.segment))
+
+    def stop(self):
+        self.db_callback_del("*", self.callback)
+        if self.publisher is not None:
+            self.publisher.close()
+            self.publisher = None
+
+    def get_status(self):
+        d = OrderedDict({"Segment": self.segment})
+        if self.publisher is not None:
+            d["Keys"] = len(self.publisher.offsets)
+            d["Changes"] = self.publisher.changes
+        return d
@@ -38,13 +38,16 @@ class MainThread(threading.Thread):
                 alt = struct.unpack(">h", msg[18:20])[0] - 5000.5
                 vs = struct.unpack(">h", msg[20:22])[0]
 
-                self.parent.db_write("PITCH", pitch)
-                self.parent.db_write("ROLL", roll)
-                self.parent.db_write("HEAD", heading)
-
-                self.parent.db_write("ALAT", -math.sin(slipskid * math.pi / 180))
-                self.parent.db_write("ALT", alt)
-                self.parent.db_write("VS", vs)
+                self.parent.db_write_many(
+                    {
+                        "PITCH": pitch,
+                        "ROLL": roll,
+                        "HEAD": heading,
+                        "ALAT": -math.sin(slipskid * math.pi / 180),
+                        "ALT": alt,
+                        "VS": vs,
+                    }
+                )
             elif msg[0] == 0x0A:
                 # ownship report
                 alt = struct.unpack(">h", msg[11:13])[0]
@@ -53,12 +53,9 @@ class MainThread(threading.Thread):
 
     def writedata(self, index, data):
         if index == 3:
-            self.parent.db_write("IAS", data[0])
-            self.parent.db_write("TAS", data[2])
+            self.parent.db_write_many({"IAS": data[0], "TAS": data[2]})
         elif index == 20:
-            self.parent.db_write("ALT", data[2])
-            self.parent.db_write("LAT", data[0])
-            self.parent.db_write("LONG", data[1])
+            self.parent.db_write_many({"ALT": data[2], "LAT": data[0], "LONG": data[1]})
         else:
             self.parent.log.debug("Dunno Index:" + str(index))
         # self.parent.db_write("",data[0])
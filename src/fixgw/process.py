@@ -0,0 +1,537 @@
+#  Runs a plugin in its own process so that it has its own interpreter and
+#  does not have to share the GIL with the rest of the gateway.  The plugin
+#  is loaded in the child process just like it would be in the gateway but
+#  the database functions of PluginBase are sent back to the real database
+#  in the gateway over a pipe.
+#
+#  Only plugins that use the PluginBase db_* methods can be run this way.
+#  db_get_item() is not available because the item lives in the other
+#  process, and plugins that import fixgw.database themselves would be
+#  talking to an empty database of their own.
+
+import importlib
+import itertools
+import logging
+import multiprocessing
+import queue
+import threading
+
+import fixgw.database as database
+import fixgw.plugin as plugin
+
+# How long to wait for the child to load or to stop the plugin
+TIMEOUT = 10.0
+
+
+class RemoteError(Exception):
+    pass
+
+
+# One end of the pipe between the gateway and a child process.  Messages are
+# tuples.  Anything that is posted is put in a buffer and a sender thread
+# sends everything in the buffer as one list, so a burst of writes goes over
+# the pipe in a few large messages instead of many small ones.  Messages are
+# always delivered in the order they were posted.
+#
+# ("post", method, args) calls methods[method](*args) on the other side.
+# ("call", id, method, args) does the same and sends back ("ret", id, result)
+# or ("err", id, exception).  call() waits for the result.
+#
+# Incoming posts and calls are run one at a time by a worker thread.  The
+# receiver thread only reads the pipe and hands out the results of calls, so
+# a method that makes a call back to the other side can not deadlock.
+class Channel(object):
+    def __init__(self, conn, methods, name="channel"):
+        self.conn = conn
+        self.methods = methods
+        self.buffer = []
+        self.cond = threading.Condition()
+        self.running = True
+        self.ids = itertools.count()
+        self.waiting = {}
+        self.incoming = queue.Queue()
+        self.closed = threading.Event()
+        self.batches = 0
+        self.messages = 0
+        self.threads = [
+            threading.Thread(target=self._send, name=name + " send"),
+            threading.Thread(target=self._receive, name=name + " receive"),
+            threading.Thread(target=self._work, name=name + " work"),
+        ]
+        for t in self.threads:
+            t.daemon = True
+            t.start()
+
+    def post(self, method, *args):
+        with self.cond:
+            self.buffer.append(("post", method, args))
+            if len(self.buffer) == 1:
+                self.cond.notify()
+
+    def call(self, method, *args, timeout=TIMEOUT):
+        slot = [threading.Event(), None, None]
+        with self.cond:
+            id = next(self.ids)
+            self.waiting[id] = slot
+            self.buffer.append(("call", id, method, args))
+            self.cond.notify()
+        if not slot[0].wait(timeout):
+            with self.cond:
+                self.waiting.pop(id, None)
+            raise RemoteError("No response to {}".format(method))
+        if slot[2] is not None:
+            raise slot[2]
+        return slot[1]
+
+    # Finishes whatever the worker is doing, sends everything that is still
+    # in the buffer and stops the threads
+    def close(self):
+        self.incoming.put(None)
+        for t in self.threads[2], self.threads[0]:
+            if t is threading.current_thread():
+                continue
+            if t is self.threads[0]:
+                with self.cond:
+                    self.running = False
+                    self.cond.notify()
+            t.join(TIMEOUT)
+
+    def _send(self):
+        while True:
+            with self.cond:
+                while self.running and not self.buffer:
+                    self.cond.wait()
+                batch = self.buffer
+                self.buffer = []
+                if not batch and not self.running:
+                    break
+            try:
+                self.conn.send(batch)
+            except (OSError, ValueError):
+                break
+            self.batches += 1
+            self.messages += len(batch)
+
+    def _receive(self):
+        while True:
+            try:
+                batch = self.conn.recv()
+            except (EOFError, OSError):
+                break
+            for msg in batch:
+                if msg[0] == "ret" or msg[0] == "err":
+                    with self.cond:
+                        slot = self.waiting.pop(msg[1], None)
+                    if slot is not None:
+                        if msg[0] == "ret":
+                            slot[1] = msg[2]
+                        else:
+                            slot[2] = msg[2]
+                        slot[0].set()
+                else:
+                    self.incoming.put(msg)
+        self.closed.set()
+        # Anyone still waiting for an answer is not going to get one
+        with self.cond:
+            waiting = self.waiting
+            self.waiting = {}
+        for slot in waiting.values():
+            slot[2] = RemoteError("Connection closed")
+            slot[0].set()
+        self.incoming.put(None)
+
+    def _reply(self, msg):
+        with self.cond:
+            self.buffer.append(msg)
+            self.cond.notify()
+
+    def _work(self):
+        while True:
+            msg = self.incoming.get()
+            if msg is None:
+                break
+            if msg[0] == "post":
+                try:
+                    self.methods[msg[1]](*msg[2])
+                except Exception as e:
+                    logging.getLogger(__name__).error(
+                        "Remote {} failed: {}".format(msg[1], e)
+                    )
+            elif msg[0] == "call":
+                try:
+                    result = self.methods[msg[2]](*msg[3])
+                except Exception as e:
+                    self._reply(("err", msg[1], _picklable(e)))
+                else:
+                    self._reply(("ret", msg[1], result))
+
+
+# Some exceptions can not be pickled so they are sent as a RemoteError
+def _picklable(e):
+    if isinstance(e, (KeyError, ValueError, TypeError, database.ResyncNeeded)):
+        return e
+    return RemoteError("{}: {}".format(type(e).__name__, e))
+
+
+# Stands in for a database handle in the child
+class RemoteHandle(object):
+    __slots__ = ("key", "aux", "get", "set", "remote", "writer")
+
+    def __init__(self, remote, key, writer):
+        self.remote = remote
+        self.key = key
+        self.writer = writer
+        self.aux = key.split(".")[1] if "." in key else None
+
+        def get():
+            return remote.read(key)
+
+        def set(value):
+            remote.write(key, value, writer)
+
+        self.get = get
+        self.set = set
+
+    def set_aux(self, name, value):
+        self.remote.write("{}.{}".format(self.key.split(".")[0], name), value)
+
+    def update(self, value=None, **flags):
+        self.remote.update(self.key, value, flags, self.writer)
+
+    def increment(self, delta):
+        self.remote.increment(self.key, delta, self.writer)
+
+    def toggle(self):
+        self.remote.toggle(self.key, self.writer)
+
+    def compare_and_set(self, expected, new):
+        return self.remote.compare_and_set(self.key, expected, new, self.writer)
+
+    def __repr__(self):
+        return "RemoteHandle({!r})".format(self.key)
+
+
+# Takes the place of the fixgw.database module for PluginBase in the child.
+# Writes are posted and do not wait.  Everything that returns something is
+# a call to the gateway.  Callbacks are kept here and the gateway is told
+# which key to send for each one.
+class RemoteDatabase(object):
+    def __init__(self):
+        self.channel = None
+        self.callbacks = {}
+        self.ids = itertools.count()
+
+    def read(self, key):
+        return self.channel.call("read", key)
+
+    def write(self, key, value, writer=None):
+        self.channel.post("write", key, value, writer)
+
+    def write_many(self, values, writer=None):
+        self.channel.post("write_many", values, writer)
+
+    def update(self, key, value, flags, writer=None):
+        self.channel.post("update", key, value, flags, writer)
+
+    def increment(self, key, delta, writer=None):
+        self.channel.post("increment", key, delta, writer)
+
+    def toggle(self, key, writer=None):
+        self.channel.post("toggle", key, writer)
+
+    def compare_and_set(self, key, expected, new, writer=None):
+        return self.channel.call("compare_and_set", key, expected, new, writer)
+
+    def get_handle(self, key, writer=None):
+        # Make sure that it exists now like the real one does
+        self.channel.call("check_key", key)
+        return RemoteHandle(self, key, writer)
+
+    def snapshot(self, keys=None):
+        return self.channel.call("snapshot", keys)
+
+    def sequence(self):
+        return self.channel.call("sequence")
+
+    def changes(self, since):
+        return self.channel.call("changes", since)
+
+    def listkeys(self, pattern=None):
+        return self.channel.call("listkeys", pattern)
+
+    def get_raw_item(self, key):
+        raise NotImplementedError(
+            "db_get_item() can not be used by a plugin in its own process"
+        )
+
+    def _find(self, kind, key, function, udata):
+        for id, cb in self.callbacks.items():
+            if cb == (kind, key, function, udata):
+                return id
+        return None
+
+    def callback_add(self, name, key, function, udata):
+        id = next(self.ids)
+        self.callbacks[id] = ("key", key, function, udata)
+        try:
+            self.channel.call("callback_add", key, id)
+        except Exception:
+            del self.callbacks[id]
+            raise
+
+    def callback_del(self, name, key, function, udata):
+        id = self._find("key", key, function, udata)
+        if id is not None:
+            self.channel.call("callback_del", key, id)
+            del self.callbacks[id]
+
+    def batch_callback_add(self, name, function, udata):
+        id = next(self.ids)
+        self.callbacks[id] = ("batch", None, function, udata)
+        self.channel.call("batch_callback_add", id)
+
+    def batch_callback_del(self, name, function, udata):
+        id = self._find("batch", None, function, udata)
+        if id is not None:
+            self.channel.call("batch_callback_del", id)
+            del self.callbacks[id]
+
+    # Called by the gateway
+    def callback(self, id, key, value):
+        cb = self.callbacks.get(id)
+        if cb is None:
+            return
+        if key is None:
+            cb[2](value, cb[3])
+        else:
+            cb[2](key, value, cb[3])
+
+
+# Takes the place of plugin.jobQueue in the child so that quit() works
+class RemoteJobQueue(object):
+    def __init__(self, channel):
+        self.channel = channel
+
+    def put(self, job):
+        self.channel.post("job", job)
+
+
+# Sends the log records of the child to the gateway's loggers
+class RemoteLogHandler(logging.Handler):
+    def __init__(self, channel):
+        super(RemoteLogHandler, self).__init__()
+        self.channel = channel
+
+    def emit(self, record):
+        try:
+            record.msg = record.getMessage()
+            record.args = None
+            if record.exc_info:
+                record.exc_text = logging.Formatter().formatException(record.exc_info)
+                record.exc_info = None
+            self.channel.post("log", record)
+        except Exception:
+            self.handleError(record)
+
+
+def _child_main(name, module, config, config_meta, conn, level):
+    remote = RemoteDatabase()
+    stopped = threading.Event()
+    p = None
+
+    def start():
+        p.start()
+
+    def stop():
+        try:
+            p.shutdown()
+        finally:
+            stopped.set()
+
+    methods = {
+        "start": start,
+        "stop": stop,
+        "is_running": lambda: p.is_running(),
+        "get_status": lambda: p.get_status(),
+        "callback": remote.callback,
+    }
+    channel = Channel(conn, methods, name)
+    remote.channel = channel
+    root = logging.getLogger()
+    root.handlers = [RemoteLogHandler(channel)]
+    root.setLevel(level)
+    plugin.database = remote
+    plugin.jobQueue = RemoteJobQueue(channel)
+    try:
+        mod = importlib.import_module(module)
+        p = mod.Plugin(name, config, config_meta)
+    except Exception as e:
+        channel.post("loaded", _picklable(e))
+    else:
+        channel.post("loaded", None)
+        # Stop if the gateway goes away without telling us
+        while not stopped.wait(1.0):
+            if channel.closed.is_set():
+                try:
+                    p.shutdown()
+                except Exception:
+                    pass
+                break
+    channel.close()
+
+
+# This is what the gateway holds for a plugin that runs in another process.
+# It looks like any other plugin to the rest of the gateway.  The plugin in
+# the child does its own logging so this does not log starting and stopping
+# a second time.
+class ProcessPlugin(plugin.PluginBase):
+    def __init__(self, name, module, config, config_meta):
+        self.name = name
+        self.log = logging.getLogger("fixgw." + name)
+        self.config = config
+        self.config_meta = config_meta
+        self.running = False
+        self.module = module
+        self.loaded = threading.Event()
+        self.load_error = None
+        self.forward = self._forward
+        self.forward_batch = self._forward_batch
+        self.callback_ids = set()
+        self.batch_ids = set()
+        ctx = multiprocessing.get_context("spawn")
+        conn, child = ctx.Pipe()
+        methods = {
+            "loaded": self._loaded,
+            "read": database.read,
+            "write": database.write,
+            "write_many": database.write_many,
+            "update": self._update,
+            "increment": database.increment,
+            "toggle": database.toggle,
+            "compare_and_set": database.compare_and_set,
+            "check_key": self._check_key,
+            "snapshot": database.snapshot,
+            "sequence": database.sequence,
+            "changes": database.changes,
+            "listkeys": database.listkeys,
+            "callback_add": self._callback_add,
+            "callback_del": self._callback_del,
+            "batch_callback_add": self._batch_callback_add,
+            "batch_callback_del": self._batch_callback_del,
+            "job": plugin.jobQueue.put,
+            "log": self._log,
+        }
+        self.channel = Channel(conn, methods, name)
+        self.process = ctx.Process(
+            target=_child_main,
+            args=(
+                name,
+                module,
+                config,
+                config_meta,
+                child,
+                logging.getLogger().getEffectiveLevel(),
+            ),
+            name="fixgw " + name,
+            daemon=True,
+        )
+        self.process.start()
+        child.close()
+        if not self.loaded.wait(TIMEOUT):
+            self._kill()
+            raise RemoteError("Plugin {} did not load".format(name))
+        if self.load_error is not None:
+            self._kill()
+            raise self.load_error
+
+    def _loaded(self, error):
+        self.load_error = error
+        self.loaded.set()
+
+    def _log(self, record):
+        logging.getLogger(record.name).handle(record)
+
+    # The (name, function, udata) of the forwarding callbacks has the id
+    # of the child's callback as the udata.  Bound methods are new objects
+    # every time so the same ones are kept to be able to remove them.
+    def _forward(self, key, value, id):
+        self.channel.post("callback", id, key, value)
+
+    def _forward_batch(self, values, id):
+        self.channel.post("callback", id, None, values)
+
+    def _callback_add(self, key, id):
+        database.callback_add(self.name, key, self.forward, id)
+        self.callback_ids.add(id)
+
+    def _callback_del(self, key, id):
+        database.callback_del(self.name, key, self.forward, id)
+        self.callback_ids.discard(id)
+
+    def _batch_callback_add(self, id):
+        database.batch_callback_add(self.name, self.forward_batch, id)
+        self.batch_ids.add(id)
+
+    def _batch_callback_del(self, id):
+        database.batch_callback_del(self.name, self.forward_batch, id)
+        self.batch_ids.discard(id)
+
+    def _update(self, key, value, flags, writer):
+        database.get_raw_item(key).update(value, writer=writer, **flags)
+
+    # Raises KeyError if the key does not exist
+    def _check_key(self, key):
+        database.get_handle(key)
+
+    def _kill(self):
+        self.channel.close()
+        if self.process.is_alive():
+            self.process.terminate()
+        self.process.join(1.0)
+
+    def start(self):
+        self.run()
+        self.running = True
+
+    def shutdown(self):
+        self.stop()
+        self.running = False
+
+    def run(self):
+        self.channel.call("start")
+
+    def stop(self):
+        try:
+            self.channel.call("stop")
+        except RemoteError as e:
+            self.log.error(e)
+        self.process.join(TIMEOUT)
+        # Anything the child still had subscribed goes away with it
+        for id in list(self.callback_ids):
+            database.callback_del(self.name, "*", self.forward, id)
+        for id in list(self.batch_ids):
+            database.batch_callback_del(self.name, self.forward_batch, id)
+        if self.process.is_alive():
+            self._kill()
+            raise plugin.PluginFail
+        self.channel.close()
+
+    def is_running(self):
+        if not self.process.is_alive():
+            return False
+        try:
+            return self.channel.call("is_running")
+        except RemoteError:
+            return False
+
+    def get_status(self):
+        d = {"Process ID": self.process.pid}
+        try:
+            x = self.channel.call("get_status")
+        except RemoteError as e:
+            x = {"Error": str(e)}
+        if x:
+            d.update(x)
+        d["IPC Messages Sent"] = self.channel.messages
+        d["IPC Batches Sent"] = self.channel.batches
+        return d
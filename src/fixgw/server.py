@@ -35,6 +35,7 @@ import datetime
 import fixgw.database as database
 import fixgw.status as status
 import fixgw.plugin as plugin
+import fixgw.process as process
 import fixgw.quorum as quorum
 from os import environ
 from fixgw import cfg
@@ -68,9 +69,14 @@ def load_plugin(name, module, config, config_meta):
     # sent to the plugin.
     for each in ["load", "module"]:
         del config[each]
+    in_process = config.pop("process", False)
     # Add some global information to the config
     config["CONFIGPATH"] = config_path
-    plugins[name] = plugin_mods[name].Plugin(name, config, config_meta)
+    if in_process:
+        # The module is loaded again in the child process
+        plugins[name] = process.ProcessPlugin(name, module, config, config_meta)
+    else:
+        plugins[name] = plugin_mods[name].Plugin(name, config, config_meta)
 
 
 # This function recursively walks the given directory in the installed
@@ -199,7 +205,9 @@ def main_setup():
             custom = yaml.safe_load(cf)
         merge_dict(preferences, custom)
 
-    config,config_meta = cfg.from_yaml(config_file, preferences=preferences, metadata=True)
+    config, config_meta = cfg.from_yaml(
+        config_file, preferences=preferences, metadata=True
+    )
 
     # If running under systemd
     if environ.get("INVOCATION_ID", False):
@@ -244,12 +252,21 @@ def main_setup():
 
     # Open database definition file and send to database initialization
     dbfile = config["database file"].format(CONFIG=config_path)
+    dbcache = config.get("database cache")
+    if dbcache:
+        dbcache = dbcache.format(CONFIG=config_path)
     try:
-        database.init(dbfile)
+        database.init(dbfile, dbcache)
     except Exception as e:
         log.error("Database failure, Exiting:" + str(e))
         raise
 
+    dispatcher = config.get("callback dispatcher")
+    if dispatcher and dispatcher.get("enabled", False):
+        database.start_dispatcher(dispatcher.get("queue size", 10000))
+    if config.get("callback timing", False):
+        database.callback_timing(True)
+
     database.write("GATEWAY_VERSION", __version__)
     if "initialization files" in config and config["initialization files"]:
         ifiles = config["initialization files"]
@@ -359,7 +376,12 @@ def main_setup():
             if load:
                 module = config["connections"][each]["module"]
                 try:
-                    load_plugin(each, module, config["connections"][each], config_meta["connections"][each])
+                    load_plugin(
+                        each,
+                        module,
+                        config["connections"][each],
+                        config_meta["connections"][each],
+                    )
                 except Exception as e:
                     logging.critical(
                         "Unable to load module - " + module + ": " + str(e)
@@ -452,6 +474,7 @@ def run(args):
         except plugin.PluginFail:
             log.warning("Plugin {0} did not shutdown properly".format(each))
             cleanstop = False
+    database.stop_dispatcher()
 
     if cleanstop == True:
         log.info("FIX Gateway Exiting Normally")
@@ -39,6 +39,15 @@ class Status:
         result.update(get_system_status())
         # Database information
         db = {"Item Count": self.db_item_count}
+        notify = database.notify_statistics()
+        if notify:
+            db.update(notify)
+        dispatcher = database.dispatcher_status()
+        if dispatcher:
+            db["Callback Dispatcher"] = dispatcher
+        timing = database.callback_statistics()
+        if timing:
+            db["Callback Timing"] = timing
         result["Database Statistics"] = db
         # Add plugin status
         for name in self.plugins:
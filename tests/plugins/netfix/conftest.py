@@ -126,15 +126,17 @@ entries:
   initial: "Loaded"
 """
 
-@pytest.fixture
-def netfix_config():
+# Every test is run against both kinds of server
+@pytest.fixture(params=["threads", "select"])
+def netfix_config(request):
     return """
 type: server
+server_mode: {}
 host: 0.0.0.0
 port: 34901
 buffer_size: 1024
 timeout: 1.0
-"""
+""".format(request.param)
 
 
 Objects = namedtuple(
@@ -15,10 +15,13 @@
 #  Foundation, Inc., 59 Temple Place - Suite 330, Boston, MA 02111-1307, USA.
 
 import io
+import json
 import time
 import yaml
 import socket
 import logging
+import fixgw.netfix
+import fixgw.plugins.netfix
 
 
 
@@ -71,6 +74,23 @@ def test_subscription_invalid_fixid(plugin):
     res = plugin.sock.recv(1024).decode()
     assert res == "@sNOPE!001\n"
 
+def test_pattern_subscription(plugin,database):
+    plugin.sock.sendall("@sCHT1?\n".encode())
+    res = plugin.sock.recv(1024).decode()
+    assert res == "@sCHT1?\n"
+    database.write("CHT12", 300.0)
+    database.write("ALT", 310.0)
+    database.write("CHT16", 320.0)
+    time.sleep(0.01)
+    res = plugin.sock.recv(1024).decode()
+    assert res == "CHT12;300.0;00000\nCHT16;320.0;00000\n"
+    plugin.sock.sendall("@uCHT1?\n".encode())
+    res = plugin.sock.recv(1024).decode()
+    assert res == "@uCHT1?\n"
+    plugin.sock.sendall("@sNOPE*\n".encode())
+    res = plugin.sock.recv(1024).decode()
+    assert res == "@sNOPE*!001\n"
+
 def test_unsubscribe_invalid_fixid(plugin):
     plugin.sock.sendall("@uNOPE\n".encode())
     res = plugin.sock.recv(1024).decode()
@@ -472,6 +492,36 @@ def test_status_command(plugin):
     # Not sure how to init the status so we get actual data
     assert '@xstatus;' in res
 
+def test_timing_command(plugin, database):
+    plugin.sock.sendall("@xtiming;on\n".encode())
+    res = plugin.sock.recv(1024).decode()
+    assert res == "@xtiming;on\n"
+    assert database.callback_timing_enabled()
+    plugin.sock.sendall("@xtiming;off\n".encode())
+    res = plugin.sock.recv(1024).decode()
+    assert res == "@xtiming;off\n"
+    assert not database.callback_timing_enabled()
+    plugin.sock.sendall("@xtiming\n".encode())
+    res = plugin.sock.recv(1024).decode()
+    assert res == "@xtiming;off\n"
+    plugin.sock.sendall("@xtiming;maybe\n".encode())
+    res = plugin.sock.recv(1024).decode()
+    assert res == "@xtiming;maybe!002\n"
+
+def test_top_command(plugin, database):
+    for i in range(5):
+        database.write("ALT", 1000 + i)
+    plugin.sock.sendall("@xtop;1\n".encode())
+    res = plugin.sock.recv(1024).decode()
+    assert res.startswith("@xtop;1;")
+    top = json.loads(res[8:])
+    assert len(top) == 1
+    assert top[0]["key"] == "ALT"
+    assert top[0]["writes"] >= 5
+    plugin.sock.sendall("@xtop;lots\n".encode())
+    res = plugin.sock.recv(1024).decode()
+    assert res == "@xtop;lots!002\n"
+
 def test_kill_command(plugin):
     plugin.sock.sendall("@xkill\n".encode())
     res = plugin.sock.recv(1024).decode()
@@ -507,6 +557,18 @@ def test_read_non_tuple_fixid(plugin,database):
     a = res.split(';')
     assert a[1] == "20.5\n"
 
+def test_value_update_notifies_once(plugin,database):
+    seen = []
+    database.callback_add("test", "ALT", lambda k, v, u: seen.append(v), None)
+    plugin.sock.sendall("ALT;2600;1111\n".encode())
+    time.sleep(0.1)
+    assert seen == [(2600.0, True, False, True, True, True)]
+    # x leaves the bad flag alone
+    plugin.sock.sendall("ALT;2600;0x01\n".encode())
+    time.sleep(0.1)
+    assert seen[-1] == (2600.0, False, False, True, False, True)
+    assert len(seen) == 2
+
 def test_send_invalid_value_update(plugin,caplog):
     with caplog.at_level(logging.DEBUG):
         plugin.sock.sendall("IAS;10\n".encode())
@@ -522,3 +584,137 @@ def test_send_invalid_value_update2(plugin,caplog):
         assert 'Problem with input IAS;10;10;10;10;10: string index out of range' in caplog.text        
 
 
+
+def test_split_utf8_write(plugin,database):
+    # The two bytes of the é arrive in different packets
+    data = "@wACID;Café\n".encode()
+    plugin.sock.sendall(data[:-2])
+    time.sleep(0.05)
+    plugin.sock.sendall(data[-2:] + b"@wACID;\xff\n@rACID\n")
+    res = b""
+    while res.count(b"\n") < 2:
+        res += plugin.sock.recv(1024)
+    assert res.decode() == "@wACID;Café;00000\n@rACID;Café;00000\n"
+    assert database.read("ACID")[0] == "Café"
+
+
+def test_line_framer():
+    framer = fixgw.netfix.LineFramer()
+    assert framer.feed(b"ALT;1") == []
+    assert framer.feed(b"0\nIAS;2\nPI") == ["ALT;10", "IAS;2"]
+    assert framer.feed(b"TCH;3\n\xc3") == ["PITCH;3"]
+    assert framer.feed(b"\xa9\n\xff\nx\n") == ["\xe9", None, "x"]
+
+
+def test_send_coalescing(database):
+    class Conn(object):
+        def __init__(self):
+            self.sent = []
+
+        def sendall(self, data):
+            self.sent.append(data)
+
+        def close(self):
+            pass
+
+    config = {"type": "server", "host": "127.0.0.1", "port": 0}
+    pl = fixgw.plugins.netfix.Plugin("netfix", config, None)
+    co = fixgw.plugins.netfix.Connection(pl, Conn(), ("127.0.0.1", 0))
+    for i in range(100):
+        co.queue.put("ALT;{};00000\n".format(i).encode())
+    co.queue.put("exit")
+    t = fixgw.plugins.netfix.SendThread(co)
+    t.start()
+    t.join()
+    # Everything that was waiting went out in one send
+    assert len(co.conn.sent) == 1
+    assert co.conn.sent[0].count(b"\n") == 100
+    assert (t.msg_sent, t.sends) == (100, 1)
+    assert t.bytes_sent == len(co.conn.sent[0])
+
+
+def test_value_sentence_shared(database):
+    config = {"type": "server", "host": "127.0.0.1", "port": 0}
+    pl = fixgw.plugins.netfix.Plugin("netfix", config, None)
+    conns = [
+        fixgw.plugins.netfix.Connection(pl, None, ("127.0.0.1", 0)) for i in range(3)
+    ]
+    for co in conns:
+        co.handle_request("@sALT")
+        co.queue.get()
+    database.write("ALT", 3100.0)
+    sent = [co.queue.get() for co in conns]
+    assert sent[0] == b"ALT;3100.0;00000\n"
+    # Every connection got the same bytes object
+    assert sent[1] is sent[0] and sent[2] is sent[0]
+    # A read of the unchanged item uses the same sentence
+    conns[0].handle_request("@rALT")
+    assert conns[0].queue.get() == b"@rALT;3100.0;00000\n"
+    assert fixgw.plugins.netfix.sentences["ALT"][1] is sent[0]
+    # A new value or new flags make a new sentence
+    database.write("ALT", 3200.0)
+    assert conns[0].queue.get() == b"ALT;3200.0;00000\n"
+    database.get_raw_item("ALT").bad = True
+    assert conns[0].queue.get() == b"ALT;3200.0;00100\n"
+    conns[0].handle_request("@rALT")
+    assert conns[0].queue.get() == b"@rALT;3200.0;00100\n"
+    for co in conns:
+        pl.db_callback_del("ALT", co.subscription_handler)
+
+
+def test_output_queue():
+    q = fixgw.plugins.netfix.OutputQueue(limit=100)
+    q.put(b"@sALT\n")
+    q.put_value("ALT", b"ALT;1000.0;00000\n")
+    q.put(b"@sIAS\n")
+    q.put_value("IAS", b"IAS;100.0;00000\n")
+    q.put_value("ALT", b"ALT;1100.0;00000\n")
+    q.put_value("ALT", b"ALT;1200.0;00000\n")
+    # The newest ALT keeps the place of the first one
+    assert q.backlog() == (4, 6 + 17 + 6 + 16)
+    assert q.conflated == 2
+    assert q.get_many(1000, False) == [
+        b"@sALT\n",
+        b"ALT;1200.0;00000\n",
+        b"@sIAS\n",
+        b"IAS;100.0;00000\n",
+    ]
+    assert q.backlog() == (0, 0)
+    # Nothing is queued past the limit but exit always is
+    for i in range(10):
+        q.put("@r{};0\n".format(i).encode())
+    assert q.backlog() == (10, 70)
+    q.put(b"@l1;1;ALT\n")
+    q.put_value("ALT", b"ALT;1300.0;00000\n")
+    q.put("exit")
+    assert q.dropped == 2
+    assert q.get_many(35) == [b"@r0;0\n", b"@r1;0\n", b"@r2;0\n", b"@r3;0\n", b"@r4;0\n"]
+    assert q.get_many(1000)[-1] == "exit"
+
+
+def test_subscription_conflation(database):
+    config = {"type": "server", "host": "127.0.0.1", "port": 0}
+    pl = fixgw.plugins.netfix.Plugin("netfix", config, None)
+    co = fixgw.plugins.netfix.Connection(pl, None, ("127.0.0.1", 0))
+    co.handle_request("@sALT")
+    # Nothing is reading the queue so only the last value is kept
+    for i in range(100):
+        database.write("ALT", float(i))
+    co.handle_request("@rIAS")
+    assert co.queue.get_many(1000, False) == [
+        b"@sALT\n",
+        b"ALT;99.0;00000\n",
+        b"@rIAS;0.0;00000\n",
+    ]
+    assert co.queue.conflated == 99
+    pl.db_callback_del("ALT", co.subscription_handler)
+
+
+def test_backlog_status(plugin):
+    plugin.sock.sendall(b"@sALT\n")
+    assert plugin.sock.recv(1024) == b"@sALT\n"
+    c = plugin.pl.get_status()["Connection 0"]
+    assert c["Backlog"] == 0
+    assert c["Backlog Bytes"] == 0
+    assert c["Conflated"] == 0
+    assert c["Dropped"] == 0
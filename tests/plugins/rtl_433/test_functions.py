@@ -130,10 +130,12 @@ def test_start_rtl_433_simulate(mock_popen):
 
 @pytest.fixture
 def mock_plugin(rtl_433_config):
-    """Creates a mock plugin instance with a fake db_write method."""
+    """Creates a mock plugin instance with fake database handles."""
     config = cfg.from_yaml(rtl_433_config)
     plugin_mock = MagicMock()
-    plugin_mock.db_write = MagicMock()
+    plugin_mock.handles = {
+        fixid: MagicMock() for fixid in ["TIREP1", "TIRET1", "TIREB1"]
+    }
     plugin_mock.status = {"Devices Seen": {}}
     plugin_mock.config = config
     return plugin_mock
@@ -154,14 +156,14 @@ def test_process_json_valid(mock_plugin):
     process_json(json_data, mock_plugin)
 
     # Ensure database writes were triggered correctly
-    mock_plugin.db_write.assert_any_call(
-        "TIREP1", pytest.approx(250 * 0.145032632, 0.1)
+    mock_plugin.handles["TIREP1"].set.assert_called_once_with(
+        pytest.approx(250 * 0.145032632, 0.1)
     )  # PSI conversion
-    mock_plugin.db_write.assert_any_call(
-        "TIRET1", (30 - 40)
+    mock_plugin.handles["TIRET1"].set.assert_called_once_with(
+        (30 - 40)
     )  # Temperature offset applied
-    mock_plugin.db_write.assert_any_call(
-        "TIREB1", 1
+    mock_plugin.handles["TIREB1"].set.assert_called_once_with(
+        1
     )  # Battery voltage > 2.0 should set to 1 (OK)
 
 
@@ -171,8 +173,9 @@ def test_process_json_invalid_json(mock_plugin):
 
     process_json(invalid_json, mock_plugin)
 
-    # Ensure db_write was never called since JSON was invalid
-    mock_plugin.db_write.assert_not_called()
+    # Ensure nothing was written since JSON was invalid
+    for handle in mock_plugin.handles.values():
+        handle.set.assert_not_called()
 
 
 def test_process_json_missing_keys(mock_plugin):
@@ -185,5 +188,6 @@ def test_process_json_missing_keys(mock_plugin):
 
     process_json(partial_json, mock_plugin)
 
-    # Ensure db_write was not called since no valid data was present
-    mock_plugin.db_write.assert_not_called()
+    # Ensure nothing was written since no valid data was present
+    for handle in mock_plugin.handles.values():
+        handle.set.assert_not_called()
@@ -0,0 +1,85 @@
+import os
+import pytest
+import fixgw.plugins.shared_memory
+import fixgw.netfix.shm as shm
+
+
+@pytest.fixture
+def plugin(database):
+    name = "fixgw_test_{}".format(os.getpid())
+    pl = fixgw.plugins.shared_memory.Plugin("shared_memory", {"segment": name}, None)
+    pl.start()
+    reader = shm.SharedDatabase(name)
+    yield pl, reader
+    reader.close()
+    pl.shutdown()
+
+
+def test_initial_values(plugin, database):
+    pl, reader = plugin
+    assert sorted(reader.get_item_list()) == sorted(database.listkeys())
+    for key in ["ALT", "ZZLOADER", "TIMEZ"]:
+        assert reader.read(key) == database.read(key)
+    assert reader.timestamp("ALT") == database.get_raw_item("ALT").timestamp
+
+
+def test_value_changes(plugin, database):
+    pl, reader = plugin
+    reader.poll()
+    assert reader.poll() == []
+    database.write("ALT", 2500.0)
+    database.write("ZZLOADER", "Loaded again")
+    database.get_raw_item("IAS").bad = True
+    assert sorted(reader.poll()) == ["ALT", "IAS", "ZZLOADER"]
+    assert reader.read("ALT") == (2500.0, False, False, False, False, False)
+    assert reader.get_value("ZZLOADER") == "Loaded again"
+    assert reader.read("IAS")[3] is True
+    # Aux values are not published
+    changes = reader.changes()
+    database.write("IAS.Vne", 200.0)
+    assert reader.changes() == changes
+    status = pl.get_status()
+    assert status["Keys"] == len(database.listkeys())
+    assert status["Changes"] == changes
+
+
+def test_long_string(plugin, database):
+    pl, reader = plugin
+    database.write("ZZLOADER", "x" * 100)
+    assert reader.get_value("ZZLOADER") == "x" * shm.STRING_SIZE
+
+
+def test_not_a_database():
+    from multiprocessing import shared_memory
+
+    name = "fixgw_test_bad_{}".format(os.getpid())
+    s = shared_memory.SharedMemory(name=name, create=True, size=64)
+    try:
+        with pytest.raises(shm.ReadError):
+            shm.SharedDatabase(name)
+    finally:
+        s.close()
+        s.unlink()
+
+
+def test_segment_removed_on_stop(database):
+    name = "fixgw_test_stop_{}".format(os.getpid())
+    pl = fixgw.plugins.shared_memory.Plugin("shared_memory", {"segment": name}, None)
+    pl.start()
+    pl.shutdown()
+    with pytest.raises(FileNotFoundError):
+        shm.SharedDatabase(name)
+
+
+def test_stale_segment_replaced(database):
+    from multiprocessing import shared_memory
+
+    name = "fixgw_test_stale_{}".format(os.getpid())
+    s = shared_memory.SharedMemory(name=name, create=True, size=64)
+    s.close()
+    pl = fixgw.plugins.shared_memory.Plugin("shared_memory", {"segment": name}, None)
+    pl.start()
+    reader = shm.SharedDatabase(name)
+    assert reader.read("ALT") == database.read("ALT")
+    reader.close()
+    pl.shutdown()
@@ -27,17 +27,12 @@ def main_thread(mock_parent):
 
 def test_writedata(mock_parent, main_thread):
     main_thread.writedata(3, [100.0, 0.0, 200.0])
-    mock_parent.db_write.assert_has_calls([
-        call("IAS", 100.0),
-        call("TAS", 200.0),
-    ], any_order=True)
+    mock_parent.db_write_many.assert_called_with({"IAS": 100.0, "TAS": 200.0})
 
     main_thread.writedata(20, [40.7128, -74.0060, 1000.0])
-    mock_parent.db_write.assert_has_calls([
-        call("LAT", 40.7128),
-        call("LONG", -74.0060),
-        call("ALT", 1000.0),
-    ], any_order=True)
+    mock_parent.db_write_many.assert_called_with(
+        {"LAT": 40.7128, "LONG": -74.0060, "ALT": 1000.0}
+    )
 
     main_thread.writedata(99, [0.0, 0.0, 0.0])
     mock_parent.log.debug.assert_called_with("Dunno Index:99")
@@ -0,0 +1,34 @@
+# A small plugin for test_plugin_process.py.  It has to be in a module of its
+# own so that the child process can import it.
+
+import fixgw.plugin as plugin
+
+
+class Plugin(plugin.PluginBase):
+    def __init__(self, name, config, config_meta):
+        super(Plugin, self).__init__(name, config, config_meta)
+        if config.get("fail"):
+            raise ValueError("Told to fail")
+        self.received = []
+
+    # Writes back twice what it gets so the test can see that callbacks
+    # reach the child and that the child can write from one
+    def callback(self, key, value, udata):
+        self.received.append(key)
+        self.db_write("PITCH", value[0] * 2)
+
+    def run(self):
+        self.db_callback_add("ROLL", self.callback)
+        self.db_write("ALT", 1234.0)
+        self.db_get_handle("IAS").set(99.0)
+        self.db_get_handle("YAW").update(5.0, bad=True)
+
+    def stop(self):
+        self.db_callback_del("ROLL", self.callback)
+
+    def get_status(self):
+        try:
+            self.db_get_item("ALT")
+        except NotImplementedError:
+            item = "Not Available"
+        return {"Received": len(self.received), "Item": item}
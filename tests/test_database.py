@@ -17,9 +17,13 @@
 import unittest
 import io
 import time
+import math
+import threading
+import os
+import tempfile
+from unittest.mock import patch
 import fixgw.database as database
 
-
 # This is a poorly formatted example of a database configuration file.
 # it should test leading/trailing spaces blank lines etc.
 minimal_config = """
@@ -44,7 +48,7 @@ entries:
 minimal_list = []
 for x in range(8):
     minimal_list.append("ANLG{}".format(x + 1))
-minimal_list.append('ZZLOADER')
+minimal_list.append("ZZLOADER")
 
 variable_config = """
 variables:
@@ -84,7 +88,7 @@ for e in range(4):
 for t in range(20):
     variable_list.append("FUELQ{}".format(t + 1))
 variable_list.sort()
-variable_list.append('ZZLOADER')
+variable_list.append("ZZLOADER")
 
 general_config = """
 variables:
@@ -1012,6 +1016,726 @@ class TestDatabase(unittest.TestCase):
         y = database.read("EGT12.Max")
         self.assertNotEqual(y, x)
 
+    def test_item_storage(self):
+        """Test that items are views into the shared item store"""
+        sf = io.StringIO(general_config)
+        database.init(sf)
+        roll = database.get_raw_item("ROLL")
+        pitch = database.get_raw_item("PITCH")
+        self.assertIs(roll.store, pitch.store)
+        self.assertNotEqual(roll.slot, pitch.slot)
+        self.assertEqual(roll.store.count, len(database.listkeys()))
+        with self.assertRaises(AttributeError):
+            roll.something = 1
+        database.write("ROLL", 12.5)
+        self.assertEqual(roll.store.values[roll.slot], 12.5)
+        self.assertEqual(database.read("PITCH")[0], 0.0)
+
+    def test_limit_types(self):
+        """Test min and max keep the item datatype"""
+        sf = io.StringIO(general_config)
+        database.init(sf)
+        i = database.get_raw_item("TACH1")
+        self.assertEqual(i.min, 0)
+        self.assertIs(type(i.max), int)
+        database.write("TACH1", 20000)
+        self.assertEqual(database.read("TACH1")[0], 10000)
+        self.assertIs(type(database.read("TACH1")[0]), int)
+        i = database.get_raw_item("DUMMY")
+        self.assertIsNone(i.min)
+        self.assertIsNone(i.max)
+
+    def test_secfail_flag(self):
+        """Test the secondary fail flag is independent of fail"""
+        sf = io.StringIO(general_config)
+        database.init(sf)
+        i = database.get_raw_item("OILP1")
+        i.secfail = True
+        self.assertTrue(i.secfail)
+        self.assertFalse(i.fail)
+        database.write("OILP1", (10.0, False, False, False, False))
+        self.assertFalse(i.secfail)
+
+    def test_read_does_not_modify(self):
+        """Test that reading an old item does not change the item"""
+        sf = io.StringIO(general_config)
+        database.init(sf)
+        i = database.get_raw_item("PITCH")
+        database.write("PITCH", 5.0)
+        # Make the item look old without waiting on the update thread
+        i.timestamp = time.time() - 1.0
+        version = i.store.versions[i.slot]
+        self.assertEqual(version % 2, 0)
+        x = database.read("PITCH")
+        self.assertEqual(x, (5.0, False, True, False, False, False))
+        self.assertEqual(i.store.versions[i.slot], version)
+        self.assertEqual(i.store.flags[i.slot] & database.OLD, 0)
+        database.write("PITCH", 6.0)
+        self.assertEqual(i.store.versions[i.slot], version + 2)
+
+    def test_write_many(self):
+        """Test writing several items at once"""
+        sf = io.StringIO(general_config)
+        database.init(sf)
+        seen = []
+        batches = []
+
+        def test_cb(key, val, udata):
+            # Every value should already be written before the first callback
+            seen.append((key, database.read("PITCH"), database.read("ROLL")))
+
+        def batch_cb(values, udata):
+            batches.append(values)
+
+        database.callback_add("test", "PITCH", test_cb, None)
+        database.callback_add("test", "ROLL", test_cb, None)
+        database.batch_callback_add("test", batch_cb, None)
+        database.write_many({"PITCH": 5.0, "ROLL": 20000, "AOA.Warn": 15.0})
+        self.assertEqual(len(seen), 2)
+        for key, pitch, roll in seen:
+            self.assertEqual(pitch[0], 5.0)
+            self.assertEqual(roll[0], 180.0)
+        self.assertEqual(len(batches), 1)
+        self.assertEqual(batches[0]["PITCH"], (5.0, False, False, False, False, False))
+        self.assertEqual(batches[0]["ROLL"][0], 180.0)
+        self.assertEqual(batches[0]["AOA.Warn"], 15.0)
+        self.assertEqual(database.read("AOA.Warn"), 15.0)
+        # A bad key should leave everything alone
+        with self.assertRaises(KeyError):
+            database.write_many({"PITCH": 1.0, "NOTAKEY": 2.0})
+        self.assertEqual(database.read("PITCH")[0], 5.0)
+        self.assertEqual(len(batches), 1)
+        database.batch_callback_del("test", batch_cb, None)
+        database.write_many({"PITCH": 1.0})
+        self.assertEqual(len(batches), 1)
+
+    def test_definition_cache(self):
+        """Test using the compiled database definition cache"""
+        with tempfile.TemporaryDirectory() as d:
+            dbfile = os.path.join(d, "database.yaml")
+            extra = os.path.join(d, "extra.yaml")
+            cache = os.path.join(d, "database.cache")
+            with open(dbfile, "w") as f:
+                f.write(
+                    variable_config.replace(
+                        "entries:", "entries:\n- include: extra.yaml"
+                    )
+                )
+            with open(extra, "w") as f:
+                f.write(
+                    "items:\n- key: EXTRA\n  description: Extra\n  type: int\n  initial: 3\n"
+                )
+            database.init(dbfile, cache)
+            self.assertTrue(os.path.exists(cache))
+            keys = database.listkeys()
+            self.assertEqual(sorted(keys), sorted(variable_list + ["EXTRA"]))
+            # Nothing has changed so the YAML should not be read at all
+            with patch("fixgw.cfg.from_yaml", side_effect=AssertionError):
+                database.init(dbfile, cache)
+            self.assertEqual(database.listkeys(), keys)
+            self.assertEqual(database.read("EXTRA")[0], 3)
+            self.assertEqual(
+                database.get_raw_item("EGT43").aux, {"Min": None, "Max": None}
+            )
+            # Changing an included file rebuilds the cache
+            with open(extra, "w") as f:
+                f.write(
+                    "items:\n- key: EXTRA\n  description: Extra\n  type: int\n  initial: 5\n"
+                )
+            database.init(dbfile, cache)
+            self.assertEqual(database.read("EXTRA")[0], 5)
+            # A broken cache is ignored
+            with open(cache, "w") as f:
+                f.write("not json")
+            database.init(dbfile, cache)
+            self.assertEqual(database.read("EXTRA")[0], 5)
+            with patch("fixgw.cfg.from_yaml", side_effect=AssertionError):
+                database.init(dbfile, cache)
+
+    def test_callback_registry(self):
+        """Test adding and removing callbacks"""
+        sf = io.StringIO(general_config)
+        database.init(sf)
+        seen = []
+
+        def test_cb(key, val, udata):
+            seen.append((udata, key))
+
+        def remove_cb(key, val, udata):
+            # Changing the callbacks from inside a callback should not change
+            # the callbacks that are being called for this write
+            database.callback_del("other", "*", test_cb, 2)
+            database.callback_add("late", key, test_cb, 3)
+
+        database.callback_add("test", "PITCH", test_cb, 1)
+        database.callback_add("test", "ROLL", test_cb, 1)
+        database.callback_add("remove", "PITCH", remove_cb, None)
+        database.callback_add("other", "PITCH", test_cb, 2)
+        database.callback_add("other", "ROLL", test_cb, 2)
+        database.write("PITCH", 1.0)
+        self.assertEqual(seen, [(1, "PITCH"), (2, "PITCH")])
+        seen.clear()
+        database.write("ROLL", 1.0)
+        self.assertEqual(seen, [(1, "ROLL")])
+        seen.clear()
+        database.callback_del("remove", "PITCH", remove_cb, None)
+        database.write("PITCH", 2.0)
+        self.assertEqual(seen, [(1, "PITCH"), (3, "PITCH")])
+        self.assertNotIn(("other", test_cb, 2), database._subscriptions)
+        # Deleting from one key leaves the others alone
+        database.callback_del("test", "PITCH", test_cb, 1)
+        self.assertEqual(database._subscriptions[("test", test_cb, 1)], {"ROLL"})
+        # The same callback can be added to a key twice
+        database.callback_add("test", "ROLL", test_cb, 1)
+        database.callback_del("test", "ROLL", test_cb, 1)
+        self.assertEqual(database._subscriptions[("test", test_cb, 1)], {"ROLL"})
+        database.callback_del("test", "*", test_cb, 1)
+        self.assertNotIn(("test", test_cb, 1), database._subscriptions)
+        self.assertEqual(database.get_raw_item("ROLL").callbacks, ())
+        # Removing something that is not there is not an error
+        database.callback_del("test", "*", test_cb, 1)
+        database.callback_del("test", "ROLL", test_cb, 1)
+        with self.assertRaises(KeyError):
+            database.callback_del("test", "NOTAKEY", test_cb, 1)
+
+    def test_pattern_callbacks(self):
+        """Test adding callbacks with wildcard patterns"""
+        sf = io.StringIO(variable_config)
+        database.init(sf)
+        self.assertEqual(database.listkeys("EGT1*"), variable_list[:6])
+        self.assertEqual(
+            database.listkeys("EGT?1"), ["EGT11", "EGT21", "EGT31", "EGT41"]
+        )
+        self.assertEqual(
+            database.listkeys("*Q1?"),
+            [
+                "FUELQ10",
+                "FUELQ11",
+                "FUELQ12",
+                "FUELQ13",
+                "FUELQ14",
+                "FUELQ15",
+                "FUELQ16",
+                "FUELQ17",
+                "FUELQ18",
+                "FUELQ19",
+            ],
+        )
+        self.assertEqual(database.listkeys("F*Q*0"), ["FUELQ10", "FUELQ20"])
+        self.assertEqual(database.listkeys("*"), sorted(variable_list))
+        self.assertEqual(database.listkeys("NOPE*"), [])
+        self.assertEqual(database.listkeys("EGT1"), [])
+        seen = []
+
+        def test_cb(key, val, udata):
+            seen.append(key)
+
+        database.callback_add("test", "EGT1*", test_cb, None)
+        # A key can be added twice by name but a pattern skips keys that the
+        # callback is already on
+        database.callback_add("test", "EGT11", test_cb, None)
+        database.callback_add("test", "EGT?1", test_cb, None)
+        for key in ["EGT11", "EGT12", "EGT21", "EGT22"]:
+            database.write(key, 100.0)
+        self.assertEqual(seen, ["EGT11", "EGT11", "EGT12", "EGT21"])
+        # Items added later join the matching patterns
+        database.add_item({"key": "EGT17", "type": "float", "initial": 0.0})
+        seen.clear()
+        database.write("EGT17", 10.0)
+        self.assertEqual(seen, ["EGT17"])
+        database.callback_del("test", "EGT1*", test_cb, None)
+        seen.clear()
+        for key in ["EGT11", "EGT12", "EGT17", "EGT21"]:
+            database.write(key, 200.0)
+        self.assertEqual(seen, ["EGT21"])
+        database.add_item({"key": "EGT18", "type": "float", "initial": 0.0})
+        self.assertEqual(database.get_raw_item("EGT18").callbacks, ())
+        database.callback_del("test", "*", test_cb, None)
+        database.add_item({"key": "EGT51", "type": "float", "initial": 0.0})
+        seen.clear()
+        database.write("EGT21", 1.0)
+        database.write("EGT51", 1.0)
+        self.assertEqual(seen, [])
+
+    def test_snapshot(self):
+        """Test taking a consistent snapshot of the database"""
+        sf = io.StringIO(general_config)
+        database.init(sf)
+        database.write("PITCH", 1.0)
+        database.write("ROLL", (2.0, True, False, False))
+        snap = database.snapshot()
+        self.assertEqual(sorted(snap.values), sorted(database.listkeys()))
+        self.assertEqual(snap.values["PITCH"], database.read("PITCH"))
+        self.assertEqual(snap.values["ROLL"], (2.0, True, False, False, False, False))
+        self.assertEqual(
+            snap.timestamps["PITCH"], database.get_raw_item("PITCH").timestamp
+        )
+        snap = database.snapshot(["PITCH"])
+        self.assertEqual(list(snap.values), ["PITCH"])
+        with self.assertRaises(KeyError):
+            database.snapshot(["NOTAKEY"])
+        # A change made after the snapshot point is seen as the value before it
+        item = database.get_raw_item("PITCH")
+        seq = next(database._sequence)
+        database.write("PITCH", 3.0)
+        snap = database._collect([item], seq, time.time())
+        self.assertEqual(snap.values["PITCH"][0], 1.0)
+        # Two changes since then is more than we can undo
+        database.write("PITCH", 4.0)
+        self.assertIsNone(database._collect([item], seq, time.time()))
+        self.assertEqual(database.snapshot(["PITCH"]).values["PITCH"][0], 4.0)
+
+        # ROLL is always written right after PITCH so no snapshot should ever
+        # see ROLL ahead of PITCH or more than one write behind it
+        database.get_raw_item("ROLL").tol = 0
+        item.tol = 0
+        database.write("PITCH", 0)
+        database.write("ROLL", 0)
+        done = threading.Event()
+
+        def writer():
+            x = 0
+            while not done.is_set():
+                x = (x + 1) % 90
+                database.write("PITCH", x)
+                database.write("ROLL", x)
+
+        t = threading.Thread(target=writer)
+        t.start()
+        try:
+            for i in range(500):
+                snap = database.snapshot(["ROLL", "PITCH"])
+                pitch = snap.values["PITCH"][0]
+                roll = snap.values["ROLL"][0]
+                self.assertIn(pitch - roll, (0, 1, -89))
+        finally:
+            done.set()
+            t.join()
+
+    def test_journal(self):
+        """Test getting the changes since a sequence number"""
+        sf = io.StringIO(general_config)
+        database.init(sf)
+        seq = database.sequence()
+        self.assertEqual(database.changes(seq), (seq, []))
+        database.write("PITCH", 1.0)
+        database.write("ROLL", 2.0)
+        database.write("PITCH", 3.0)
+        database.write("IAS.Vne", 200.0)
+        last, keys = database.changes(seq)
+        self.assertEqual(keys, ["ROLL", "PITCH", "IAS.Vne"])
+        self.assertEqual(last, database.sequence())
+        self.assertEqual(database.changes(last), (last, []))
+        # Flag changes are changes too
+        database.get_raw_item("PITCH").bad = True
+        self.assertEqual(database.changes(last)[1], ["PITCH"])
+        # A snapshot gives a point to carry on from
+        snap = database.snapshot()
+        database.write("ROLL", 4.0)
+        self.assertEqual(database.changes(snap.sequence)[1], ["ROLL"])
+
+        # Once the journal wraps the old changes are gone
+        for i in range(database.JOURNAL_SIZE):
+            database.write("PITCH", float(i % 90))
+        with self.assertRaises(database.ResyncNeeded):
+            database.changes(seq)
+        last, keys = database.changes(database.sequence() - 10)
+        self.assertEqual(keys, ["PITCH"])
+        # Starting over gives a new journal
+        sf = io.StringIO(general_config)
+        database.init(sf)
+        with self.assertRaises(database.ResyncNeeded):
+            database.changes(last)
+
+    def test_callback_timing(self):
+        """Test timing the callbacks"""
+        sf = io.StringIO(general_config)
+        database.init(sf)
+
+        def good(key, value, udata):
+            pass
+
+        def bad(key, value, udata):
+            raise ValueError("bad callback")
+
+        database.callback_add("good", "PITCH", good, None)
+        database.callback_add("bad", "PITCH", bad, None)
+        database.callback_add("good", "IAS", good, None)
+        # Nothing is recorded while it is off
+        database.write("PITCH", 1.0)
+        self.assertIsNone(database.callback_statistics())
+        database.callback_timing(True)
+        self.assertTrue(database.callback_timing_enabled())
+        database.write("PITCH", 2.0)
+        database.write("PITCH", 3.0)
+        database.write("IAS", 100.0)
+        database.write("IAS.Vne", 200.0)
+        stats = database.callback_statistics(raw=True)
+        self.assertEqual(stats[("good", "PITCH")][0], 2)
+        self.assertEqual(stats[("good", "PITCH")][3], 0)
+        self.assertEqual(stats[("bad", "PITCH")][0], 2)
+        self.assertEqual(stats[("bad", "PITCH")][3], 2)
+        self.assertEqual(stats[("good", "IAS")][0], 1)
+        self.assertEqual(stats[("good", "IAS.Vne")][0], 1)
+        calls, total, longest, errors = stats[("good", "PITCH")]
+        self.assertGreaterEqual(total, longest)
+        status = database.callback_statistics()
+        self.assertTrue(status["Enabled"])
+        self.assertEqual(status["Subscribers"]["good"]["Calls"], 4)
+        self.assertEqual(status["Subscribers"]["bad"]["Errors"], 2)
+        self.assertIn("bad PITCH", status["Slowest"])
+        # Turning it off keeps the results
+        database.callback_timing(False)
+        database.write("PITCH", 4.0)
+        self.assertEqual(database.callback_statistics(raw=True), stats)
+        self.assertFalse(database.callback_statistics()["Enabled"])
+        # Turning it back on starts over
+        database.callback_timing(True)
+        self.assertEqual(database.callback_statistics(raw=True), {})
+        database.callback_timing(False)
+
+    def test_write_statistics(self):
+        """Test the write counts, rates and writers"""
+        sf = io.StringIO(general_config)
+        database.init(sf)
+        # Setting the initial value is the first write
+        writes, rate, writer = database.write_statistics("PITCH")
+        self.assertEqual((writes, writer), (1, None))
+        database.write("PITCH", 1.0, "test")
+        for i in range(9):
+            database.write("ROLL", float(i))
+        database.write_many({"ROLL": 10.0, "YAW": 1.0}, "many")
+        writes, rate, writer = database.write_statistics("PITCH")
+        self.assertEqual(writes, 2)
+        self.assertEqual(writer, "test")
+        self.assertAlmostEqual(rate, 2.0 / database.RATE_WINDOW, 2)
+        writes, rate, writer = database.write_statistics("ROLL")
+        self.assertEqual(writes, 11)
+        self.assertEqual(writer, "many")
+        self.assertAlmostEqual(rate, 11.0 / database.RATE_WINDOW, 2)
+        handle = database.get_handle("PITCH", "handle")
+        handle.set(2.0)
+        self.assertEqual(database.write_statistics("PITCH")[:3:2], (3, "handle"))
+        top = database.hot_keys(2)
+        self.assertEqual([x[0] for x in top], ["ROLL", "PITCH"])
+        self.assertEqual(len(database.hot_keys()), 10)
+        # The rate decays once the writes stop
+        item = database.get_raw_item("ROLL")
+        item.store.rate_times[item.slot] -= database.RATE_WINDOW
+        writes, rate, writer = database.write_statistics("ROLL")
+        self.assertAlmostEqual(rate, 11.0 / database.RATE_WINDOW / math.e, 2)
+
+    def test_handles(self):
+        """Test reading and writing through key handles"""
+        sf = io.StringIO(general_config)
+        database.init(sf)
+        seen = []
+
+        def test_cb(key, val, udata):
+            seen.append((key, val))
+
+        database.callback_add("test", "PITCH", test_cb, None)
+        pitch = database.get_handle("PITCH")
+        pitch.set(5.0)
+        self.assertEqual(database.read("PITCH")[0], 5.0)
+        self.assertEqual(pitch.get(), database.read("PITCH"))
+        self.assertEqual(seen[-1][0], "PITCH")
+        pitch.set(1000.0)
+        self.assertEqual(pitch.get()[0], 90.0)
+        pitch.set((2.0, True, False, False))
+        self.assertTrue(pitch.get()[1])
+        database.callback_add("test", "VS", test_cb, None)
+        vs = database.get_handle("VS")
+        vs.set_aux("Max", 2000.0)
+        self.assertEqual(database.read("VS.Max"), 2000.0)
+        self.assertEqual(seen[-1], ("VS.Max", 2000.0))
+        warn = database.get_handle("AOA.Warn")
+        warn.set(12.0)
+        self.assertEqual(warn.get(), 12.0)
+        self.assertEqual(database.read("AOA.Warn"), 12.0)
+        with self.assertRaises(KeyError):
+            database.get_handle("NOTAKEY")
+        with self.assertRaises(KeyError):
+            database.get_handle("AOA.NotAnAux")
+
+    def test_callback_dispatcher(self):
+        """Test calling the callbacks from the dispatcher thread"""
+        sf = io.StringIO(general_config)
+        database.init(sf)
+        seen = []
+        gate = threading.Event()
+
+        def test_cb(key, val, udata):
+            gate.wait(1.0)
+            seen.append((key, val[0], threading.current_thread()))
+
+        database.callback_add("test", "PITCH", test_cb, None)
+        database.callback_add("test", "ROLL", test_cb, None)
+        database.start_dispatcher()
+        try:
+            # The first write is picked up by the dispatcher which then
+            # blocks in our callback while the rest pile up and coalesce
+            database.write("PITCH", 1.0)
+            time.sleep(0.1)
+            for x in range(2, 11):
+                database.write("PITCH", float(x))
+            database.write("ROLL", 5.0)
+            self.assertEqual(seen, [])
+            gate.set()
+            self.assertTrue(database.dispatcher_wait(1.0))
+            values = [(x[0], x[1]) for x in seen]
+            self.assertEqual(values, [("PITCH", 1.0), ("PITCH", 10.0), ("ROLL", 5.0)])
+            self.assertNotEqual(seen[0][2], threading.current_thread())
+            status = database.dispatcher_status()
+            self.assertEqual(status["Coalesced"], 8)
+            self.assertEqual(status["Delivered"], 3)
+            self.assertEqual(status["Queue Depth"], 0)
+        finally:
+            database.stop_dispatcher()
+        self.assertIsNone(database.dispatcher_status())
+        seen.clear()
+        database.write("ROLL", 6.0)
+        self.assertEqual(seen[0][2], threading.current_thread())
+
+    def test_change_only_notify(self):
+        """Test that unchanged writes are not sent in change only mode"""
+        sf = io.StringIO("notify: change\n" + general_config)
+        database.init(sf)
+        seen = []
+
+        def test_cb(key, val, udata):
+            seen.append((key, val))
+
+        database.callback_add("test", "PITCH", test_cb, None)
+        suppressed = database.notify_statistics()["Notifications Suppressed"]
+        database.write("PITCH", 5.0)
+        database.write("PITCH", 5.0)
+        self.assertEqual(len(seen), 1)
+        database.write("PITCH", (5.0, False, False, True))
+        self.assertEqual(len(seen), 2)
+        self.assertTrue(seen[-1][1][4])
+        # The timestamp still moves so the item does not go old
+        i = database.get_raw_item("PITCH")
+        i.timestamp = time.time() - 0.1
+        database.write("PITCH", (5.0, False, False, True))
+        self.assertEqual(len(seen), 2)
+        self.assertLess(i.age, 0.05)
+        # Refreshing an old item is a change that must be sent
+        i.timestamp = time.time() - 1.0
+        database.write("PITCH", (5.0, False, False, True))
+        self.assertEqual(len(seen), 3)
+        self.assertFalse(seen[-1][1][2])
+        stats = database.notify_statistics()
+        self.assertEqual(stats["Notifications Suppressed"], suppressed + 2)
+
+        # Items can override the database default
+        config = general_config.replace(
+            "  tol: 200\n\n- key: PITCH", "  tol: 200\n  notify: change\n\n- key: PITCH"
+        )
+        database.init(io.StringIO(config))
+        database.callback_add("test", "ROLL", test_cb, None)
+        database.callback_add("test", "PITCH", test_cb, None)
+        seen.clear()
+        for x in range(3):
+            database.write("ROLL", 1.0)
+            database.write("PITCH", 1.0)
+        self.assertEqual([x[0] for x in seen], ["ROLL", "PITCH", "PITCH", "PITCH"])
+
+    def test_tol_expiry(self):
+        """Test that items are marked old as soon as the TOL runs out"""
+        sf = io.StringIO(general_config)
+        database.init(sf)
+        expired = threading.Event()
+        seen = []
+
+        def test_cb(key, val, udata):
+            seen.append(time.time())
+            if val[2]:
+                expired.set()
+
+        database.callback_add("test", "ROLL", test_cb, None)
+        i = database.get_raw_item("ROLL")
+        i.tol = 100
+        start = time.time()
+        # Keep writing for a while to make sure the expiry gets moved along
+        while time.time() - start < 0.3:
+            database.write("ROLL", 1.0)
+            time.sleep(0.02)
+        last = i.timestamp
+        self.assertFalse(expired.is_set())
+        self.assertTrue(expired.wait(1.0))
+        self.assertTrue(i.store.flags[i.slot] & database.OLD)
+        self.assertGreater(seen[-1] - last, 0.1)
+        self.assertLess(seen[-1] - last, 0.2)
+        # Another write clears it
+        database.write("ROLL", 2.0)
+        self.assertFalse(database.read("ROLL")[2])
+
+    def test_deadband_interval(self):
+        """Test the deadband and minimum interval filters"""
+        config = general_config.replace(
+            "  tol: 200\n\n- key: PITCH",
+            "  tol: 200\n  min_interval_ms: 100\n\n- key: PITCH",
+        ).replace(
+            "  tol: 200\n\n- key: ORISYSW",
+            '  tol: 200\n  deadband: "1%"\n\n- key: ORISYSW',
+        )
+        database.init(io.StringIO(config))
+        seen = []
+
+        def test_cb(key, val, udata):
+            seen.append((key, val[0]))
+
+        database.callback_add("test", "ROLL", test_cb, None)
+        database.callback_add("test", "PITCH", test_cb, None)
+        # Keep the update thread from sending old flag changes
+        database.get_raw_item("ROLL").tol = 0
+        database.get_raw_item("PITCH").tol = 0
+        # Deadband on PITCH is 1% of 180 degrees
+        database.write("PITCH", 10.0)
+        database.write("PITCH", 11.0)
+        database.write("PITCH", 11.5)
+        self.assertEqual(seen, [("PITCH", 10.0)])
+        self.assertEqual(database.read("PITCH")[0], 11.5)
+        database.write("PITCH", 12.0)
+        self.assertEqual(seen, [("PITCH", 10.0), ("PITCH", 12.0)])
+        # Flag changes go right through
+        database.write("PITCH", (12.5, False, True, False))
+        self.assertEqual(len(seen), 3)
+        # The held back value is sent once things settle down
+        seen.clear()
+        database.write("PITCH", (13.0, False, True, False))
+        time.sleep(database.DEADBAND_SETTLE + 0.3)
+        self.assertEqual(seen, [("PITCH", 13.0)])
+
+        seen.clear()
+        for x in range(10):
+            database.write("ROLL", float(x))
+        self.assertEqual(seen, [("ROLL", 0.0)])
+        time.sleep(0.2)
+        self.assertEqual(seen, [("ROLL", 0.0), ("ROLL", 9.0)])
+
+    def test_update(self):
+        """Test changing the value and flags with one notification"""
+        sf = io.StringIO(general_config)
+        database.init(sf)
+        seen = []
+
+        def test_cb(key, val, udata):
+            seen.append(val)
+
+        database.callback_add("test", "PITCH", test_cb, None)
+        item = database.get_raw_item("PITCH")
+        item.update(12.0, annunciate=True, bad=True, fail=False, secfail=True)
+        self.assertEqual(seen, [(12.0, True, False, True, False, True)])
+        # Flags that are not given are left alone
+        item.update(13.0, bad=False)
+        self.assertEqual(seen[-1], (13.0, True, False, False, False, True))
+        # Only flags
+        item.update(annunciate=False, secfail=False)
+        self.assertEqual(seen[-1], (13.0, False, False, False, False, False))
+        self.assertEqual(len(seen), 3)
+        # Nothing changed so nobody is told
+        item.update(annunciate=False)
+        self.assertEqual(len(seen), 3)
+        handle = database.get_handle("PITCH", "handle")
+        handle.update(14.0, fail=True)
+        self.assertEqual(seen[-1], (14.0, False, False, False, True, False))
+        self.assertEqual(database.write_statistics("PITCH")[2], "handle")
+
+    def test_read_modify_write(self):
+        """Test increment, toggle and compare and set"""
+        sf = io.StringIO(general_config)
+        database.init(sf)
+        seen = []
+
+        def test_cb(key, val, udata):
+            seen.append(val[0])
+
+        database.callback_add("test", "ENC1", test_cb, None)
+        database.callback_add("test", "BTN1", test_cb, None)
+        database.increment("ENC1", 5)
+        database.increment("ENC1", -2, "test")
+        self.assertEqual(database.read("ENC1")[0], 3)
+        self.assertEqual(database.write_statistics("ENC1")[2], "test")
+        # Capped at the max
+        database.increment("ENC1", 100000)
+        self.assertEqual(database.read("ENC1")[0], 32767)
+        database.toggle("BTN1")
+        self.assertEqual(database.read("BTN1")[0], True)
+        database.toggle("BTN1")
+        self.assertEqual(database.read("BTN1")[0], False)
+        self.assertEqual(seen, [5, 3, 32767, True, False])
+        self.assertFalse(database.compare_and_set("ENC1", 0, 10))
+        self.assertEqual(len(seen), 5)
+        self.assertTrue(database.compare_and_set("ENC1", 32767, 10))
+        self.assertEqual(seen[-1], 10)
+        handle = database.get_handle("ENC1")
+        handle.increment(1)
+        self.assertTrue(handle.compare_and_set(11, 0))
+        self.assertEqual(database.read("ENC1")[0], 0)
+
+        # No increments are lost when many threads do them at once
+        def adder():
+            for i in range(1000):
+                database.increment("ENC1", 1)
+
+        threads = [threading.Thread(target=adder) for x in range(4)]
+        for t in threads:
+            t.start()
+        for t in threads:
+            t.join()
+        self.assertEqual(database.read("ENC1")[0], 4000)
+
+    def test_threaded_access(self):
+        """Test writing, reading and adding items from many threads"""
+        sf = io.StringIO(general_config)
+        database.init(sf)
+        errors = []
+        done = threading.Event()
+
+        def writer(n):
+            for i in range(500):
+                database.write("ROLL", float(n * 1000 + i))
+
+        def reader():
+            while not done.is_set():
+                try:
+                    v = database.read("ROLL")[0]
+                    snap = database.snapshot(["ROLL", "PITCH"])
+                    if v % 1000 >= 500 or snap.values["ROLL"][0] % 1000 >= 500:
+                        errors.append(v)
+                except Exception as e:
+                    errors.append(e)
+
+        readers = [threading.Thread(target=reader) for x in range(2)]
+        writers = [threading.Thread(target=writer, args=(n,)) for n in range(4)]
+        for t in readers + writers:
+            t.start()
+        for t in writers:
+            t.join()
+        done.set()
+        for t in readers:
+            t.join()
+        self.assertEqual(errors, [])
+        self.assertEqual(database.write_statistics("ROLL")[0], 2001)
+
+        # Slots are never handed out twice while the store grows
+        store = database.ItemStore(1)
+        items = []
+
+        def adder(n):
+            for i in range(50):
+                items.append(database.db_item("K{}_{}".format(n, i), "float", store))
+
+        threads = [threading.Thread(target=adder, args=(n,)) for n in range(8)]
+        for t in threads:
+            t.start()
+        for t in threads:
+            t.join()
+        self.assertEqual(len(set(x.slot for x in items)), 400)
+        self.assertEqual(store.count, 400)
+
 
 if __name__ == "__main__":
     unittest.main()
@@ -0,0 +1,68 @@
+import io
+import time
+
+import pytest
+
+import fixgw.database as database
+import fixgw.process as process
+
+from .test_database import general_config
+
+
+def wait_for(check, timeout=5.0):
+    end = time.time() + timeout
+    while time.time() < end:
+        if check():
+            return True
+        time.sleep(0.01)
+    return False
+
+
+@pytest.fixture
+def plugin():
+    database.init(io.StringIO(general_config))
+    p = process.ProcessPlugin("child", "tests.process_plugin", {}, None)
+    yield p
+    if p.process.is_alive():
+        p._kill()
+
+
+def test_writes(plugin):
+    plugin.start()
+    assert wait_for(lambda: database.read("ALT")[0] == 1234.0)
+    assert wait_for(lambda: database.read("IAS")[0] == 99.0)
+    assert wait_for(lambda: database.read("YAW")[:4] == (5.0, False, False, True))
+    assert database.write_statistics("ALT")[2] == "child"
+    plugin.shutdown()
+
+
+def test_callbacks(plugin):
+    plugin.start()
+    database.write("ROLL", 5.0)
+    assert wait_for(lambda: database.read("PITCH")[0] == 10.0)
+    status = plugin.get_status()
+    assert status["Received"] == 1
+    assert status["Process ID"] == plugin.process.pid
+    assert status["IPC Messages Sent"] > 0
+    plugin.shutdown()
+
+
+def test_get_item_not_available(plugin):
+    plugin.start()
+    assert plugin.get_status()["Item"] == "Not Available"
+    plugin.shutdown()
+
+
+def test_shutdown(plugin):
+    plugin.start()
+    assert plugin.is_running()
+    plugin.shutdown()
+    assert not plugin.process.is_alive()
+    assert not plugin.is_running()
+    assert database.get_raw_item("ROLL").callbacks == ()
+
+
+def test_load_error():
+    database.init(io.StringIO(general_config))
+    with pytest.raises(ValueError):
+        process.ProcessPlugin("child", "tests.process_plugin", {"fail": True}, None)
@@ -14,8 +14,14 @@ from fixgw.status import (
 
 @pytest.fixture
 def mock_database():
-    with patch("fixgw.database.listkeys") as mock_listkeys:
+    with patch("fixgw.database.listkeys") as mock_listkeys, patch(
+        "fixgw.database.notify_statistics"
+    ) as mock_notify:
         mock_listkeys.return_value = ["key1", "key2"]
+        mock_notify.return_value = {
+            "Notifications Delivered": 10,
+            "Notifications Suppressed": 5,
+        }
         yield mock_listkeys
 
 
@@ -65,7 +71,11 @@ def test_status_get_dict(mock_database, mock_plugins, mock_fixgw):
             "Version": "1.0.0",
             "Config": "Loaded",
             "Performance": {},
-            "Database Statistics": {"Item Count": 2},
+            "Database Statistics": {
+                "Item Count": 2,
+                "Notifications Delivered": 10,
+                "Notifications Suppressed": 5,
+            },
             "Connection: plugin1": OrderedDict({"Running": True, "uptime": "5m"}),
         }
     )